@@ -0,0 +1,108 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+"""
+Compare two export benchmark result files (written by export_benchmark.py), does not need Blender:
+
+    python benchmarks/compare.py baseline.json results.json --time-threshold 10
+
+Prints the relative change of export time, peak Python memory and output size per case and exits with status 1
+if a metric got worse by more than its threshold (in percent).
+"""
+import argparse
+import json
+import sys
+
+# (result key, label, threshold argument)
+METRICS = [
+    ('time_median', 'time', 'time_threshold'),
+    ('python_peak_bytes', 'memory', 'memory_threshold'),
+    ('output_bytes', 'size', 'size_threshold'),
+]
+
+
+def load(path):
+    with open(path) as result_file:
+        report = json.load(result_file)
+
+    return report, {(entry['case'], entry['scale'], entry['exporter']): entry for entry in report['results']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare PBRTv3 export benchmark results')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--time-threshold', type=float, default=10.0)
+    parser.add_argument('--memory-threshold', type=float, default=10.0)
+    parser.add_argument('--size-threshold', type=float, default=1.0)
+    args = parser.parse_args()
+
+    baseline_report, baseline = load(args.baseline)
+    current_report, current = load(args.current)
+
+    print('Baseline: %s, current: %s' % (baseline_report.get('commit'), current_report.get('commit')))
+    if baseline_report.get('luxcore_backend') != current_report.get('luxcore_backend'):
+        print('WARNING: PBRTv3Core results use different backends (%s / %s)'
+              % (baseline_report.get('luxcore_backend'), current_report.get('luxcore_backend')))
+
+    regressions = []
+
+    for key in sorted(current):
+        entry = current[key]
+        old_entry = baseline.get(key)
+        name = '%s/%s/%s' % key
+
+        if 'error' in entry:
+            regressions.append('%s failed: %s' % (name, entry['error']))
+            continue
+
+        if old_entry is None or 'error' in old_entry:
+            print('%-32s no baseline' % name)
+            continue
+
+        columns = []
+        for metric, label, threshold_arg in METRICS:
+            old_value = old_entry.get(metric)
+            new_value = entry.get(metric)
+
+            if not old_value or new_value is None:
+                columns.append('%s: n/a' % label)
+                continue
+
+            change = (new_value - old_value) / old_value * 100
+            columns.append('%s: %+6.1f%%' % (label, change))
+
+            if change > getattr(args, threshold_arg):
+                regressions.append('%s %s %+.1f%%' % (name, label, change))
+
+        print('%-32s %s' % (name, '  '.join(columns)))
+
+    if regressions:
+        print('\nRegressions:')
+        for regression in regressions:
+            print('  ' + regression)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
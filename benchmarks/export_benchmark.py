@@ -0,0 +1,259 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+"""
+Export throughput benchmark. Runs in background Blender with the add-on enabled:
+
+    blender -b --factory-startup --python benchmarks/export_benchmark.py -- \\
+        --output results.json --scales small medium --cases meshes particles --exporters classic luxcore
+
+For each procedural scene (see scenes.py) the classic export (SceneExporter, FILE API) and the PBRTv3Core export
+(PBRTv3CoreExporter.convert, with pyluxcore or the stand-in from luxcore_standin.py) are timed. The results are
+written as JSON with the wall time of every run, the peak Python memory (tracemalloc, measured in one extra run),
+the process peak RSS and the output size. Compare two result files with compare.py.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import addon_utils
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import luxcore_standin
+import scenes
+
+RESULT_FORMAT_VERSION = 1
+
+
+class HeadlessRenderEngine(object):
+    """
+    Provides the RenderEngine methods the PBRTv3Core exporter calls
+    """
+
+    def test_break(self):
+        return False
+
+    def update_stats(self, stats, info):
+        pass
+
+    def update_progress(self, progress):
+        pass
+
+    def report(self, type, message):
+        print('%s: %s' % (', '.join(type), message))
+
+
+def find_addon():
+    for module in addon_utils.modules():
+        if module.bl_info.get('name') == 'PBRTv3':
+            return module.__name__
+
+    raise RuntimeError('PBRTv3 add-on not found in the add-on paths')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def max_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # kilobytes on Linux, bytes on macOS
+    factor = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * factor
+
+
+def directory_size(path):
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for filename in files:
+            size += os.path.getsize(os.path.join(root, filename))
+    return size
+
+
+class ClassicExport(object):
+    name = 'classic'
+
+    def __init__(self, addon):
+        self.scene_module = __import__(addon + '.export.scene', fromlist=['SceneExporter'])
+        self.outputs_module = __import__(addon + '.outputs', fromlist=['PBRTv3Manager'])
+
+    def run(self, scene):
+        """
+        Export once, returns the output size in bytes
+        """
+        directory = tempfile.mkdtemp(prefix='pbrtv3_bench_')
+
+        try:
+            properties = self.scene_module.SceneExporterProperties()
+            properties.directory = directory
+            properties.filename = 'bench'
+            properties.api_type = 'FILE'
+            properties.write_files = True
+            properties.write_all_files = True
+
+            self.outputs_module.PBRTv3Manager.SetActive(None)
+            result = self.scene_module.SceneExporter().set_properties(properties).set_scene(scene).export()
+
+            if 'FINISHED' not in result:
+                raise RuntimeError('Classic export failed: %s' % result)
+
+            return directory_size(directory)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+class LuxCoreExport(object):
+    name = 'luxcore'
+
+    def __init__(self, addon):
+        self.luxcore_module = __import__(addon + '.export.luxcore', fromlist=['PBRTv3CoreExporter'])
+        self.uses_standin = luxcore_standin.install(addon)
+
+    def run(self, scene):
+        exporter = self.luxcore_module.PBRTv3CoreExporter(scene, HeadlessRenderEngine())
+        config = exporter.convert(scene.render.resolution_x, scene.render.resolution_y)
+
+        if config is None:
+            raise RuntimeError('PBRTv3Core export failed')
+
+        size = len(exporter.scene_properties.ToString()) + len(exporter.config_properties.ToString())
+
+        if self.uses_standin:
+            size += exporter.luxcore_scene.geometry_bytes
+
+        return size
+
+
+def measure(exporter, scene, repeat):
+    times = []
+    output_bytes = None
+
+    for i in range(repeat):
+        start = time.perf_counter()
+        output_bytes = exporter.run(scene)
+        times.append(time.perf_counter() - start)
+
+    # tracemalloc slows down the export, so the memory is measured in a separate run
+    tracemalloc.start()
+    try:
+        exporter.run(scene)
+        python_peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'times': times,
+        'time_median': statistics.median(times),
+        'time_min': min(times),
+        'python_peak_bytes': python_peak_bytes,
+        'max_rss_bytes': max_rss_bytes(),
+        'output_bytes': output_bytes,
+    }
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+    parser = argparse.ArgumentParser(description='PBRTv3 export throughput benchmark')
+    parser.add_argument('--output', default='export_benchmark.json', help='Result JSON file')
+    parser.add_argument('--scales', nargs='+', default=['small'], choices=sorted(scenes.SCALES))
+    parser.add_argument('--cases', nargs='+', default=sorted(scenes.CASES), choices=sorted(scenes.CASES))
+    parser.add_argument('--exporters', nargs='+', default=['classic', 'luxcore'], choices=['classic', 'luxcore'])
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case')
+    parser.add_argument('--commit', default=None, help='Commit id stored in the results (default: git HEAD)')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    addon = find_addon()
+    addon_utils.enable(addon, default_set=True)
+
+    exporter_classes = {'classic': ClassicExport, 'luxcore': LuxCoreExport}
+    exporters = [exporter_classes[name](addon) for name in args.exporters]
+
+    scene = bpy.context.scene
+    results = []
+
+    for scale in args.scales:
+        for case in args.cases:
+            params = scenes.build(scene, case, scale)
+
+            for exporter in exporters:
+                print('Benchmark: %s/%s with %s exporter' % (case, scale, exporter.name))
+                entry = {'case': case, 'scale': scale, 'exporter': exporter.name, 'params': params}
+
+                try:
+                    entry.update(measure(exporter, scene, args.repeat))
+                except Exception as err:
+                    entry['error'] = str(err)
+
+                results.append(entry)
+
+    luxcore_backend = None
+    for exporter in exporters:
+        if isinstance(exporter, LuxCoreExport):
+            luxcore_backend = 'stand-in' if exporter.uses_standin else 'pyluxcore'
+
+    report = {
+        'format_version': RESULT_FORMAT_VERSION,
+        'commit': args.commit or git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'blender_version': bpy.app.version_string,
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'luxcore_backend': luxcore_backend,
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+
+    print('Benchmark results written to %s' % args.output)
+
+    if any('error' in entry for entry in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+"""
+Minimal stand-in for the parts of pyluxcore the PBRTv3Core exporter uses, so the exporter can be benchmarked on
+machines without the binary module. Properties are stored in a dict and the scene only counts the defined
+geometry. The timings cover the Python side of the export (the part this add-on controls); the time pyluxcore
+itself spends on parsing and mesh conversion is not included.
+"""
+import sys
+
+
+class Property(object):
+    __slots__ = ('name', 'values')
+
+    def __init__(self, name, value=None):
+        self.name = name
+        self.values = value if isinstance(value, list) else [value]
+
+    def GetName(self):
+        return self.name
+
+    def Get(self):
+        return self.values
+
+    def GetString(self, index=0):
+        return str(self.values[index])
+
+    def GetInt(self, index=0):
+        return int(self.values[index])
+
+    def GetFloat(self, index=0):
+        return float(self.values[index])
+
+    def GetBool(self, index=0):
+        return bool(self.values[index])
+
+    def GetSize(self):
+        return len(self.values)
+
+    def __str__(self):
+        return '%s = %s' % (self.name, ' '.join(str(value) for value in self.values))
+
+
+class Properties(object):
+    def __init__(self, other=None):
+        self.items = dict(other.items) if other is not None else {}
+
+    def Set(self, prop):
+        if isinstance(prop, Properties):
+            self.items.update(prop.items)
+        else:
+            self.items[prop.name] = prop
+        return self
+
+    def Get(self, name, default=None):
+        if name in self.items:
+            return self.items[name]
+        return Property(name, default)
+
+    def IsDefined(self, name):
+        return name in self.items
+
+    def GetAllNames(self, prefix=''):
+        return [name for name in self.items if name.startswith(prefix)]
+
+    def GetAllUniqueSubNames(self, prefix):
+        depth = prefix.count('.') + 1
+        names = set()
+
+        for name in self.items:
+            if name.startswith(prefix + '.'):
+                names.add('.'.join(name.split('.')[:depth + 1]))
+
+        return list(names)
+
+    def Delete(self, name):
+        self.items.pop(name, None)
+
+    def DeleteAll(self, names):
+        for name in names:
+            self.items.pop(name, None)
+
+    def GetSize(self):
+        return len(self.items)
+
+    def ToString(self):
+        return '\n'.join(str(prop) for prop in self.items.values())
+
+    def __str__(self):
+        return self.ToString()
+
+
+class Scene(object):
+    def __init__(self, image_scale=1.0):
+        self.properties = Properties()
+        self.meshes = set()
+        # Rough size of the geometry the renderer would store
+        self.geometry_bytes = 0
+
+    def Parse(self, props):
+        self.properties.Set(props)
+
+    def DefineMesh(self, name, vertices, faces, normals=None, uvs=None, colors=None, alphas=None, transformation=None):
+        self.meshes.add(name)
+        self.geometry_bytes += len(vertices) * 12 + len(faces) * 12
+
+    def DefineBlenderMesh(self, name, face_count, faces, vertex_count, vertices, uvs, colors, transformation=None):
+        # The pointers are not read, so all faces are reported with the first material index
+        self.meshes.add(name)
+        self.geometry_bytes += vertex_count * 24 + face_count * 2 * 12
+        return [(name + '000', 0)]
+
+    def DefineStrands(self, name, strand_count, point_count, points, segments, thickness, transparency, colors, uvs,
+                      *args):
+        self.meshes.add(name)
+        self.geometry_bytes += point_count * 16
+
+    def IsMeshDefined(self, name):
+        return name in self.meshes
+
+    def DeleteObject(self, name):
+        pass
+
+    def DeleteLight(self, name):
+        pass
+
+    def GetProperties(self):
+        return self.properties
+
+
+class RenderConfig(object):
+    def __init__(self, props, scene):
+        self.properties = Properties(props)
+        self.scene = scene
+
+    def GetProperties(self):
+        return self.properties
+
+    def GetScene(self):
+        return self.scene
+
+
+def Init(log_handler=None):
+    pass
+
+
+def Version():
+    return 'stand-in'
+
+
+def install(package_name):
+    """
+    Make all modules of the add-on package that imported pyluxcore while it was unavailable use this stand-in.
+    Returns True if the stand-in was installed, False if the real pyluxcore is available.
+    """
+    standin = sys.modules[__name__]
+    LazyBindingsModule = sys.modules[package_name].LazyBindingsModule
+    installed = False
+
+    for module_name, module in list(sys.modules.items()):
+        if module is None or not module_name.startswith(package_name + '.'):
+            continue
+
+        bindings = vars(module).get('pyluxcore', standin)
+
+        # The add-on imports pyluxcore on first use, load() returns None if it is not available
+        if bindings is None or (isinstance(bindings, LazyBindingsModule) and bindings.load() is None):
+            module.pyluxcore = standin
+            installed = True
+
+    return installed
@@ -0,0 +1,274 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+"""
+ParamSet memory and speed benchmark. Runs in background Blender with the add-on enabled:
+
+    blender -b --factory-startup --python benchmarks/paramset_benchmark.py -- \\
+        --output paramset_benchmark.json --scales small medium
+
+Builds the paramsets the classic exporter creates for meshes (points, normals, uvs and triangle indices),
+materials (many scalar, color and texture parameters, some set twice) and smoke volumes (density grids) and
+measures the time to build, serialize (to_string) and size (getSize) them, the Python memory the built paramsets
+keep alive and the peak during the build. The results have the format of export_benchmark.py (exporter
+'paramset'), so two runs can be compared with compare.py.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import addon_utils
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from export_benchmark import RESULT_FORMAT_VERSION, find_addon, git_commit, max_rss_bytes
+
+# Parameters of the cases per scale
+SCALES = {
+    'small': {
+        'mesh': {'vertices': 10000},
+        'material': {'count': 100},
+        'volume': {'resolution': 32},
+    },
+    'medium': {
+        'mesh': {'vertices': 200000},
+        'material': {'count': 1000},
+        'volume': {'resolution': 64},
+    },
+    'large': {
+        'mesh': {'vertices': 1000000},
+        'material': {'count': 10000},
+        'volume': {'resolution': 128},
+    },
+}
+
+
+def random_floats(count, seed):
+    rng = random.Random(seed)
+    return [rng.uniform(-1, 1) for i in range(count)]
+
+
+def copy_floats(values):
+    # New float objects, like the values read from Blender for every export
+    return [value + 0.0 for value in values]
+
+
+def build_mesh(ParamSet, vertices):
+    source_points = random_floats(vertices * 3, 1)
+    source_normals = random_floats(vertices * 3, 2)
+    source_uvs = random_floats(vertices * 2, 3)
+
+    def build():
+        # Like the exporter, the lists are built for every mesh and handed over to the paramset
+        points = copy_floats(source_points)
+        normals = copy_floats(source_normals)
+        uvs = copy_floats(source_uvs)
+        indices = [(i * 7919) % vertices for i in range(vertices * 6)]
+
+        shape_params = ParamSet()
+        shape_params.add_integer('ntris', len(indices))
+        shape_params.add_integer('nvertices', vertices)
+        shape_params.add_integer('triindices', indices)
+        shape_params.add_point('P', points)
+        shape_params.add_normal('N', normals)
+        shape_params.add_float('uv', uvs)
+        shape_params.add_string('subdivscheme', 'loop')
+        return [shape_params]
+
+    return build
+
+
+def build_material(ParamSet, count):
+    def build():
+        paramsets = []
+
+        for i in range(count):
+            material_params = ParamSet()
+            material_params.add_string('type', 'glossy')
+            material_params.add_color('Kd', (0.8, 0.2 + i % 10 / 20, 0.1))
+            material_params.add_texture('Ks', 'tex_%d_Ks' % i)
+            material_params.add_float('uroughness', 0.1)
+            material_params.add_float('vroughness', 0.1)
+            material_params.add_float('index', 0.0)
+            material_params.add_bool('multibounce', False)
+            material_params.add_color('Ka', (0.0, 0.0, 0.0))
+            material_params.add_float('d', 0.0)
+            material_params.add_texture('bumpmap', 'tex_%d_bump' % i)
+            material_params.add_bool('separable', True)
+
+            # Exporters set some parameters again, e.g. when a texture overrides the color
+            material_params.add_texture('Kd', 'tex_%d_Kd' % i)
+            material_params.add_float('uroughness', 0.05)
+            paramsets.append(material_params)
+
+        return paramsets
+
+    return build
+
+
+def build_volume(ParamSet, resolution):
+    source_density = random_floats(resolution ** 3, 4)
+
+    def build():
+        density = copy_floats(source_density)
+
+        volume_params = ParamSet()
+        volume_params.add_integer('nx', resolution)
+        volume_params.add_integer('ny', resolution)
+        volume_params.add_integer('nz', resolution)
+        volume_params.add_point('p0', (-1.0, -1.0, -1.0))
+        volume_params.add_point('p1', (1.0, 1.0, 1.0))
+        volume_params.add_string('wrap', 'black')
+        volume_params.add_float('density', density)
+        return [volume_params]
+
+    return build
+
+
+CASES = {
+    'mesh': build_mesh,
+    'material': build_material,
+    'volume': build_volume,
+}
+
+
+def serialize(paramsets):
+    """
+    Returns the size of the serialized paramsets
+    """
+    size = 0
+
+    for paramset in paramsets:
+        paramset.getSize()
+        size += sum(len(p.to_string()) for p in paramset)
+
+    return size
+
+
+def measure(build, repeat):
+    build_times = []
+    serialize_times = []
+    output_bytes = None
+
+    for i in range(repeat):
+        start = time.perf_counter()
+        paramsets = build()
+        build_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        output_bytes = serialize(paramsets)
+        serialize_times.append(time.perf_counter() - start)
+
+        del paramsets
+
+    times = [build_time + serialize_time for build_time, serialize_time in zip(build_times, serialize_times)]
+
+    # tracemalloc slows down the build, so the memory is measured in a separate run
+    tracemalloc.start()
+    try:
+        paramsets = build()
+        retained_bytes, python_peak_bytes = tracemalloc.get_traced_memory()
+        del paramsets
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'times': times,
+        'time_median': statistics.median(times),
+        'time_min': min(times),
+        'build_time_median': statistics.median(build_times),
+        'serialize_time_median': statistics.median(serialize_times),
+        'python_peak_bytes': python_peak_bytes,
+        'retained_bytes': retained_bytes,
+        'max_rss_bytes': max_rss_bytes(),
+        'output_bytes': output_bytes,
+    }
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+    parser = argparse.ArgumentParser(description='PBRTv3 ParamSet benchmark')
+    parser.add_argument('--output', default='paramset_benchmark.json', help='Result JSON file')
+    parser.add_argument('--scales', nargs='+', default=['small'], choices=sorted(SCALES))
+    parser.add_argument('--cases', nargs='+', default=sorted(CASES), choices=sorted(CASES))
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case')
+    parser.add_argument('--commit', default=None, help='Commit id stored in the results (default: git HEAD)')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    addon = find_addon()
+    addon_utils.enable(addon, default_set=True)
+    ParamSet = __import__(addon + '.export', fromlist=['ParamSet']).ParamSet
+
+    results = []
+
+    for scale in args.scales:
+        for case in args.cases:
+            params = SCALES[scale][case]
+            print('Benchmark: %s/%s paramsets' % (case, scale))
+            entry = {'case': case, 'scale': scale, 'exporter': 'paramset', 'params': params}
+
+            try:
+                entry.update(measure(CASES[case](ParamSet, **params), args.repeat))
+                print('  build %.3fs, serialize %.3fs, retained %.1f MB' % (
+                    entry['build_time_median'], entry['serialize_time_median'],
+                    entry['retained_bytes'] / 1024 / 1024))
+            except Exception as err:
+                entry['error'] = str(err)
+
+            results.append(entry)
+
+    report = {
+        'format_version': RESULT_FORMAT_VERSION,
+        'commit': args.commit or git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'blender_version': bpy.app.version_string,
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'luxcore_backend': None,
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+
+    print('Benchmark results written to %s' % args.output)
+
+    if any('error' in entry for entry in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
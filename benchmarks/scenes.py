@@ -0,0 +1,274 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+"""
+Procedural benchmark scenes. Every builder fills an empty scene (see reset_scene()) through the data API only,
+so the scenes are identical between runs and Blender versions and no .blend files have to be stored.
+"""
+import array
+import math
+
+import bpy
+import mathutils
+
+# Parameters of the cases per scale
+SCALES = {
+    'small': {
+        'meshes': {'count': 10, 'faces': 1000},
+        'particles': {'count': 1000},
+        'hair': {'count': 100, 'steps': 3},
+        'smoke': {'resolution': 32, 'frames': 5},
+        'materials': {'count': 20},
+    },
+    'medium': {
+        'meshes': {'count': 100, 'faces': 10000},
+        'particles': {'count': 10000},
+        'hair': {'count': 1000, 'steps': 3},
+        'smoke': {'resolution': 64, 'frames': 5},
+        'materials': {'count': 200},
+    },
+    'large': {
+        'meshes': {'count': 500, 'faces': 50000},
+        'particles': {'count': 100000},
+        'hair': {'count': 10000, 'steps': 3},
+        'smoke': {'resolution': 128, 'frames': 5},
+        'materials': {'count': 1000},
+    },
+}
+
+
+def reset_scene(scene):
+    """
+    Remove all objects and orphaned data, then add the camera and lamp every benchmark scene uses
+    """
+    for obj in list(scene.objects):
+        scene.objects.unlink(obj)
+
+    for collection in (bpy.data.objects, bpy.data.meshes, bpy.data.materials, bpy.data.textures,
+                       bpy.data.particles, bpy.data.cameras, bpy.data.lamps):
+        for datablock in list(collection):
+            if datablock.users == 0:
+                collection.remove(datablock)
+
+    while len(scene.pbrtv3_volumes.volumes) > 0:
+        scene.pbrtv3_volumes.volumes.remove(0)
+
+    scene.frame_set(1)
+    scene.render.resolution_x = 640
+    scene.render.resolution_y = 480
+    scene.render.resolution_percentage = 100
+
+    # Every run writes all files, the cached PLY files of a previous run must not be reused
+    scene.pbrtv3_engine.partial_ply = False
+
+    camera = bpy.data.objects.new('bench_camera', bpy.data.cameras.new('bench_camera'))
+    scene.objects.link(camera)
+    camera.location = (0, -40, 20)
+    camera.rotation_euler = (math.radians(65), 0, 0)
+    scene.camera = camera
+
+    lamp = bpy.data.objects.new('bench_lamp', bpy.data.lamps.new('bench_lamp', 'SUN'))
+    scene.objects.link(lamp)
+    lamp.rotation_euler = (math.radians(30), 0, math.radians(30))
+
+
+def grid_mesh(name, faces):
+    """
+    Create a square grid mesh with at least the given number of quads
+    """
+    side = max(1, int(math.ceil(math.sqrt(faces))))
+    row = side + 1
+
+    co = array.array('f')
+    for y in range(row):
+        for x in range(row):
+            # Some height variation, so the normals are not all equal
+            co.extend((x / side - 0.5, y / side - 0.5, 0.05 * math.sin(x * 0.7) * math.cos(y * 0.7)))
+
+    vertex_indices = array.array('i')
+    for y in range(side):
+        for x in range(side):
+            i = y * row + x
+            vertex_indices.extend((i, i + 1, i + row + 1, i + row))
+
+    quad_count = side * side
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(row * row)
+    mesh.vertices.foreach_set('co', co)
+    mesh.loops.add(quad_count * 4)
+    mesh.loops.foreach_set('vertex_index', vertex_indices)
+    mesh.polygons.add(quad_count)
+    mesh.polygons.foreach_set('loop_start', array.array('i', range(0, quad_count * 4, 4)))
+    mesh.polygons.foreach_set('loop_total', array.array('i', [4]) * quad_count)
+    mesh.polygons.foreach_set('use_smooth', array.array('i', [1]) * quad_count)
+    mesh.uv_textures.new()
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+def add_object(scene, name, data, location=(0, 0, 0), scale=1.0):
+    obj = bpy.data.objects.new(name, data)
+    scene.objects.link(obj)
+    obj.location = location
+    obj.scale = (scale, scale, scale)
+    return obj
+
+
+def add_material(obj, name, color):
+    material = bpy.data.materials.new(name)
+    material.pbrtv3_material.set_type('matte')
+    material.pbrtv3_mat_matte.Kd_color = color
+    obj.data.materials.append(material)
+    return material
+
+
+def build_meshes(scene, count, faces):
+    """
+    count objects with separate (not instanced) meshes of the given face count
+    """
+    template = grid_mesh('bench_grid', faces)
+    columns = max(1, int(math.ceil(math.sqrt(count))))
+
+    for i in range(count):
+        mesh = template.copy() if i > 0 else template
+        location = ((i % columns - columns / 2) * 1.2, (i // columns - columns / 2) * 1.2, 0)
+        add_object(scene, 'bench_mesh_%05d' % i, mesh, location)
+
+
+def build_particles(scene, count):
+    """
+    One emitter scattering count instances of a small object
+    """
+    instance = add_object(scene, 'bench_instance', grid_mesh('bench_instance', 16), (0, 0, -100), 0.2)
+    emitter = add_object(scene, 'bench_emitter', grid_mesh('bench_emitter', 100), scale=40.0)
+
+    emitter.modifiers.new('particles', 'PARTICLE_SYSTEM')
+    settings = emitter.particle_systems[0].settings
+    settings.count = count
+    settings.frame_start = 1
+    settings.frame_end = 1
+    settings.lifetime = 1000
+    settings.physics_type = 'NO'
+    settings.emit_from = 'FACE'
+    settings.render_type = 'OBJECT'
+    settings.dupli_object = instance
+    settings.use_rotation_dupli = True
+
+    scene.frame_set(1)
+
+
+def build_hair(scene, count, steps):
+    """
+    One emitter with a hair system of count strands
+    """
+    emitter = add_object(scene, 'bench_hair_emitter', grid_mesh('bench_hair_emitter', 100), scale=10.0)
+    add_material(emitter, 'bench_hair', (0.4, 0.3, 0.2))
+
+    emitter.modifiers.new('hair', 'PARTICLE_SYSTEM')
+    settings = emitter.particle_systems[0].settings
+    settings.type = 'HAIR'
+    settings.count = count
+    settings.hair_length = 0.5
+    settings.render_step = steps
+    settings.emit_from = 'FACE'
+
+    scene.frame_set(1)
+
+
+def build_smoke(scene, resolution, frames):
+    """
+    A smoke domain with the given resolution, simulated for some frames, used by a heterogeneous volume
+    """
+    domain = add_object(scene, 'bench_smoke_domain', grid_mesh('bench_smoke_domain', 1), scale=5.0)
+    # The grid is flat, make the domain a box
+    domain.modifiers.new('Solidify', 'SOLIDIFY').thickness = 1.0
+
+    flow = add_object(scene, 'bench_smoke_flow', grid_mesh('bench_smoke_flow', 4), (0, 0, -1))
+
+    domain_modifier = domain.modifiers.new('Smoke', 'SMOKE')
+    domain_modifier.smoke_type = 'DOMAIN'
+    domain_modifier.domain_settings.resolution_max = resolution
+
+    flow_modifier = flow.modifiers.new('Smoke', 'SMOKE')
+    flow_modifier.smoke_type = 'FLOW'
+    flow_modifier.flow_settings.smoke_flow_type = 'SMOKE'
+
+    texture = bpy.data.textures.new('bench_smoke_density', 'BLEND')
+    texture.pbrtv3_texture.set_type('densitygrid')
+    texture.pbrtv3_texture.pbrtv3_tex_densitygrid.domain_object = domain.name
+    texture.pbrtv3_texture.pbrtv3_tex_densitygrid.source = 'density'
+
+    volume = scene.pbrtv3_volumes.volumes.add()
+    volume.name = 'bench_smoke'
+    volume.type = 'heterogeneous'
+    volume.sigma_s_usecolortexture = True
+    volume.sigma_s_colortexturename = texture.name
+
+    material = add_material(domain, 'bench_smoke_domain', (1.0, 1.0, 1.0))
+    material.pbrtv3_material.set_type('null')
+    material.pbrtv3_material.Interior_volume = volume.name
+
+    # Step through the frames so the simulation has data
+    for frame in range(1, frames + 1):
+        scene.frame_set(frame)
+
+
+def build_materials(scene, count):
+    """
+    count small objects, each with its own textured material
+    """
+    template = grid_mesh('bench_material_grid', 16)
+    columns = max(1, int(math.ceil(math.sqrt(count))))
+
+    for i in range(count):
+        location = ((i % columns - columns / 2) * 1.2, (i // columns - columns / 2) * 1.2, 0)
+        obj = add_object(scene, 'bench_material_obj_%05d' % i, template.copy(), location)
+
+        hue = i / max(count, 1)
+        color = mathutils.Color()
+        color.hsv = (hue, 0.7, 0.8)
+        material = add_material(obj, 'bench_material_%05d' % i, tuple(color))
+
+        texture = bpy.data.textures.new('bench_texture_%05d' % i, 'CLOUDS')
+        texture.noise_scale = 0.1 + hue
+        material.pbrtv3_mat_matte.Kd_usecolortexture = True
+        material.pbrtv3_mat_matte.Kd_colortexturename = texture.name
+
+
+CASES = {
+    'meshes': build_meshes,
+    'particles': build_particles,
+    'hair': build_hair,
+    'smoke': build_smoke,
+    'materials': build_materials,
+}
+
+
+def build(scene, case, scale):
+    """
+    Reset the scene and build a benchmark case, returns the parameters of the case
+    """
+    params = SCALES[scale][case]
+    reset_scene(scene)
+    CASES[case](scene, **params)
+    return params
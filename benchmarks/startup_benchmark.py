@@ -0,0 +1,320 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+"""
+Add-on startup benchmark. Runs in background Blender (without enabling the add-on):
+
+    blender -b --factory-startup --python benchmarks/startup_benchmark.py -- \\
+        --output startup_benchmark.json --repeat 5
+
+Every run starts a new Blender process, imports the add-on and calls its register() function. The import time of
+every module of the add-on (without the modules it imports itself) and the time register() spends on the classes
+and properties of every module are measured. Afterwards the time the Lux Python bindings (pyluxcore, pylux) need to
+load on first use is measured, which is not part of the startup.
+
+The results have the format of export_benchmark.py (exporter 'startup', case 'import', 'register' or 'bindings'
+and the module name as scale), so two runs can be compared with compare.py.
+"""
+import argparse
+import importlib
+import importlib.abc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from export_benchmark import RESULT_FORMAT_VERSION, find_addon, git_commit, max_rss_bytes
+
+
+class TimedLoader(importlib.abc.Loader):
+    """
+    Wraps the loader of an add-on module to measure how long the module takes to execute
+    """
+
+    def __init__(self, loader, name, timer):
+        self.loader = loader
+        self.name = name
+        self.timer = timer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.timer.children.append(0.0)
+        start = time.perf_counter()
+
+        try:
+            self.loader.exec_module(module)
+        finally:
+            duration = time.perf_counter() - start
+            children = self.timer.children.pop()
+            self.timer.times[self.name] = self.timer.times.get(self.name, 0.0) + duration - children
+
+            if self.timer.children:
+                self.timer.children[-1] += duration
+
+    def __getattr__(self, attr):
+        return getattr(self.loader, attr)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Measures the import time of the modules of a package, without the time of the modules they import
+    """
+
+    def __init__(self, package):
+        self.package = package
+        # {module name: seconds}
+        self.times = {}
+        # Time spent in nested imports of the modules that are being executed
+        self.children = []
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != self.package and not fullname.startswith(self.package + '.'):
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+
+            spec = finder.find_spec(fullname, path, target)
+
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = TimedLoader(spec.loader, fullname, self)
+                return spec
+
+        return None
+
+
+def module_label(package, name):
+    return name[len(package) + 1:] if name.startswith(package + '.') else '(package)'
+
+
+def measure_register(package, module):
+    """
+    Calls register() of the add-on and returns {module name: seconds} of the registered classes and their properties
+    """
+    extensions_framework = importlib.import_module(package + '.extensions_framework')
+    property_group = extensions_framework.declarative_property_group
+
+    times = {}
+    register_class = bpy.utils.register_class
+    initialise_properties = property_group.__dict__['initialise_properties']
+
+    def add_time(cls, duration):
+        label = module_label(package, cls.__module__)
+        times[label] = times.get(label, 0.0) + duration
+
+    def timed_register_class(cls):
+        start = time.perf_counter()
+        try:
+            return register_class(cls)
+        finally:
+            add_time(cls, time.perf_counter() - start)
+
+    def timed_initialise_properties(cls):
+        start = time.perf_counter()
+        try:
+            return initialise_properties.__func__(cls)
+        finally:
+            add_time(cls, time.perf_counter() - start)
+
+    bpy.utils.register_class = timed_register_class
+    property_group.initialise_properties = classmethod(timed_initialise_properties)
+
+    try:
+        start = time.perf_counter()
+        module.register()
+        total = time.perf_counter() - start
+    finally:
+        bpy.utils.register_class = register_class
+        property_group.initialise_properties = initialise_properties
+
+    # Node categories, preferences etc.
+    times['(other)'] = max(total - sum(times.values()), 0.0)
+    times['total'] = total
+    return times
+
+
+def measure_bindings(package):
+    """
+    Returns {bindings module: seconds to load on first use}, only for the modules that are installed
+    """
+    times = {}
+    luxcore_api = importlib.import_module(package + '.outputs.luxcore_api')
+    pure_api = importlib.import_module(package + '.outputs.pure_api')
+
+    if luxcore_api.PYLUXCORE_AVAILABLE:
+        start = time.perf_counter()
+        if luxcore_api.pyluxcore.load() is not None:
+            times['pyluxcore'] = time.perf_counter() - start
+
+    if pure_api.PYLUX_AVAILABLE:
+        start = time.perf_counter()
+        if pure_api.load_pylux():
+            times['pylux'] = time.perf_counter() - start
+
+    return times
+
+
+def run_child(package, output_path):
+    """
+    One startup measurement, in a fresh Blender process
+    """
+    timer = ImportTimer(package)
+    sys.meta_path.insert(0, timer)
+
+    try:
+        start = time.perf_counter()
+        module = importlib.import_module(package)
+        import_total = time.perf_counter() - start
+    finally:
+        sys.meta_path.remove(timer)
+
+    import_times = {module_label(package, name): duration for name, duration in timer.times.items()}
+    import_times['total'] = import_total
+
+    measurement = {
+        'import': import_times,
+        'register': measure_register(package, module),
+        'bindings': measure_bindings(package),
+        'max_rss_bytes': max_rss_bytes(),
+    }
+
+    with open(output_path, 'w') as output:
+        json.dump(measurement, output)
+
+
+def run_measurements(script_path, repeat):
+    measurements = []
+
+    for i in range(repeat):
+        print('Startup run %d/%d' % (i + 1, repeat))
+        handle, output_path = tempfile.mkstemp(suffix='.json', prefix='startup_')
+        os.close(handle)
+
+        try:
+            subprocess.check_call([bpy.app.binary_path, '-b', '--factory-startup', '--python', script_path, '--',
+                                   '--child', output_path], stdout=subprocess.DEVNULL)
+
+            with open(output_path) as result_file:
+                measurements.append(json.load(result_file))
+        finally:
+            os.remove(output_path)
+
+    return measurements
+
+
+def summarize(measurements):
+    """
+    Returns the result entries (one per case and module) of the measurements
+    """
+    results = []
+
+    for case in ('import', 'register', 'bindings'):
+        modules = sorted(set(name for measurement in measurements for name in measurement[case]))
+
+        for name in modules:
+            times = [measurement[case][name] for measurement in measurements if name in measurement[case]]
+            results.append({
+                'case': case,
+                'scale': name,
+                'exporter': 'startup',
+                'times': times,
+                'time_median': statistics.median(times),
+                'time_min': min(times),
+                'max_rss_bytes': max(measurement['max_rss_bytes'] or 0 for measurement in measurements) or None,
+            })
+
+    return results
+
+
+def print_summary(results, top):
+    for case in ('import', 'register', 'bindings'):
+        entries = [entry for entry in results if entry['case'] == case]
+        total = [entry for entry in entries if entry['scale'] == 'total']
+
+        if total:
+            print('%s: %.1f ms' % (case, total[0]['time_median'] * 1000))
+        elif entries:
+            print('%s (on first use):' % case)
+
+        modules = sorted((entry for entry in entries if entry['scale'] != 'total'),
+                         key=lambda entry: entry['time_median'], reverse=True)
+
+        for entry in modules[:top]:
+            print('  %8.1f ms  %s' % (entry['time_median'] * 1000, entry['scale']))
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+    parser = argparse.ArgumentParser(description='PBRTv3 add-on startup benchmark')
+    parser.add_argument('--output', default='startup_benchmark.json', help='Result JSON file')
+    parser.add_argument('--repeat', type=int, default=5, help='Blender processes to measure')
+    parser.add_argument('--top', type=int, default=15, help='Slowest modules printed per case')
+    parser.add_argument('--commit', default=None, help='Commit id stored in the results (default: git HEAD)')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    package = find_addon()
+
+    if args.child:
+        run_child(package, args.child)
+        return
+
+    results = summarize(run_measurements(os.path.abspath(__file__), args.repeat))
+    print_summary(results, args.top)
+
+    report = {
+        'format_version': RESULT_FORMAT_VERSION,
+        'commit': args.commit or git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'blender_version': bpy.app.version_string,
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'luxcore_backend': None,
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+
+    print('Benchmark results written to %s' % args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -88,6 +88,68 @@ def import_bindings_module(name):
             module = _import_bindings_module(luxblend_path, name, True)
         return module
 
+def bindings_module_available(name):
+    """Check if import_bindings_module(name) can find the module, without importing it."""
+    import os.path
+    import sys
+    from importlib.machinery import PathFinder
+
+    if name in sys.modules or __name__ + '.' + name in sys.modules:
+        return True
+
+    luxblend_path = os.path.dirname(os.path.abspath(__file__))
+    if sys.platform == 'darwin':
+        search_paths = [[luxblend_path]]
+    else:
+        search_paths = [[find_pbrtv3_path()] + sys.path, [luxblend_path]]
+
+    return any(PathFinder.find_spec(name, paths) is not None for paths in search_paths)
+
+class LazyBindingsModule(object):
+    """
+    Stands in for a Lux Python bindings module (e.g. pyluxcore) until it is used. The module is imported with
+    import_bindings_module() on the first attribute access (e.g. when the first render creates a
+    pyluxcore.Properties) instead of when the addon is loaded, and on_import(module) is called once after the import.
+    """
+
+    def __init__(self, name, on_import=None):
+        self._name = name
+        self._on_import = on_import
+        self._module = None
+        self._error = None
+
+    def load(self):
+        """Import the module if this was not tried yet. Returns the module, or None if it could not be imported."""
+        if self._module is None and self._error is None:
+            from .outputs import PBRTv3Log
+
+            try:
+                module = import_bindings_module(self._name)
+                if self._on_import is not None:
+                    self._on_import(module)
+                self._module = module
+            except ImportError as err:
+                PBRTv3Log('WARNING: Binary {} module not available! Visit '
+                       'http://www.luxrender.net/ to obtain one for your system.'.format(self._name))
+                PBRTv3Log('(ImportError was: {})'.format(err))
+                self._error = err
+
+        return self._module
+
+    def loaded_module(self):
+        """Returns the module if it was already imported, or None. Never imports it (e.g. for UI drawing code)."""
+        return self._module
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+
+        module = self.load()
+        if module is None:
+            raise ImportError('{} module not available ({})'.format(self._name, self._error))
+
+        return getattr(module, attr)
+
 if 'core' in locals():
     import importlib
 
@@ -37,6 +37,12 @@ import array
 import math
 import mathutils
 
+try:
+    import numpy
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # Blender libs
 import bpy, bgl, bl_ui
 from bpy.app.handlers import persistent
@@ -46,16 +52,17 @@ from ..extensions_framework import util as efutil
 
 # Exporter libs
 from .. import PBRTv3Addon
-from ..export import get_output_filename, get_worldscale
+from ..export import get_output_filename, get_worldscale, is_obj_visible
 from ..export.scene import SceneExporter
 from ..export.volumes import SmokeCache
 from ..outputs import PBRTv3Manager, LuxFilmDisplay
 from ..outputs import PBRTv3Log
-from ..outputs.pure_api import PBRTv3_VERSION
 from ..outputs.luxcore_api import ToValidPBRTv3CoreName
 from ..outputs.luxcore_api import PYLUXCORE_AVAILABLE, UsePBRTv3Core, pyluxcore
+from ..outputs.telemetry import TelemetryRecorder
 from ..export.luxcore import PBRTv3CoreExporter
-from ..export.luxcore.utils import get_elem_key
+from ..export.luxcore.meshes import MeshExporter
+from ..export.luxcore.utils import get_elem_key, ErrorCache
 
 # Exporter Property Groups need to be imported to ensure initialisation
 from ..properties import (
@@ -65,6 +72,7 @@ from ..properties import (
     luxcore_engine, luxcore_scene, luxcore_material, luxcore_lamp,
     luxcore_tile_highlighting, luxcore_imagepipeline, luxcore_translator, luxcore_rendering_controls, luxcore_global
 )
+from ..properties import SessionSettingsUpdates, NodeExportCache
 
 # Exporter Interface Panels need to be imported to ensure initialisation
 from ..ui import (
@@ -566,9 +574,9 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
 
         efutil.export_path = self.output_dir
 
-        from ..outputs.pure_api import PYLUX_AVAILABLE
+        from ..outputs.pure_api import load_pylux
 
-        if not PYLUX_AVAILABLE:
+        if not load_pylux():
             PBRTv3Log('ERROR: Material previews require pylux')
             return
 
@@ -1084,7 +1092,7 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
     mem_peak = 0
 
     def CreateBlenderStats(self, lcConfig, stats, scene, realtime_preview=False, time_until_update=-1, display_interval=-1,
-                           export_errors=False):
+                           export_errors=False, display_overhead=-1):
         """
         Returns: string of formatted statistics
         """
@@ -1232,6 +1240,12 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
 
             stats_list.append(engine_info)
 
+        # Framebuffer allocations and display refresh time (debug)
+        framebuffer = self.view_framebuffer if realtime_preview else self.final_framebuffer
+        if rendering_controls.stats_framebuffer and framebuffer is not None:
+            stats_list.append('Framebuffer: %d alloc, %.0f ms/refresh' % (framebuffer.allocations,
+                                                                          framebuffer.last_refresh_time * 1000))
+
         # Show remaining time until next film update (final render only)
         if scene.luxcore_rendering_controls.pause_render:
             stats_list.append('Rendering Paused')
@@ -1245,6 +1259,9 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
                 l[bar_length - percent] = '+'
                 text += '(' + ''.join(l) + ')'
                 stats_list.append(text)
+
+                if display_overhead >= 0:
+                    stats_list.append('Display Overhead: %.1f%%' % (display_overhead * 100))
             elif time_until_update != -1:
                 stats_list.append('Updating preview...')
 
@@ -1345,7 +1362,7 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
         PBRTv3Log('Importing AOV ' + message)
 
         # raw channel buffer
-        channel_buffer = array.array(arrayType, [arrayInitValue] * (filmWidth * filmHeight * arrayDepth))
+        channel_buffer = array.array(arrayType, [arrayInitValue]) * (filmWidth * filmHeight * arrayDepth)
 
         # buffer for converted array (to RGBA)
         channel_buffer_converted = []
@@ -1470,7 +1487,7 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
 
     def draw_tiles(self, scene, stats, imageBuffer, filmWidth, filmHeight):
         """
-        draws tile outlines directly into the imageBuffer
+        draws tile outlines directly into the imageBuffer (fallback for Blender builds without numpy, see TileOverlay)
 
         scene: Blender scene object
         stats: PBRTv3Core stats (from PBRTv3Core session)
@@ -1535,6 +1552,7 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
             draw_tile_type(count_pending, coords_pending, color_yellow)
 
     transparent_film = False
+    final_framebuffer = None
 
     def luxcore_render(self, scene):
         if self.is_preview:
@@ -1551,7 +1569,10 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
         try:
             scene.luxcore_rendering_controls.pause_render = False
 
-            if self.is_animation:
+            use_multicam = (scene.luxcore_translatorsettings.multicam_render and
+                            scene.luxcore_translatorsettings.export_type != 'luxcoreui')
+
+            if self.is_animation or use_multicam:
                 # Check if a halt condition is set, cancel the rendering and warn the user otherwise
                 settings = scene.luxcore_enginesettings
 
@@ -1562,8 +1583,8 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
                     halt_enabled = settings.use_halt_samples or settings.use_halt_noise or settings.use_halt_time
 
                 if not halt_enabled:
-                    raise Exception('You need to set a halt condition for animations, otherwise the rendering of the '
-                                    'first frame will never stop!')
+                    raise Exception('You need to set a halt condition for animations and multi-camera renders, '
+                                    'otherwise the rendering of the first frame/view will never stop!')
 
             self.set_export_path_luxcore(scene)
             # Stay compatible to old pyluxcore versions
@@ -1572,18 +1593,34 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
 
             filmWidth, filmHeight = self.get_film_size(scene)
 
-            luxcore_exporter = PBRTv3CoreExporter(scene, self)
-            luxcore_config = luxcore_exporter.convert(filmWidth, filmHeight)
+            use_incremental_export = (self.is_animation and
+                                      scene.luxcore_translatorsettings.incremental_anim_export and
+                                      scene.luxcore_translatorsettings.export_type != 'luxcoreui')
+
+            if use_incremental_export:
+                luxcore_exporter, luxcore_config = self.convert_animation_frame(scene, filmWidth, filmHeight)
+            else:
+                PBRTv3CoreAnimationCache.reset()
+                luxcore_exporter = PBRTv3CoreExporter(scene, self)
+                luxcore_config = luxcore_exporter.convert(filmWidth, filmHeight)
 
             # Maybe export was cancelled by user, don't start the rendering with an incomplete scene then
             if self.test_break() or luxcore_config is None:
                 return
 
+            telemetry = TelemetryRecorder.from_settings(scene, 'render', os.path.join(self.output_dir, 'telemetry'))
+            session_start_time = time.time()
+
             luxcore_session = pyluxcore.RenderSession(luxcore_config)
             # Start the rendering
             PBRTv3Log('Starting the rendering process...')
             luxcore_session.Start()
 
+            if telemetry is not None:
+                for phase, duration in luxcore_exporter.export_phases.items():
+                    telemetry.add_phase('export: ' + phase, duration)
+                telemetry.add_phase('session start', time.time() - session_start_time)
+
             # Print a summary of errors that happened during export, if there are any
             luxcore_exporter.error_cache.print_errors()
             export_errors = luxcore_exporter.error_cache.contains_errors()
@@ -1611,115 +1648,326 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
                 return
 
             bufferdepth = 4 if self.transparent_film else 3
-            imageBufferFloat = array.array('f', [0.0] * (filmWidth * filmHeight * bufferdepth))
+            # The framebuffer is shared by all final renders so it is reused between animation frames
+            if RENDERENGINE_luxrender.final_framebuffer is None:
+                RENDERENGINE_luxrender.final_framebuffer = FrameBuffer()
+            framebuffer = RENDERENGINE_luxrender.final_framebuffer
+            framebuffer.resize(filmWidth, filmHeight, bufferdepth)
+
+            if use_multicam:
+                last_camera = self.luxcore_render_multicam(scene, luxcore_exporter, luxcore_config, luxcore_session,
+                                                           framebuffer, filmWidth, filmHeight, export_errors,
+                                                           telemetry)
+            else:
+                self.luxcore_render_loop(scene, luxcore_exporter, luxcore_config, luxcore_session, framebuffer,
+                                         filmWidth, filmHeight, export_errors, telemetry=telemetry)
 
-            imagepipeline_settings = scene.camera.data.pbrtv3_camera.luxcore_imagepipeline
-            start_time = time.time()
-            last_image_display = start_time
-            done = False
+            PBRTv3Log('Ending the rendering process...')
+            luxcore_session.Stop()
 
-            if self.is_animation or not imagepipeline_settings.fast_initial_preview:
-                # Use normal display interval from the beginning in animations to speed up the rendering
-                display_interval = imagepipeline_settings.displayinterval
-            else:
-                # Magic formula to compute optimal display interval (found through testing)
-                display_interval = float(filmWidth * filmHeight) / 852272.0 * 1.1
-                PBRTv3Log('Set initial display interval to %.1fs' % display_interval)
+            # Get the final result
+            stats = luxcore_session.GetStats()
+            result = self.create_result(luxcore_session, framebuffer, scene, stats, filmWidth, filmHeight, True)
 
-            # Cache imagepipeline settings to detect changes
-            session_props = luxcore_exporter.convert_imagepipeline()
-            session_props.Set(luxcore_exporter.convert_lightgroup_scales())
+            if telemetry is not None:
+                telemetry.sample(stats, force=True, refresh_time=framebuffer.last_refresh_time)
+                telemetry.flush(scene.frame_current)
 
-            cached_session_props = str(session_props)
+            if scene.pbrtv3_channels.enable_aovs:
+                if scene.pbrtv3_channels.saveToDisk:
+                    output_path = efutil.filesystem_path(scene.render.filepath)
+                    self.update_stats('Saving AOV passes to disk', 'Output path: ' + str(output_path))
+                    PBRTv3Log('Saving AOV passes to disk, output path: ' + str(output_path))
+                    luxcore_session.GetFilm().Save()
 
-            while not self.test_break() and not done:
-                time.sleep(0.2)
+                if scene.pbrtv3_channels.import_into_blender:
+                    self.import_aov_channels(scene, luxcore_session, filmWidth, filmHeight, result.layers[0].passes)
 
-                # Check if imagepipeline settings have changed
-                session_was_updated = False
-                new_session_props = luxcore_exporter.convert_imagepipeline()
-                new_session_props.Set(luxcore_exporter.convert_lightgroup_scales())
+            self.end_result(result)
+
+            if use_multicam:
+                if not self.test_break():
+                    self.save_view_output(scene, luxcore_session, last_camera)
+                # The next frame of an incremental animation export starts with the scene camera again
+                luxcore_exporter.camera_exporter.blender_camera = None
+
+            PBRTv3Log('Done.\n')
+        except Exception as exc:
+            PBRTv3Log('Rendering aborted: %s' % exc)
+            self.report({'ERROR'}, str(exc))
+            import traceback
 
-                if str(new_session_props) != cached_session_props:
-                    cached_session_props = str(new_session_props)
+            traceback.print_exc()
 
-                    # Safety check for old pyluxcore versions compatibility
-                    luxcore_session.Parse(new_session_props)
-                    print('Set session settings:\n%s' % cached_session_props)
-                    session_was_updated = True
+    def luxcore_render_loop(self, scene, luxcore_exporter, luxcore_config, luxcore_session, framebuffer,
+                            filmWidth, filmHeight, export_errors, status='Rendering...', telemetry=None):
+        """
+        Update the displayed result and the statistics until a halt condition is met or the user cancels
+        """
+        imagepipeline_settings = scene.camera.data.pbrtv3_camera.luxcore_imagepipeline
+        last_image_display = time.time()
+        done = False
 
-                # Pause/Resume of rendering prcess
-                if scene.luxcore_rendering_controls.pause_render:
-                    if not luxcore_session.IsInPause():
-                        luxcore_session.UpdateStats()
+        # Use normal display interval from the beginning in animations to speed up the rendering
+        adaptive = not self.is_animation and imagepipeline_settings.fast_initial_preview
+        scheduler = DisplayRefreshScheduler(adaptive)
+        PBRTv3Log('Set initial display interval to %.1fs' % scheduler.get_interval(imagepipeline_settings))
 
-                        luxcore_session.Pause()
-                        print('Rendering paused.')
+        # Imagepipeline and lightgroup settings are only converted when one of them was changed
+        session_settings_counter = SessionSettingsUpdates.counter
 
-                        stats = luxcore_session.GetStats()
-                        result = self.create_result(luxcore_session, imageBufferFloat, scene, stats, filmWidth, filmHeight, False)
-                        self.end_result(result)
-                        last_image_display = now
-                else:
-                    if luxcore_session.IsInPause():
-                        luxcore_session.Resume()
-                        print('Resuming rendering')
+        while not self.test_break() and not done:
+            time.sleep(0.2)
 
-                if not luxcore_session.IsInPause():
-                    now = time.time()
-                    time_since_display = now - last_image_display
-                    time_since_start = now - start_time
+            # Check if imagepipeline settings have changed
+            session_was_updated = False
 
-                # Use user-defined display interval after the first 15 seconds
-                if time_since_start > 15.0 and display_interval != imagepipeline_settings.displayinterval:
-                    display_interval = imagepipeline_settings.displayinterval
-                    PBRTv3Log('Set display interval to %.1fs' % display_interval)
+            if SessionSettingsUpdates.counter != session_settings_counter:
+                session_settings_counter = SessionSettingsUpdates.counter
 
-                # Update statistics
+                new_session_props = luxcore_exporter.convert_imagepipeline()
+                new_session_props.Set(luxcore_exporter.convert_lightgroup_scales())
+
+                luxcore_session.Parse(new_session_props)
+                print('Set session settings:\n%s' % new_session_props)
+                session_was_updated = True
+
+            # Pause/Resume of rendering prcess
+            if scene.luxcore_rendering_controls.pause_render:
                 if not luxcore_session.IsInPause():
                     luxcore_session.UpdateStats()
 
-                stats = luxcore_session.GetStats()
-                time_until_update = display_interval - time_since_display
-                blender_stats = self.CreateBlenderStats(luxcore_config, stats, scene, False, time_until_update,
-                                                        display_interval, export_errors)
-                self.update_stats('Rendering...', blender_stats)
-
-                # check if any halt conditions are met
-                done = self.haltConditionMet(scene, stats)
+                    luxcore_session.Pause()
+                    print('Rendering paused.')
 
-                if time_since_display > display_interval or session_was_updated:
-                    result = self.create_result(luxcore_session, imageBufferFloat, scene, stats, filmWidth, filmHeight, False)
+                    stats = luxcore_session.GetStats()
+                    result = self.create_result(luxcore_session, framebuffer, scene, stats, filmWidth, filmHeight, False)
                     self.end_result(result)
                     last_image_display = now
+            else:
+                if luxcore_session.IsInPause():
+                    luxcore_session.Resume()
+                    print('Resuming rendering')
 
-            PBRTv3Log('Ending the rendering process...')
-            luxcore_session.Stop()
+            if not luxcore_session.IsInPause():
+                now = time.time()
+                time_since_display = now - last_image_display
+
+            display_interval = scheduler.get_interval(imagepipeline_settings)
+
+            # Update statistics
+            if not luxcore_session.IsInPause():
+                luxcore_session.UpdateStats()
 
-            # Get the final result
             stats = luxcore_session.GetStats()
-            result = self.create_result(luxcore_session, imageBufferFloat, scene, stats, filmWidth, filmHeight, True)
+            time_until_update = display_interval - time_since_display
+            blender_stats = self.CreateBlenderStats(luxcore_config, stats, scene, False, time_until_update,
+                                                    display_interval, export_errors, scheduler.get_overhead())
+            self.update_stats(status, blender_stats)
 
-            if scene.pbrtv3_channels.enable_aovs:
-                if scene.pbrtv3_channels.saveToDisk:
-                    output_path = efutil.filesystem_path(scene.render.filepath)
-                    self.update_stats('Saving AOV passes to disk', 'Output path: ' + str(output_path))
-                    PBRTv3Log('Saving AOV passes to disk, output path: ' + str(output_path))
-                    luxcore_session.GetFilm().Save()
+            if telemetry is not None:
+                telemetry.sample(stats, display_overhead=scheduler.get_overhead(),
+                                 refresh_time=scheduler.refresh_time)
 
-                if scene.pbrtv3_channels.import_into_blender:
-                    self.import_aov_channels(scene, luxcore_session, filmWidth, filmHeight, result.layers[0].passes)
+            # check if any halt conditions are met
+            done = self.haltConditionMet(scene, stats)
 
-            self.end_result(result)
-            PBRTv3Log('Done.\n')
-        except Exception as exc:
-            PBRTv3Log('Rendering aborted: %s' % exc)
-            self.report({'ERROR'}, str(exc))
-            import traceback
+            if time_since_display > display_interval or session_was_updated:
+                refresh_start = time.time()
+                result = self.create_result(luxcore_session, framebuffer, scene, stats, filmWidth, filmHeight, False)
+                self.end_result(result)
+                scheduler.add_refresh(time.time() - refresh_start)
+                last_image_display = now
 
-            traceback.print_exc()
+    def luxcore_render_multicam(self, scene, luxcore_exporter, luxcore_config, luxcore_session, framebuffer,
+                                filmWidth, filmHeight, export_errors, telemetry=None):
+        """
+        Render the scene from several cameras. The scene is only exported once, for each view only the camera
+        properties are swapped in a scene edit, so meshes and the accelerator are reused.
+        Every view except the last one is finished and saved here, the last one is finished by the caller.
+        Returns the camera of the last view.
+        """
+        views = get_multicam_views(scene)
+        luxcore_scene = luxcore_exporter.luxcore_scene
+        camera_exporter = luxcore_exporter.camera_exporter
+
+        PBRTv3Log('Multi-camera render: %d views (%s)' % (len(views), ', '.join([cam.name for cam in views])))
+
+        for index, camera in enumerate(views):
+            if self.test_break():
+                break
+
+            if camera != camera_exporter.get_camera():
+                camera_exporter.blender_camera = camera
+
+                luxcore_session.BeginSceneEdit()
+                luxcore_exporter.convert_camera()
+                luxcore_scene.Parse(luxcore_exporter.pop_updated_scene_properties())
+                luxcore_session.EndSceneEdit()
+
+            if telemetry is not None:
+                telemetry.view = camera.name
+
+            status = 'Rendering view %d/%d (%s)...' % (index + 1, len(views), camera.name)
+            self.luxcore_render_loop(scene, luxcore_exporter, luxcore_config, luxcore_session, framebuffer,
+                                     filmWidth, filmHeight, export_errors, status, telemetry)
+
+            if index < len(views) - 1 and not self.test_break():
+                stats = luxcore_session.GetStats()
+                result = self.create_result(luxcore_session, framebuffer, scene, stats, filmWidth, filmHeight, True)
+                self.end_result(result)
+                self.save_view_output(scene, luxcore_session, camera)
+
+        return camera
+
+    def save_view_output(self, scene, luxcore_session, camera):
+        """
+        Save the tonemapped result of a multi-camera view, the camera name is appended to the output filename
+        """
+        from ..outputs.luxcore_api import pyluxcore
+
+        film = luxcore_session.GetFilm()
+
+        if not hasattr(film, 'SaveOutput'):
+            PBRTv3Log('WARNING: This pyluxcore version can not save film outputs, view "%s" was not saved' % camera.name)
+            return
+
+        output_path = efutil.filesystem_path(scene.render.frame_path(frame=scene.frame_current))
+        root, ext = os.path.splitext(output_path)
+        filepath = '%s_%s%s' % (root, bpy.path.clean_name(camera.name), ext)
+
+        if self.transparent_film:
+            output_type = pyluxcore.FilmOutputType.RGBA_TONEMAPPED
+        else:
+            output_type = pyluxcore.FilmOutputType.RGB_TONEMAPPED
 
-    def create_result(self, luxcore_session, imageBufferFloat, scene, stats, filmWidth, filmHeight, is_final_result):
+        film.SaveOutput(filepath, output_type, pyluxcore.Properties())
+        PBRTv3Log('Saved view "%s" to %s' % (camera.name, filepath))
+
+    def convert_animation_frame(self, scene, filmWidth, filmHeight):
+        """
+        Incremental animation export: the first frame is exported completely, the exporter and the luxcore scene
+        are kept alive and all following frames only convert the elements that changed since the previous frame.
+        Returns the exporter and a new RenderConfig for the frame.
+        """
+        cache = PBRTv3CoreAnimationCache
+        start_time = time.time()
+
+        if not cache.is_valid(scene, filmWidth, filmHeight):
+            cache.reset()
+
+            luxcore_exporter = PBRTv3CoreExporter(scene, self, is_incremental_animation=True)
+            luxcore_config = luxcore_exporter.convert(filmWidth, filmHeight)
+
+            if luxcore_config is not None:
+                full_export_time = time.time() - start_time
+                cache.store(scene, luxcore_exporter, filmWidth, filmHeight, full_export_time)
+                PBRTv3Log('Frame %d: full export took %.2fs' % (scene.frame_current, full_export_time))
+
+            return luxcore_exporter, luxcore_config
+
+        PBRTv3Manager.SetCurrentScene(scene)
+
+        luxcore_exporter = cache.exporter
+        luxcore_exporter.renderengine = self
+        luxcore_exporter.error_cache = ErrorCache()
+
+        update_changes = self.find_frame_changes(scene, luxcore_exporter)
+
+        if self.test_break():
+            return luxcore_exporter, None
+
+        self.update_stats('Exporting...', 'Updating changed elements')
+
+        luxcore_config = luxcore_exporter.convert_changes(update_changes, filmWidth, filmHeight)
+
+        cache.update(scene)
+
+        export_time = time.time() - start_time
+        luxcore_exporter.export_phases.clear()
+        luxcore_exporter.export_phases['incremental'] = export_time
+        changed_count = (len(update_changes.changed_objects_mesh) + len(update_changes.changed_objects_transform) +
+                         len(update_changes.changed_duplicators) + len(update_changes.changed_materials))
+        PBRTv3Log('Frame %d: incremental export took %.2fs, %d elements updated (full export baseline: %.2fs)' %
+                  (scene.frame_current, export_time, changed_count, cache.full_export_time))
+        self.update_stats('Export Finished (%.1fs)' % export_time, 'Starting PBRTv3...')
+
+        return luxcore_exporter, luxcore_config
+
+    def find_frame_changes(self, scene, luxcore_exporter):
+        """
+        Find out which elements of the scene changed since the last exported animation frame
+        """
+        cache = PBRTv3CoreAnimationCache
+        update_changes = UpdateChanges()
+
+        lux_camera = scene.camera.data.pbrtv3_camera
+        use_object_mblur = lux_camera.usemblur and lux_camera.objectmblur
+
+        visible_objects = set()
+
+        for ob in scene.objects:
+            if not is_obj_visible(scene, ob):
+                continue
+
+            visible_objects.add(ob)
+            key = get_elem_key(ob)
+
+            if ob.type == 'CAMERA':
+                continue
+
+            if key not in cache.matrices:
+                # Object became visible in this frame
+                update_changes.changed_objects_mesh.add(ob)
+                continue
+
+            transform_changed = cache.matrices[key] != ob.matrix_world
+            if use_object_mblur and not transform_changed:
+                # The motion inside of the shutter interval can change even if the matrix at frame start did not
+                transform_changed = is_animated_object(ob)
+
+            if ob.type in ['MESH', 'CURVE', 'SURFACE', 'META', 'FONT']:
+                is_duplicator = len(ob.particle_systems) > 0 or ob.is_duplicator
+
+                if is_duplicator and (transform_changed or len(ob.particle_systems) > 0 or is_deforming_object(ob)):
+                    update_changes.changed_duplicators.add(ob)
+
+                if is_deforming_object(ob):
+                    update_changes.changed_objects_mesh.add(ob)
+                elif transform_changed:
+                    mesh_key = MeshExporter.get_mesh_key(ob, False, False)
+
+                    if mesh_key in luxcore_exporter.mesh_cache:
+                        # The transformation was baked into the non-instanced mesh, re-export it
+                        update_changes.changed_objects_mesh.add(ob)
+                    else:
+                        update_changes.changed_objects_transform.add(ob)
+            elif ob.type == 'LAMP':
+                if transform_changed or ob.data.animation_data is not None:
+                    update_changes.changed_objects_transform.add(ob)
+            elif transform_changed and ob.is_duplicator:
+                update_changes.changed_duplicators.add(ob)
+
+        update_changes.removed_objects = cache.visible_objects - visible_objects
+        cache.visible_objects = visible_objects
+
+        # Culled duplis and LOD levels depend on the camera view, so all duplicators follow a moving camera
+        camera_dependent = scene.luxcore_translatorsettings.cull_duplis or scene.pbrtv3_lod.lod_enable
+        if camera_dependent and cache.camera_changed(scene):
+            update_changes.changed_duplicators.update(ob for ob in visible_objects
+                                                      if ob.is_duplicator or len(ob.particle_systems) > 0)
+
+        for mat in bpy.data.materials:
+            if mat.users > 0 and is_animated_material(mat):
+                update_changes.changed_materials.add(mat)
+
+        for tex in bpy.data.textures:
+            if tex.users > 0 and is_animated_texture(tex):
+                update_changes.changed_materials.update(tex.users_material)
+
+        return update_changes
+
+    def create_result(self, luxcore_session, framebuffer, scene, stats, filmWidth, filmHeight, is_final_result):
         """
         Updates the film and creates a RenderResult.
         Remember to call self.end_result(result) on the returned result after calling this function!
@@ -1736,20 +1984,29 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
                 return pyluxcore.ConvertFilmChannelOutput_3xFloat_To_3xFloatList(filmWidth, filmHeight, imageBufferFloat)
 
         # Update the image
-        luxcore_session.GetFilm().GetOutputFloat(output_type, imageBufferFloat)
+        framebuffer.update(luxcore_session.GetFilm(), output_type)
 
         result = self.begin_result(0, 0, filmWidth, filmHeight)
         layer = result.layers[0] if bpy.app.version < (2, 74, 4) else result.layers[0].passes[0]
 
         if (scene.luxcore_enginesettings.renderengine_type == 'TILEPATH' and
+                scene.luxcore_tile_highlighting.use_tile_highlighting and not is_final_result and NUMPY_AVAILABLE):
+            if framebuffer.tile_overlay is None:
+                framebuffer.tile_overlay = TileOverlay()
+
+            overlay = framebuffer.tile_overlay
+            overlay.update(scene, stats, filmWidth, filmHeight)
+            framebuffer.write_to_pass(layer, convert, overlay.composite(framebuffer))
+        elif (scene.luxcore_enginesettings.renderengine_type == 'TILEPATH' and
                 scene.luxcore_tile_highlighting.use_tile_highlighting and not is_final_result):
             # Use a temp image because layer.rect does not support list slicing
-            tempImage = convert(filmWidth, filmHeight, imageBufferFloat)
+            tempImage = convert(filmWidth, filmHeight, framebuffer.buffer)
             # Draw tile outlines
             self.draw_tiles(scene, stats, tempImage, filmWidth, filmHeight)
             layer.rect = tempImage
+            framebuffer.finish_refresh()
         else:
-            layer.rect = convert(filmWidth, filmHeight, imageBufferFloat)
+            framebuffer.write_to_pass(layer, convert)
 
         return result
 
@@ -1936,16 +2193,18 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
         from ..export.luxcore.materialpreview import MaterialPreviewExporter
 
         try:
-            def update_result(luxcore_session, imageBufferFloat, filmWidth, filmHeight):
+            def convert(filmWidth, filmHeight, imageBufferFloat):
+                return pyluxcore.ConvertFilmChannelOutput_3xFloat_To_3xFloatList(filmWidth, filmHeight, imageBufferFloat)
+
+            def update_result(luxcore_session, framebuffer):
                 # Update the image
-                luxcore_session.GetFilm().GetOutputFloat(pyluxcore.FilmOutputType.RGB_TONEMAPPED, imageBufferFloat)
+                framebuffer.update(luxcore_session.GetFilm(), pyluxcore.FilmOutputType.RGB_TONEMAPPED)
 
                 # Here we write the pixel values to the RenderResult
-                result = self.begin_result(0, 0, filmWidth, filmHeight)
+                result = self.begin_result(0, 0, framebuffer.width, framebuffer.height)
                 layer = result.layers[0] if bpy.app.version < (2, 74, 4) else result.layers[0].passes[0]
 
-                layer.rect = pyluxcore.ConvertFilmChannelOutput_3xFloat_To_3xFloatList(filmWidth, filmHeight,
-                                                                                   imageBufferFloat)
+                framebuffer.write_to_pass(layer, convert)
                 self.end_result(result)
 
             filmWidth, filmHeight = scene.camera.data.pbrtv3_camera.pbrtv3_film.resolution(scene)
@@ -1967,11 +2226,15 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
             if luxcore_config is None:
                 return
 
+            # The preview scene does not contain the user settings, use the active scene
+            telemetry = TelemetryRecorder.from_settings(bpy.context.scene, 'preview')
+
             # Create preview rendersession
             luxcore_session = pyluxcore.RenderSession(luxcore_config)
 
             buffer_depth = 4 if is_thumbnail else 3
-            imageBufferFloat = array.array('f', [0.0] * (filmWidth * filmHeight * buffer_depth))
+            framebuffer = FrameBuffer()
+            framebuffer.resize(filmWidth, filmHeight, buffer_depth)
 
             # Start the rendering
             thumbnail_info = '(thumbnail)' if is_thumbnail else ''
@@ -1986,6 +2249,10 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
                     time.sleep(0.02)
                     luxcore_session.UpdateStats()
                     stats = luxcore_session.GetStats()
+
+                    if telemetry is not None:
+                        telemetry.sample(stats)
+
                     done = (stats.Get('stats.renderengine.convergence').GetFloat() == 1.0 or
                             stats.Get('stats.renderengine.pass').GetInt() > 10)
             else:
@@ -1993,14 +2260,22 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
 
                 while not self.test_break() and time.time() - startTime < stopTime and not done:
                     time.sleep(0.1)
-                    update_result(luxcore_session, imageBufferFloat, filmWidth, filmHeight)
+                    update_result(luxcore_session, framebuffer)
 
                     # Update statistics
                     luxcore_session.UpdateStats()
                     stats = luxcore_session.GetStats()
+
+                    if telemetry is not None:
+                        telemetry.sample(stats, refresh_time=framebuffer.last_refresh_time)
+
                     done = stats.Get('stats.renderengine.convergence').GetFloat() == 1.0
 
-            update_result(luxcore_session, imageBufferFloat, filmWidth, filmHeight)
+            update_result(luxcore_session, framebuffer)
+
+            if telemetry is not None:
+                telemetry.sample(luxcore_session.GetStats(), force=True, refresh_time=framebuffer.last_refresh_time)
+                telemetry.flush(scene.frame_current)
 
             luxcore_session.Stop()
             PBRTv3Log('Preview render done (%.2fs)' % (time.time() - startTime))
@@ -2020,7 +2295,8 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
 
     viewFilmWidth = -1
     viewFilmHeight = -1
-    viewImageBufferFloat = None
+    view_framebuffer = None
+    viewGLBuffer = None
     last_update_time = 0
     # store renderengine configuration of last update
     lastRenderSettings = ''
@@ -2030,12 +2306,20 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
     lastHaltSamples = -1
     lastCameraSettings = ''
     lastVisibilitySettings = None
-    lastNodeMatSettings = ''
     update_counter = 0
 
+    def create_view_telemetry(self, context):
+        # Every viewport session gets its own file, sessions are restarted e.g. when the viewport is resized
+        return TelemetryRecorder.from_settings(context.scene, 'viewport_' + time.strftime('%H%M%S'))
+
     def create_view_buffer(self, width, height):
         bufferdepth = 4 if self.transparent_film else 3
-        self.viewImageBufferFloat = array.array('f', [0.0] * (width * height * bufferdepth))
+
+        if self.view_framebuffer is None:
+            self.view_framebuffer = FrameBuffer()
+
+        self.view_framebuffer.resize(width, height, bufferdepth)
+        self.viewGLBuffer = None
 
     def luxcore_view_draw(self, context):
         def draw_framebuffer():
@@ -2050,11 +2334,13 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
                 bufferdepth = 3
                 buffertype = bgl.GL_RGB
 
-            buffersize = self.viewFilmWidth * self.viewFilmHeight * bufferdepth
-            glBuffer = bgl.Buffer(bgl.GL_FLOAT, [buffersize], self.viewImageBufferFloat)
+            if self.viewGLBuffer is None:
+                # Only copy the film into a new GL buffer after it was updated, not on every redraw
+                buffersize = self.viewFilmWidth * self.viewFilmHeight * bufferdepth
+                self.viewGLBuffer = bgl.Buffer(bgl.GL_FLOAT, [buffersize], self.view_framebuffer.buffer)
 
             bgl.glRasterPos2i(0, 0)
-            bgl.glDrawPixels(self.viewFilmWidth, self.viewFilmHeight, buffertype, bgl.GL_FLOAT, glBuffer)
+            bgl.glDrawPixels(self.viewFilmWidth, self.viewFilmHeight, buffertype, bgl.GL_FLOAT, self.viewGLBuffer)
             # restore the default
             bgl.glDisable(bgl.GL_BLEND)
 
@@ -2109,6 +2395,9 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
             session.luxcore_session.UpdateStats()
             stats = session.luxcore_session.GetStats()
 
+            if session.telemetry is not None:
+                session.telemetry.sample(stats, refresh_time=self.view_framebuffer.last_refresh_time)
+
             stop_redraw = self.haltConditionMet(context.scene, stats, realtime_preview = True)
 
             if not session.is_in_scene_edit():
@@ -2129,8 +2418,10 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
             output_type = pyluxcore.FilmOutputType.RGB_TONEMAPPED
 
         session.luxcore_session.WaitNewFrame()
-        session.luxcore_session.GetFilm().GetOutputFloat(output_type, self.viewImageBufferFloat)
+        self.view_framebuffer.update(session.luxcore_session.GetFilm(), output_type)
+        self.viewGLBuffer = None
         draw_framebuffer()
+        self.view_framebuffer.finish_refresh()
 
         self.last_update_time = view_draw_startTime
 
@@ -2171,6 +2462,7 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
 
                 # PBRTv3CoreExporter instance for viewport rendering is only created here
                 self.luxcore_exporter = PBRTv3CoreExporter(context.scene, self, True, context)
+                NodeExportCache.clear()
 
             # check if filmsize has changed
             if (self.viewFilmWidth == -1) or (self.viewFilmHeight == -1) or (
@@ -2220,14 +2512,13 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
                         nodetree = bpy.data.node_groups[nodetree_name]
 
                         if nodetree.is_updated or nodetree.is_updated_data:
-                            self.luxcore_exporter.convert_material(mat)
-                            newNodeMatSettings = str(self.luxcore_exporter.pop_updated_scene_properties())
+                            # Only the changed nodes are exported again, and only the changed materials and
+                            # textures of the node tree are sent to the session
+                            changed_properties = self.luxcore_exporter.update_material(mat)
 
-                            if self.lastNodeMatSettings == '':
-                                self.lastNodeMatSettings = newNodeMatSettings
-                                mat_updated = True
-                            elif self.lastNodeMatSettings != newNodeMatSettings:
-                                self.lastNodeMatSettings = newNodeMatSettings
+                            if changed_properties is not None:
+                                update_changes.add_material_properties(changed_properties)
+                                update_changes.updated_node_materials.add(mat)
                                 mat_updated = True
                     else:
                         mat_updated = mat.is_updated
@@ -2383,7 +2674,12 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
                     PBRTv3Log('ERROR: not a valid luxcore config')
                     return
 
-                PBRTv3CoreSessionManager.create_luxcore_session(luxcore_config, self.space)
+                telemetry = self.create_view_telemetry(context)
+                if telemetry is not None:
+                    for phase, duration in self.luxcore_exporter.export_phases.items():
+                        telemetry.add_phase('export: ' + phase, duration)
+
+                PBRTv3CoreSessionManager.create_luxcore_session(luxcore_config, self.space, telemetry)
                 PBRTv3CoreSessionManager.start_luxcore_session(self.space)
 
                 self.critical_errors = False
@@ -2424,7 +2720,8 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
                     PBRTv3Log('ERROR: not a valid luxcore config')
                     return
 
-                PBRTv3CoreSessionManager.create_luxcore_session(luxcore_config, self.space)
+                PBRTv3CoreSessionManager.create_luxcore_session(luxcore_config, self.space,
+                                                                self.create_view_telemetry(context))
                 PBRTv3CoreSessionManager.start_luxcore_session(self.space)
 
             if update_changes.scene_edit_necessary:
@@ -2438,47 +2735,31 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
 
                 if update_changes.cause_materials:
                     PBRTv3Log('Materials update')
-                    for material in update_changes.changed_materials:
+                    for material in update_changes.changed_materials - update_changes.updated_node_materials:
                         self.luxcore_exporter.convert_material(material)
 
                 if update_changes.cause_mesh:
                     for ob in update_changes.changed_objects_mesh:
-                        PBRTv3Log('Mesh update: ' + ob.name)
+                        PBRTv3Log('Mesh update: ' + ob.name, category='viewport')
                         self.luxcore_exporter.convert_object(ob, luxcore_scene, update_mesh=True, update_material=False)
 
                 if update_changes.cause_light or update_changes.cause_objectTransform:
                     for ob in update_changes.changed_objects_transform:
-                        PBRTv3Log('Transformation update: ' + ob.name)
+                        PBRTv3Log('Transformation update: ' + ob.name, category='viewport')
 
                         self.luxcore_exporter.convert_object(ob, luxcore_scene, update_mesh=False, update_material=False)
 
                 if update_changes.cause_objectsRemoved:
                     for ob in update_changes.removed_objects:
-                        key = get_elem_key(ob)
-
-                        if ob.type == 'LAMP':
-                            if key in self.luxcore_exporter.light_cache:
-                                # In case of sunsky there might be multiple light sources, loop through them
-                                for exported_light in self.luxcore_exporter.light_cache[key].exported_lights:
-                                    luxcore_name = exported_light.luxcore_name
-
-                                    if exported_light.type == 'AREA':
-                                        # Area lights are meshlights and treated like objects with glowing materials
-                                        luxcore_scene.DeleteObject(luxcore_name)
-                                    else:
-                                        luxcore_scene.DeleteLight(luxcore_name)
-                        else:
-                            if key in self.luxcore_exporter.object_cache:
-                                # loop through object components (split by materials)
-                                for exported_object in self.luxcore_exporter.object_cache[key].exported_objects:
-                                    luxcore_name = exported_object.luxcore_object_name
-                                    luxcore_scene.DeleteObject(luxcore_name)
+                        self.luxcore_exporter.delete_object(ob, luxcore_scene)
 
                 if update_changes.cause_volumes:
                     for volume in context.scene.pbrtv3_volumes.volumes:
                         self.luxcore_exporter.convert_volume(volume)
 
                 updated_properties = self.luxcore_exporter.pop_updated_scene_properties()
+                if update_changes.material_properties is not None:
+                    updated_properties.Set(update_changes.material_properties)
 
                 if context.space_data.local_view:
                     # Add a uniform white background light in local view so we have a lightsource
@@ -2513,13 +2794,256 @@ class RENDERENGINE_luxrender(bpy.types.RenderEngine):
         self.last_update_time = time.time()
 
 
+class DisplayRefreshScheduler(object):
+    """
+    Chooses the display interval of final renders. The time needed for a display refresh (reading the film,
+    converting it and writing the RenderResult) is measured and the interval is chosen so that refreshing takes
+    at most the target percentage of the rendering time. The preview interval setting is the upper limit.
+    """
+    min_interval = 0.5
+    # Weight of the newest measurement in the moving average of the refresh time
+    smoothing = 0.3
+
+    def __init__(self, adaptive):
+        self.adaptive = adaptive
+        self.start_time = time.time()
+        self.refresh_time = 0.0
+        self.total_refresh_time = 0.0
+        self.refresh_count = 0
+
+    def add_refresh(self, duration):
+        if self.refresh_count == 0:
+            self.refresh_time = duration
+        else:
+            self.refresh_time += self.smoothing * (duration - self.refresh_time)
+
+        self.total_refresh_time += duration
+        self.refresh_count += 1
+
+    def get_interval(self, imagepipeline_settings):
+        max_interval = imagepipeline_settings.displayinterval
+
+        if not self.adaptive:
+            return max_interval
+
+        # overhead = refresh_time / (interval + refresh_time)
+        target = imagepipeline_settings.display_overhead / 100
+        interval = self.refresh_time * (1 - target) / target
+        return min(max(interval, self.min_interval), max_interval)
+
+    def get_overhead(self):
+        """
+        Fraction of the time since the start of the rendering that was spent on display refreshes
+        """
+        elapsed = time.time() - self.start_time
+        return self.total_refresh_time / elapsed if elapsed > 0 else 0.0
+
+
+class TileOverlay(object):
+    """
+    Tile outlines of TILEPATH renders, stored as a mask with the tile state of each pixel. Only the outlines of
+    tiles whose state changed since the last refresh are redrawn, and the mask is composited onto the film in
+    one array operation. Requires numpy.
+    """
+    # Mask values, where outlines overlap the higher state is drawn on top
+    NONE, CONVERGED, NOTCONVERGED, PENDING = range(4)
+
+    colors = [
+        (0.0, 0.0, 0.0, 0.0),
+        (0.0, 1.0, 0.0, 1.0),  # green
+        (1.0, 0.0, 0.0, 1.0),  # red
+        (1.0, 1.0, 0.0, 1.0),  # yellow
+    ]
+
+    def __init__(self):
+        self.mask = None
+        self.tile_states = {}
+        self.settings = None
+        self.tile_size = 0
+        self.width = 0
+        self.height = 0
+
+    def update(self, scene, stats, width, height):
+        highlighting = scene.luxcore_tile_highlighting
+        tile_size = scene.luxcore_enginesettings.tile_size
+        settings = (width, height, tile_size, highlighting.show_converged, highlighting.show_unconverged,
+                    highlighting.show_pending)
+
+        if settings != self.settings:
+            # Start over with an empty mask
+            self.settings = settings
+            self.tile_size = tile_size
+            self.width = width
+            self.height = height
+            self.mask = numpy.zeros((height, width), dtype=numpy.uint8)
+            self.tile_states = {}
+
+        tile_types = [
+            (self.CONVERGED, 'converged', highlighting.show_converged),
+            (self.NOTCONVERGED, 'notconverged', highlighting.show_unconverged),
+            (self.PENDING, 'pending', highlighting.show_pending),
+        ]
+
+        new_states = {}
+        for state, name, show in tile_types:
+            if not show:
+                continue
+
+            count = stats.Get('stats.tilepath.tiles.%s.count' % name).GetInt()
+            if count > 0:
+                coords = stats.Get('stats.tilepath.tiles.%s.coords' % name).GetInts()
+                for i in range(count):
+                    new_states[(coords[i * 2], coords[i * 2 + 1])] = state
+
+        changed = [tile for tile in set(new_states) | set(self.tile_states)
+                   if new_states.get(tile) != self.tile_states.get(tile)]
+
+        for tile in changed:
+            self.__draw_outline(tile, self.NONE)
+
+        # Neighbour tiles share their border pixels with the changed tiles, so they are redrawn as well. The outlines
+        # are drawn with the maximum of the states, so a redrawn tile never covers the outline of a neighbour with a
+        # higher state (which is not necessarily redrawn)
+        redraw = set()
+        for x, y in changed:
+            for offset_x in (-tile_size, 0, tile_size):
+                for offset_y in (-tile_size, 0, tile_size):
+                    tile = (x + offset_x, y + offset_y)
+                    if tile in new_states:
+                        redraw.add(tile)
+
+        for tile in redraw:
+            self.__draw_outline(tile, new_states[tile], numpy.maximum)
+
+        self.tile_states = new_states
+
+    def __draw_outline(self, tile, state, combine=None):
+        """
+        Set the outline pixels of the tile to state, or to combine(current value, state) if combine is given
+        """
+        offset_x, offset_y = tile
+        width = min(self.tile_size + 1, self.width - offset_x)
+        height = min(self.tile_size + 1, self.height - offset_y)
+
+        if width <= 0 or height <= 0:
+            return
+
+        mask = self.mask
+        lines = [
+            # bottom and top lines
+            (offset_y, slice(offset_x, offset_x + width)),
+            (offset_y + height - 1, slice(offset_x, offset_x + width)),
+            # left and right sides
+            (slice(offset_y, offset_y + height), offset_x),
+            (slice(offset_y, offset_y + height), offset_x + width - 1),
+        ]
+
+        for line in lines:
+            mask[line] = state if combine is None else combine(mask[line], state)
+
+    def composite(self, framebuffer):
+        """
+        Returns a copy of the framebuffer contents with the tile outlines drawn on top
+        """
+        depth = framebuffer.depth
+        image = numpy.frombuffer(framebuffer.buffer, dtype=numpy.float32).reshape(self.height, self.width, depth)
+        colors = numpy.array(self.colors, dtype=numpy.float32)[:, :depth]
+
+        return numpy.where((self.mask != self.NONE)[:, :, numpy.newaxis], colors[self.mask], image)
+
+
+class FrameBuffer(object):
+    """
+    Float buffer for film outputs. It is allocated without a temporary Python list and reused between display
+    refreshes. The underlying array only grows, smaller films use a view on it, so resizing the film (e.g. the
+    viewport region) does not allocate a new buffer every time.
+    """
+    def __init__(self):
+        self.array = array.array('f')
+        self.buffer = None
+        self.width = 0
+        self.height = 0
+        self.depth = 0
+        self.size = 0
+
+        # Debug statistics
+        self.allocations = 0
+        self.refresh_count = 0
+        self.last_refresh_time = 0.0
+        self.refresh_start = 0.0
+
+        # None = not tested yet if the render pass supports foreach_set()
+        self.use_foreach_set = None
+        # Cached tile outlines of TILEPATH renders
+        self.tile_overlay = None
+
+    def resize(self, width, height, depth):
+        size = width * height * depth
+
+        if size == self.size and self.buffer is not None:
+            self.width, self.height, self.depth = width, height, depth
+            return
+
+        if self.buffer is not None:
+            self.buffer.release()
+
+        if size > len(self.array):
+            # Repeating a one-element array allocates the memory directly, without building a list of floats
+            self.array = array.array('f', [0.0]) * size
+            self.allocations += 1
+
+        self.buffer = memoryview(self.array)[:size]
+        self.width, self.height, self.depth = width, height, depth
+        self.size = size
+
+    def update(self, film, output_type):
+        """
+        Copy the film output into the buffer, starts the refresh time measurement
+        """
+        self.refresh_start = time.time()
+        film.GetOutputFloat(output_type, self.buffer)
+
+    def finish_refresh(self):
+        self.last_refresh_time = time.time() - self.refresh_start
+        self.refresh_count += 1
+
+    def write_to_pass(self, render_pass, convert, data=None):
+        """
+        Write the buffer (or data with the same layout, e.g. the buffer with tile outlines) to the rect of a
+        RenderPass. Uses foreach_set() if the Blender version supports it, otherwise the data is converted to a
+        list of pixel tuples with the convert function
+        """
+        if data is None:
+            data = self.buffer
+
+        if self.use_foreach_set is None:
+            self.use_foreach_set = hasattr(render_pass.rect, 'foreach_set')
+
+        if self.use_foreach_set:
+            try:
+                render_pass.rect.foreach_set(data)
+            except (TypeError, ValueError, RuntimeError):
+                # e.g. the pass has a different channel count than the film output
+                self.use_foreach_set = False
+
+        if not self.use_foreach_set:
+            render_pass.rect = convert(self.width, self.height, data)
+
+        self.finish_refresh()
+
+
 class Session(object):
     """
     Wrapper for PBRTv3Core's rendersession class.
     """
-    def __init__(self, luxcore_session):
+    def __init__(self, luxcore_session, telemetry=None):
         self.luxcore_session = luxcore_session
         self.is_active = False
+        self.telemetry = telemetry
+
+    def flush_telemetry(self):
+        if self.telemetry is not None and self.telemetry.samples:
+            self.telemetry.flush(bpy.context.scene.frame_current)
 
     def is_in_scene_edit(self):
         return self.luxcore_session.IsInSceneEdit()
@@ -2537,9 +3061,9 @@ class PBRTv3CoreSessionManager(object):
     sessions = {}
 
     @classmethod
-    def create_luxcore_session(cls, luxcore_config, space):
+    def create_luxcore_session(cls, luxcore_config, space, telemetry=None):
         # space: bpy.context.screen.areas[x].spaces[y] (areas[x].type == "VIEW_3D", spaces[y].type == "VIEW_3D")
-        cls.sessions[space] = Session(pyluxcore.RenderSession(luxcore_config))
+        cls.sessions[space] = Session(pyluxcore.RenderSession(luxcore_config), telemetry)
 
     @classmethod
     def get_session(cls, space):
@@ -2556,9 +3080,13 @@ class PBRTv3CoreSessionManager(object):
 
             if not session.is_active:
                 print('Starting viewport render')
+                start_time = time.time()
                 session.luxcore_session.Start()
                 session.is_active = True
 
+                if session.telemetry is not None:
+                    session.telemetry.add_phase('session start', time.time() - start_time)
+
     @classmethod
     def stop_luxcore_session(cls, space):
         if space in cls.sessions:
@@ -2571,6 +3099,7 @@ class PBRTv3CoreSessionManager(object):
 
                 session.luxcore_session.Stop()
                 session.luxcore_session = None
+                session.flush_telemetry()
 
                 del cls.sessions[space]
 
@@ -2602,6 +3131,7 @@ class PBRTv3CoreSessionManager(object):
 
             session.luxcore_session.Stop()
             session.luxcore_session = None
+            session.flush_telemetry()
 
             del cls.sessions[space]
 
@@ -2655,11 +3185,165 @@ def stop_viewport_render(context):
 bpy.app.handlers.scene_update_post.append(stop_viewport_render)
 
 
+class PBRTv3CoreAnimationCache(object):
+    """
+    Keeps the exporter and the luxcore scene of an animation render alive between frames (final renders only).
+    Stores the state of the last exported frame so the next frame only has to convert what changed.
+    """
+
+    exporter = None
+    scene_name = ''
+    film_size = None
+    last_frame = None
+    full_export_time = 0.0
+    matrices = {}
+    camera_matrix = None
+    visible_objects = set()
+
+    @classmethod
+    def is_valid(cls, scene, film_width, film_height):
+        # The first frame of the animation always triggers a full export
+        return (cls.exporter is not None
+                and cls.exporter.luxcore_scene is not None
+                and cls.scene_name == scene.name
+                and cls.film_size == (film_width, film_height)
+                and cls.last_frame is not None
+                and scene.frame_current > cls.last_frame
+                and scene.frame_current != scene.frame_start)
+
+    @classmethod
+    def store(cls, scene, exporter, film_width, film_height, full_export_time):
+        cls.exporter = exporter
+        cls.scene_name = scene.name
+        cls.film_size = (film_width, film_height)
+        cls.full_export_time = full_export_time
+        cls.visible_objects = {ob for ob in scene.objects if is_obj_visible(scene, ob)}
+        cls.update(scene)
+
+    @classmethod
+    def update(cls, scene):
+        cls.last_frame = scene.frame_current
+        cls.matrices = {get_elem_key(ob): ob.matrix_world.copy() for ob in cls.visible_objects}
+        cls.camera_matrix = scene.camera.matrix_world.copy() if scene.camera is not None else None
+
+        if scene.frame_current + scene.frame_step > scene.frame_end:
+            # Last frame of the animation, free the memory of the luxcore scene
+            cls.reset()
+
+    @classmethod
+    def reset(cls):
+        cls.exporter = None
+        cls.scene_name = ''
+        cls.film_size = None
+        cls.last_frame = None
+        cls.full_export_time = 0.0
+        cls.matrices = {}
+        cls.camera_matrix = None
+        cls.visible_objects = set()
+
+    @classmethod
+    def camera_changed(cls, scene):
+        """
+        Checks if the view of the scene camera changed since the last exported frame
+        """
+        camera = scene.camera
+        return camera is None or cls.camera_matrix != camera.matrix_world or has_animation_data(camera.data)
+
+
+# Modifiers that can change the mesh from frame to frame without the mesh datablock being animated
+ANIMATED_MODIFIER_TYPES = {
+    'ARMATURE', 'CAST', 'CLOTH', 'CURVE', 'DYNAMIC_PAINT', 'EXPLODE', 'FLUID_SIMULATION', 'HOOK', 'LATTICE',
+    'MESH_CACHE', 'MESH_DEFORM', 'MESH_SEQUENCE_CACHE', 'OCEAN', 'SHRINKWRAP', 'SOFT_BODY', 'SURFACE_DEFORM',
+    'WARP', 'WAVE',
+}
+
+
+def has_animation_data(id_data):
+    return id_data is not None and id_data.animation_data is not None and (
+        id_data.animation_data.action is not None or len(id_data.animation_data.drivers) > 0)
+
+
+def is_animated_object(ob):
+    """
+    Checks if the transformation of the object (or one of its parents) is animated
+    """
+    while ob is not None:
+        if has_animation_data(ob) or ob.constraints:
+            return True
+        ob = ob.parent
+    return False
+
+
+def is_deforming_object(ob):
+    """
+    Checks if the mesh of the object can change from frame to frame
+    """
+    if ob.data is None:
+        return False
+
+    if has_animation_data(ob.data) or (hasattr(ob.data, 'shape_keys') and has_animation_data(ob.data.shape_keys)):
+        return True
+
+    for modifier in ob.modifiers:
+        if modifier.show_render and modifier.type in ANIMATED_MODIFIER_TYPES:
+            return True
+
+    # Animated modifier settings (e.g. an animated displace strength)
+    if has_animation_data(ob):
+        action = ob.animation_data.action
+        fcurves = list(action.fcurves) if action else []
+        fcurves.extend(ob.animation_data.drivers)
+
+        for fcurve in fcurves:
+            if fcurve.data_path.startswith('modifiers'):
+                return True
+
+    return False
+
+
+def is_animated_texture(tex):
+    if has_animation_data(tex):
+        return True
+
+    return tex.type == 'IMAGE' and tex.image is not None and tex.image.source in {'SEQUENCE', 'MOVIE'}
+
+
+def is_animated_material(mat):
+    if has_animation_data(mat):
+        return True
+
+    nodetree_name = mat.pbrtv3_material.nodetree
+    if nodetree_name and nodetree_name in bpy.data.node_groups:
+        return has_animation_data(bpy.data.node_groups[nodetree_name])
+
+    return False
+
+
+def get_multicam_views(scene):
+    """
+    Returns the cameras to render in multi-camera mode, falls back to the scene camera
+    """
+    if scene.luxcore_translatorsettings.multicam_cameras == 'markers':
+        cameras = []
+        for marker in sorted(scene.timeline_markers, key=lambda m: m.frame):
+            if marker.camera is not None and marker.camera not in cameras:
+                cameras.append(marker.camera)
+    else:
+        others = [ob for ob in scene.objects if ob.type == 'CAMERA' and ob != scene.camera and is_obj_visible(scene, ob)]
+        cameras = [scene.camera] + sorted(others, key=lambda ob: ob.name)
+
+    return cameras if cameras else [scene.camera]
+
+
 class UpdateChanges(object):
     def __init__(self):
         self.changed_objects_transform = set()
         self.changed_objects_mesh = set()
         self.changed_materials = set()
+        # Node materials that were already converted by the update check and their changed properties
+        self.updated_node_materials = set()
+        self.material_properties = None
+        self.changed_duplicators = set()
         self.removed_objects = set()
 
         self.cause_unknown = True
@@ -2726,6 +3410,12 @@ class UpdateChanges(object):
         if haltconditions is not None:
             self.cause_haltconditions = haltconditions
 
+    def add_material_properties(self, properties):
+        if self.material_properties is None:
+            self.material_properties = pyluxcore.Properties()
+
+        self.material_properties.Set(properties)
+
     def print_updates(self):
         print('===== Realtime update information: =====')
 
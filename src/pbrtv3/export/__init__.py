@@ -24,14 +24,21 @@
 #
 # ***** END GPL LICENCE BLOCK *****
 #
-import collections, math, os, sys
+import array, collections, math, os, sys
 
 import bpy, mathutils
 
+try:
+    import numpy
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 from ..extensions_framework import util as efutil
 
 from ..outputs import PBRTv3Manager, PBRTv3Log
 from ..util import bencode_file2string_with_size
+from .texture_pyramid import TexturePyramid
 
 
 class ExportProgressThread(efutil.TimerThread):
@@ -83,14 +90,67 @@ class ExportCache(object):
             raise Exception('Item %s not found in %s!' % (ck, self.name))
 
 
+# Parameter types with numeric values, lists of them are stored in compact arrays
+NUMERIC_PARAM_TYPES = {'float', 'integer', 'point', 'normal', 'vector', 'color'}
+
+
+def compact_value(param_type, value):
+    """
+    Returns numeric lists as array.array (8 byte floats or 4/8 byte integers instead of a Python object per
+    element), so large mesh and volume paramsets need a fraction of the memory. Other values are returned unchanged.
+    """
+    if param_type not in NUMERIC_PARAM_TYPES or isinstance(value, array.array):
+        return value
+
+    if NUMPY_AVAILABLE and isinstance(value, numpy.ndarray):
+        if param_type == 'integer':
+            return array.array('q', value.astype(numpy.int64).ravel().tobytes())
+        return array.array('d', value.astype(numpy.float64).ravel().tobytes())
+
+    if type(value) not in (list, tuple):
+        return value
+
+    try:
+        if param_type == 'integer':
+            try:
+                return array.array('i', value)
+            except OverflowError:
+                return array.array('q', value)
+
+        return array.array('d', value)
+    except TypeError:
+        # Nested or non-numeric lists are kept as they are
+        return value
+
+
 class ParamSetItem(list):
+    """
+    One parameter, a list of the type and name token and the value (the format pylux expects)
+    """
+    __slots__ = ('type', 'name')
+
     WRAP_WIDTH = 100
 
     def __init__(self, *args):
-        self.type, self.name, self.value = args
-        self.type_name = "%s %s" % (self.type, self.name)
-        self.append(self.type_name)
-        self.append(self.value)
+        self.type, self.name, value = args
+        super().__init__(("%s %s" % (self.type, self.name), compact_value(self.type, value)))
+
+    @property
+    def type_name(self):
+        return self[0]
+
+    @property
+    def value(self):
+        return self[1]
+
+    def get_native_value(self):
+        """
+        The value with compact arrays converted back to lists (for pylux and JSON)
+        """
+        if isinstance(self.value, array.array):
+            return self.value.tolist()
+
+        return self.value
 
     def getSize(self, vl=None):
         sz = 0
@@ -99,6 +159,11 @@ class ParamSetItem(list):
             vl = self.value
             sz += 100  # Rough overhead for encoded paramset item
 
+            if isinstance(vl, array.array):
+                if vl.typecode == 'd':
+                    return sz + 14 * len(vl)
+                return sz + sum(len(str(abs(v))) for v in vl)
+
         if type(vl) in (list, tuple):
             for v in vl:
                 sz += self.getSize(vl=v)
@@ -130,21 +195,22 @@ class ParamSetItem(list):
                     s += ' '.join(['%i' % i for i in lst[(row * cnt):(row + 1) * cnt]]) + '\n'
         else:
             if type == 'f':
-                s = ' '.join(['%0.15f' % i for i in lst])
+                s = ' '.join(map('%0.15f'.__mod__, lst))
             elif type == 'i':
-                s = ' '.join(['%i' % i for i in lst])
+                s = ' '.join(map('%i'.__mod__, lst))
         return s
 
     def to_string(self):
         fs_num = '"%s %s" [%s]'
         fs_str = '"%s %s" ["%s"]'
+        is_list = type(self.value) in (list, tuple, array.array)
 
-        if self.type == "float" and type(self.value) in (list, tuple):
+        if self.type == "float" and is_list:
             lst = self.list_wrap(self.value, self.WRAP_WIDTH, 'f')
             return fs_num % ('float', self.name, lst)
         if self.type == "float":
             return fs_num % ('float', self.name, '%0.15f' % self.value)
-        if self.type == "integer" and type(self.value) in (list, tuple):
+        if self.type == "integer" and is_list:
             lst = self.list_wrap(self.value, self.WRAP_WIDTH, 'i')
             return fs_num % ('integer', self.name, lst)
         if self.type == "integer":
@@ -177,10 +243,17 @@ class ParamSetItem(list):
 
 
 class ParamSet(list):
+    __slots__ = ('index', 'item_sizes')
+
     def __init__(self):
-        self.names = []
+        # {name: position of the item in the list}, a parameter added again replaces the item at its position
+        self.index = {}
         self.item_sizes = {}
 
+    @property
+    def names(self):
+        return list(self.index)
+
     def increase_size(self, param_name, sz):
         self.item_sizes[param_name] = sz
 
@@ -194,21 +267,27 @@ class ParamSet(list):
                 sz += p.getSize()
         return sz
 
+    def to_native(self):
+        """
+        A plain copy of the parameters with compact arrays converted back to lists (for pylux)
+        """
+        return [[p.type_name, p.get_native_value()] for p in self]
+
     def update(self, other):
         for p in other:
             self.add(p.type, p.name, p.value)
         return self
 
     def add(self, type, name, value):
-        if name in self.names:
-            for p in self:
-                if p.name == name:
-                    self.remove(p)
-
-        self.append(
-            ParamSetItem(type, name, value)
-        )
-        self.names.append(name)
+        item = ParamSetItem(type, name, value)
+        position = self.index.get(name)
+
+        if position is None:
+            self.index[name] = len(self)
+            self.append(item)
+        else:
+            self[position] = item
+
         return self
 
     def add_float(self, name, value):
@@ -251,13 +330,88 @@ class ParamSet(list):
         return self
 
 
+def layer_mask(layers):
+    """
+    Returns the layers (sequence of bools) as integer bitmask
+    """
+    mask = 0
+    for i, layer in enumerate(layers):
+        if layer:
+            mask |= 1 << i
+    return mask
+
+
+def scene_layer_mask(scene):
+    """
+    Returns the bitmask of layers that are enabled in the scene and in the active render layer
+    """
+    return layer_mask(scene.layers) & layer_mask(scene.render.layers.active.layers)
+
+
+class VisibilityIndex(object):
+    """
+    Layer bitmasks of the scene and the objects, cached during an export so is_obj_visible() only has to AND two
+    integers instead of zipping the layer tuples for every object, dupli instance and light.
+
+    Usage:
+        VisibilityIndex.begin(scene)
+        try:
+            ...
+        finally:
+            VisibilityIndex.end()
+
+    The index is invalidated at the end of the outermost export, and when begin() is called for another scene
+    or with changed scene/render layers. Outside of an export, visibility is computed directly.
+    """
+    depth = 0
+    scene_pointer = None
+    scene_mask = 0
+    object_masks = {}
+
+    @classmethod
+    def begin(cls, scene):
+        scene_mask = scene_layer_mask(scene)
+
+        if scene.as_pointer() != cls.scene_pointer or scene_mask != cls.scene_mask:
+            cls.invalidate()
+            cls.scene_pointer = scene.as_pointer()
+            cls.scene_mask = scene_mask
+
+        cls.depth += 1
+
+    @classmethod
+    def end(cls):
+        cls.depth = max(cls.depth - 1, 0)
+
+        if cls.depth == 0:
+            cls.invalidate()
+
+    @classmethod
+    def invalidate(cls):
+        cls.scene_pointer = None
+        cls.scene_mask = 0
+        cls.object_masks = {}
+
+    @classmethod
+    def is_on_visible_layer(cls, scene, obj):
+        if scene.as_pointer() != cls.scene_pointer:
+            return (layer_mask(obj.layers) & scene_layer_mask(scene)) != 0
+
+        mask = cls.object_masks.get(obj)
+
+        if mask is None:
+            mask = cls.object_masks[obj] = layer_mask(obj.layers)
+
+        return (mask & cls.scene_mask) != 0
+
+
 def is_obj_visible(scene, obj, is_dupli=False, is_viewport_render=False):
     hidden = obj.hide if is_viewport_render else obj.hide_render
 
-    ov = False
-    for lv in [ol and sl and rl for ol, sl, rl in zip(obj.layers, scene.layers, scene.render.layers.active.layers)]:
-        ov |= lv
-    return (ov or is_dupli) and not hidden
+    if hidden:
+        return False
+
+    return is_dupli or VisibilityIndex.is_on_visible_layer(scene, obj)
 
 
 def get_worldscale(as_scalematrix=True):
@@ -283,14 +437,75 @@ def get_worldscale(as_scalematrix=True):
         return ws
 
 
-def object_anim_matrices(scene, obj, steps=1):
+class MotionSampler(object):
+    """
+    Samples the world matrices of many objects at the motion blur steps of the current frame.
+    Every frame_set() call re-evaluates the whole scene, so instead of calling object_anim_matrices() for each
+    object (objects * steps scene evaluations), sample() calls frame_set() only once per step for all objects.
+    """
+
+    def __init__(self, scene, steps):
+        self.scene = scene
+        self.steps = steps
+        # {object: list of matrices (empty if not animated)}
+        self.matrices = {}
+
+    def sample(self, objects):
+        objects = [obj for obj in set(objects) if obj not in self.matrices]
+
+        if not objects:
+            return
+
+        scene = self.scene
+        old_sf = scene.frame_subframe
+        cur_frame = scene.frame_current
+
+        # The 16 matrix values of all steps, per object
+        values = {obj: array.array('d') for obj in objects}
+
+        for i in range(0, self.steps + 1):
+            scene.frame_set(cur_frame, subframe=i / float(self.steps))
+
+            for obj, obj_values in values.items():
+                for row in obj.matrix_world:
+                    obj_values.extend(row)
+
+        # restore subframe value
+        scene.frame_set(cur_frame, old_sf)
+
+        for obj, obj_values in values.items():
+            # The object is animated if any step differs from the first one
+            if obj_values == obj_values[:16] * (self.steps + 1):
+                self.matrices[obj] = []
+            else:
+                self.matrices[obj] = [mathutils.Matrix([obj_values[j:j + 4] for j in range(i, i + 16, 4)])
+                                      for i in range(0, len(obj_values), 16)]
+
+    def get(self, obj, steps):
+        """
+        Returns the sampled matrices of the object, or None if the object was not sampled with this number of steps
+        """
+        if steps != self.steps:
+            return None
+
+        return self.matrices.get(obj)
+
+
+def object_anim_matrices(scene, obj, steps=1, sampler=None):
     """
     steps		Number of interpolation steps per frame
+    sampler		Optional MotionSampler with precomputed matrices
 
     Returns a list of animated matrices for the object, with the given number of
     per-frame interpolation steps.
     The number of matrices returned is at most steps+1.
     """
+    if sampler is not None:
+        matrices = sampler.get(obj, steps)
+
+        if matrices is not None:
+            return matrices
+
     old_sf = scene.frame_subframe
     cur_frame = scene.frame_current
 
@@ -380,13 +595,18 @@ def get_expanded_file_name(obj, file_path):
     return bpy.path.abspath(file_path), file_basename
 
 
-def process_filepath_data(scene, obj, file_path, paramset, parameter_name):
+def process_filepath_data(scene, obj, file_path, paramset, parameter_name, is_image=False):
     file_basename = os.path.basename(file_path)
     library_filepath = obj.library.filepath if (hasattr(obj, 'library') and obj.library) else ''
     file_library_path = efutil.filesystem_path(bpy.path.abspath(file_path, library_filepath))
     file_relative = efutil.filesystem_path(file_library_path) if (
         hasattr(obj, 'library') and obj.library) else efutil.filesystem_path(file_path)
 
+    if is_image:
+        # Use the downscaled copy if texture pyramids are enabled
+        file_relative = TexturePyramid.resolve(scene, file_relative)
+        file_basename = os.path.basename(file_relative)
+
     if scene.pbrtv3_engine.allow_file_embed():
         paramset.add_string(parameter_name, file_basename)
         encoded_data, encoded_size = bencode_file2string_with_size(file_relative)
@@ -0,0 +1,197 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import mathutils
+
+from ..export import object_anim_matrices
+
+
+def object_bounds(obj):
+    """
+    Returns the center and radius of the bounding sphere of the object's bounding box, in object space
+    """
+    corners = [mathutils.Vector(corner) for corner in obj.bound_box]
+    center = sum(corners, mathutils.Vector()) / 8
+    radius = max((corner - center).length for corner in corners)
+    return center, radius
+
+
+def transform_bounds(bounds, matrix):
+    """
+    Returns the world space center and radius of a bounding sphere from object_bounds()
+    """
+    local_center, local_radius = bounds
+    scale = max(matrix.col[0].xyz.length, matrix.col[1].xyz.length, matrix.col[2].xyz.length)
+    return matrix * local_center, local_radius * scale
+
+
+class CameraFrustum(object):
+    """
+    View frustum of a perspective or orthographic camera at one camera transformation, in camera space
+    (the camera looks along -Z). The frame is widened by margin (fraction of the frame size).
+    """
+
+    def __init__(self, scene, camera, matrix_world, margin):
+        self.world_to_camera = matrix_world.inverted()
+        self.is_ortho = camera.data.type == 'ORTHO'
+
+        frame = camera.data.view_frame(scene=scene)
+        scale = 1 + margin
+        corners = [mathutils.Vector((v.x * scale, v.y * scale, v.z)) for v in frame]
+
+        # Half width of the unwidened frame at depth self.depth, used for the projected size
+        self.half_width = max(abs(v.x) for v in frame)
+        self.depth = abs(frame[0].z)
+
+        render = scene.render
+        self.resolution_x = render.resolution_x * render.resolution_percentage / 100
+
+        # Planes as (normal, offset), a point p is inside if normal.dot(p) + offset >= 0
+        self.planes = []
+
+        for i in range(4):
+            a = corners[i]
+            b = corners[(i + 1) % 4]
+
+            if self.is_ortho:
+                # The side planes are parallel to the view direction
+                edge = b - a
+                normal = edge.cross(mathutils.Vector((0, 0, -1))).normalized()
+                offset = -normal.dot(a)
+            else:
+                # The side planes go through the camera position
+                normal = a.cross(b).normalized()
+                offset = 0.0
+
+            # Orient the normal towards the center of the frame
+            if normal.dot(mathutils.Vector((0, 0, -self.depth))) + offset < 0:
+                normal = -normal
+                offset = -offset
+
+            self.planes.append((normal, offset))
+
+        if not self.is_ortho:
+            # Nothing behind the camera
+            self.planes.append((mathutils.Vector((0, 0, -1)), 0.0))
+
+    def test(self, center, radius, min_size):
+        """
+        Returns 0 if the bounding sphere is (partially) inside the frustum and at least min_size pixels wide,
+        1 if it is outside of the frustum, 2 if it is too small
+        """
+        p = self.world_to_camera * center
+
+        for normal, offset in self.planes:
+            if normal.dot(p) + offset < -radius:
+                return 1
+
+        if min_size > 0 and self.projected_size(p, radius) < min_size:
+            return 2
+
+        return 0
+
+    def projected_size(self, p, radius):
+        """
+        Returns the projected diameter in pixels of a sphere at the camera space position p
+        """
+        # Spheres that contain the camera cover the whole frame
+        if p.length <= radius:
+            return float('inf')
+
+        if self.is_ortho:
+            pixels_per_unit = self.resolution_x / (2 * self.half_width)
+        else:
+            distance = max(-p.z, 1e-6)
+            pixels_per_unit = self.resolution_x * self.depth / (2 * self.half_width * distance)
+
+        return 2 * radius * pixels_per_unit
+
+
+class DupliCuller(object):
+    """
+    Culls dupli/particle instances whose bounding box is outside of the camera frustum (widened by a margin,
+    so objects visible in reflections or contributing GI close to the frame are kept) or whose projected size
+    is smaller than a minimum number of pixels.
+
+    With camera motion blur, an instance is only culled if it is culled at every motion step.
+    The bounding box is tested as bounding sphere, which is conservative.
+    """
+
+    def __init__(self, scene, camera, margin, min_size, motion_sampler=None):
+        self.min_size = min_size
+        self.frustum_culled = 0
+        self.size_culled = 0
+        # {object name: (local bounding box center, radius)}
+        self.bounds = {}
+
+        lux_camera = camera.data.pbrtv3_camera
+        matrices = []
+
+        if lux_camera.usemblur and lux_camera.cammblur:
+            matrices = object_anim_matrices(scene, camera, lux_camera.motion_blur_samples, sampler=motion_sampler)
+
+        if not matrices:
+            matrices = [camera.matrix_world]
+
+        self.frusta = [CameraFrustum(scene, camera, matrix, margin) for matrix in matrices]
+
+    @classmethod
+    def from_settings(cls, scene, camera, motion_sampler=None):
+        """
+        Returns a culler configured by the scene's translator settings, or None if culling is disabled or not
+        possible with this camera
+        """
+        settings = scene.luxcore_translatorsettings
+
+        if not settings.cull_duplis or camera is None or camera.data.type == 'PANO':
+            return None
+
+        # All cameras share one export
+        if settings.multicam_render:
+            return None
+
+        return cls(scene, camera, settings.cull_margin / 100, settings.cull_min_size, motion_sampler)
+
+    def is_culled(self, obj, matrix):
+        bounds = self.bounds.get(obj.name)
+        if bounds is None:
+            bounds = self.bounds[obj.name] = object_bounds(obj)
+
+        center, radius = transform_bounds(bounds, matrix)
+
+        too_small = False
+
+        for frustum in self.frusta:
+            result = frustum.test(center, radius, self.min_size)
+
+            if result == 0:
+                return False
+
+            too_small |= result == 2
+
+        if too_small:
+            self.size_culled += 1
+        else:
+            self.frustum_culled += 1
+
+        return True
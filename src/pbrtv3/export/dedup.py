@@ -0,0 +1,263 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import array
+import hashlib
+import os
+
+from ..outputs import PBRTv3Log
+
+
+def _add_buffer(digest, collection, attr, typecode, size):
+    if size == 0:
+        return
+
+    buffer = array.array(typecode, [0]) * size
+    collection.foreach_get(attr, buffer)
+    digest.update(buffer.tobytes())
+
+
+def mesh_fingerprint(mesh):
+    """
+    Returns a fingerprint of the evaluated geometry of a mesh (with tessfaces): vertex count, face count and a hash
+    of the vertex coordinates/normals, the faces (vertex indices, material indices, smooth flags), the active UV
+    layer and the active vertex color layer. Meshes with equal fingerprints can share one exported shape.
+    """
+    vertex_count = len(mesh.vertices)
+    face_count = len(mesh.tessfaces)
+    digest = hashlib.sha1()
+
+    _add_buffer(digest, mesh.vertices, 'co', 'f', vertex_count * 3)
+    _add_buffer(digest, mesh.vertices, 'normal', 'f', vertex_count * 3)
+    _add_buffer(digest, mesh.tessfaces, 'vertices_raw', 'i', face_count * 4)
+    _add_buffer(digest, mesh.tessfaces, 'material_index', 'i', face_count)
+    _add_buffer(digest, mesh.tessfaces, 'use_smooth', 'i', face_count)
+
+    uv_layer = mesh.tessface_uv_textures.active
+    if uv_layer and uv_layer.data:
+        _add_buffer(digest, uv_layer.data, 'uv_raw', 'f', face_count * 8)
+
+    vertex_color = mesh.tessface_vertex_colors.active
+    if vertex_color:
+        for attr in ('color1', 'color2', 'color3', 'color4'):
+            _add_buffer(digest, vertex_color.data, attr, 'f', face_count * 3)
+
+    return vertex_count, face_count, digest.hexdigest()
+
+
+def estimate_mesh_size(mesh):
+    """
+    Rough size in bytes of the triangle mesh the renderer creates from a mesh: position and normal per vertex,
+    plus uv/color if present, and 3 indices per triangle (quads are split into two triangles)
+    """
+    vertex_bytes = 24
+    if mesh.tessface_uv_textures.active:
+        vertex_bytes += 8
+    if mesh.tessface_vertex_colors.active:
+        vertex_bytes += 12
+
+    face_count = len(mesh.tessfaces)
+    fourth_indices = array.array('i', [0]) * (face_count * 4)
+    if face_count:
+        mesh.tessfaces.foreach_get('vertices_raw', fourth_indices)
+    quad_count = sum(1 for index in fourth_indices[3::4] if index != 0)
+
+    return len(mesh.vertices) * vertex_bytes + (face_count + quad_count) * 12
+
+
+class GeometryIndex(object):
+    """
+    Maps geometry fingerprints (see mesh_fingerprint()) to the first exported shape with this geometry,
+    so identical meshes in separate datablocks (e.g. from CAD/FBX imports) are only exported once and shared
+    by instancing. Also counts the bytes saved by the reuse for the export report.
+
+    If the items are added and found with a user (e.g. the mesh key of the exporter), the index keeps track of the
+    key each user currently uses. When the geometry of a user changes (incremental animation export) and no other
+    user is left for its previous key, that item is forgotten and returned by pop_released(), so the caller can
+    delete it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        # {key: (item, size)}
+        self.items = {}
+        # {key: set of users}
+        self.users = {}
+        # {user: key}
+        self.user_keys = {}
+        # Items that lost their last user
+        self.released = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.unique_count = 0
+        self.duplicate_count = 0
+        self.saved_bytes = 0
+
+    def find(self, key, user=None):
+        """
+        Returns the item stored for this key (and counts it as reused), or None
+        """
+        entry = self.items.get(key)
+
+        if entry is None:
+            return None
+
+        item, size = entry
+
+        if user is None or self.user_keys.get(user) != key:
+            self.duplicate_count += 1
+            self.saved_bytes += size
+            self.__use(key, user)
+
+        return item
+
+    def add(self, key, item, size=0, user=None):
+        self.items[key] = (item, size)
+        self.unique_count += 1
+        self.__use(key, user)
+
+    def pop_released(self):
+        """
+        Returns the items that are no longer used by any user and clears the list
+        """
+        released = self.released
+        self.released = []
+        return released
+
+    def __use(self, key, user):
+        if user is None:
+            return
+
+        previous_key = self.user_keys.get(user)
+        self.user_keys[user] = key
+        self.users.setdefault(key, set()).add(user)
+
+        if previous_key is None or previous_key == key:
+            return
+
+        previous_users = self.users[previous_key]
+        previous_users.discard(user)
+
+        if not previous_users:
+            del self.users[previous_key]
+            item, size = self.items.pop(previous_key)
+            self.released.append(item)
+
+    def report(self, unit='memory'):
+        if self.duplicate_count == 0:
+            return
+
+        PBRTv3Log('%s: %d duplicate meshes share the geometry of %d unique meshes, ~%.2f MiB %s saved'
+                  % (self.name, self.duplicate_count, self.unique_count, self.saved_bytes / (1024 * 1024), unit))
+
+
+def definition_fingerprint(properties):
+    """
+    Returns a fingerprint of the PBRTv3Core materials/textures defined by a properties object, independent of their
+    names: the names of the defined elements are replaced by their position in the properties (in properties and
+    in references between them), and image file paths are resolved, so copies like 'Wood' and 'Wood.001', or images
+    in different datablocks pointing to the same file, give the same fingerprint.
+    Also returns the number of properties and the number of image files.
+    """
+    names = properties.GetAllNames()
+
+    # {element name: placeholder}
+    placeholders = {}
+    for name in names:
+        parts = name.split('.', 3)
+        if len(parts) > 3 and parts[0] == 'scene' and parts[1] in ('materials', 'textures'):
+            placeholders.setdefault(parts[2], '$%d' % len(placeholders))
+
+    canonical = []
+    image_count = 0
+
+    for name in names:
+        parts = name.split('.', 3)
+        if len(parts) > 3 and parts[2] in placeholders:
+            parts[2] = placeholders[parts[2]]
+
+        is_file = name.endswith('.file')
+        image_count += is_file
+
+        values = []
+        for value in properties.Get(name).Get():
+            if isinstance(value, str):
+                if is_file:
+                    value = os.path.normcase(os.path.realpath(value))
+                else:
+                    value = placeholders.get(value, value)
+            values.append(value)
+
+        canonical.append(repr(('.'.join(parts), values)))
+
+    canonical.sort()
+    return hashlib.sha1('\n'.join(canonical).encode()).hexdigest(), len(names), image_count
+
+
+class DefinitionIndex(object):
+    """
+    Maps definition fingerprints (see definition_fingerprint()) to the name of the first exported material or
+    texture with this definition, so duplicates are not defined again but use the first one
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        # {fingerprint: luxcore name}
+        self.items = {}
+        self.unique_count = 0
+        self.duplicate_count = 0
+        self.saved_properties = 0
+        self.saved_images = 0
+
+    def deduplicate(self, exporter, properties):
+        """
+        Returns the properties to define for a converted material/texture exporter. If an identical definition
+        was already exported, the exporter is redirected to its name and nothing needs to be defined.
+        """
+        key, property_count, image_count = definition_fingerprint(properties)
+        luxcore_name = self.items.get(key)
+
+        if luxcore_name is None:
+            self.items[key] = exporter.luxcore_name
+            self.unique_count += 1
+            return properties
+
+        exporter.luxcore_name = luxcore_name
+        exporter.properties = properties.__class__()
+
+        self.duplicate_count += 1
+        self.saved_properties += property_count
+        self.saved_images += image_count
+        return exporter.properties
+
+    def report(self):
+        if self.duplicate_count == 0:
+            return
+
+        PBRTv3Log('%s: %d duplicates share the definitions of %d unique ones, %d scene properties and %d image '
+                  'loads saved' % (self.name, self.duplicate_count, self.unique_count, self.saved_properties,
+                                   self.saved_images))
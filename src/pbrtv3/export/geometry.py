@@ -32,14 +32,17 @@ from bpy.app.handlers import persistent
 from ..extensions_framework import util as efutil
 
 from ..outputs import PBRTv3Log
+from ..outputs.logger import PBRTv3Logger
 from ..outputs.file_api import Files
-from ..export import ParamSet, ExportProgressThread, ExportCache, object_anim_matrices
+from ..export import ParamSet, ExportProgressThread, ExportCache, MotionSampler, object_anim_matrices
 from ..export import matrix_to_list
 from ..export import fix_matrix_order
-from ..export.materials import get_material_volume_defs
+from ..export.materials import MaterialRegistry
 from ..export import PBRTv3Manager
 from ..export import is_obj_visible
-from ..properties import find_node
+from ..export.dedup import GeometryIndex, mesh_fingerprint
+from ..export.lod import LODManager
+from ..export.profiler import ExportProfiler, profiled
 from ..properties.node_material import pbrtv3_texture_maker
 
 
@@ -74,6 +77,18 @@ class GeometryExporter(object):
         self.ExportedPLYs = ExportCache('ExportedPLYs')
         self.AnimationDataCache = ExportCache('AnimationData')
         self.ExportedObjectsDuplis = ExportCache('ExportedObjectsDuplis')
+        # Precomputed motion blur matrices, see sample_motion()
+        self.motion_sampler = None
+
+        # Shares the shape definitions of meshes with identical geometry, see dedup_key()
+        if visibility_scene.pbrtv3_engine.dedup_meshes:
+            self.geometry_index = GeometryIndex('Mesh deduplication')
+        else:
+            self.geometry_index = None
+
+        # Levels of detail for dupli/particle instances, see buildLODMeshes()
+        self.lod_manager = LODManager.from_settings(visibility_scene)
+        self.ExportedLODs = ExportCache('ExportedLODs')
 
         # start fresh
         GeometryExporter.NewExportedObjects = set()
@@ -107,6 +122,7 @@ class GeometryExporter(object):
         self.valid_particles_callbacks = self.callbacks['particles'].keys()
         self.valid_objects_callbacks = self.callbacks['objects'].keys()
 
+    @profiled('mesh', element_arg=1)
     def buildMesh(self, obj):
         """
         Decide which mesh format to output, if any, since the given object
@@ -186,6 +202,8 @@ class GeometryExporter(object):
             if mesh is None:
                 raise UnexportableObjectException('Cannot create render/export mesh')
 
+            fingerprint = self.dedup_fingerprint(obj, mesh)
+
             # Collate faces by mat index
             ffaces_mats = {}
             mesh_faces = mesh.tessfaces
@@ -216,6 +234,15 @@ class GeometryExporter(object):
                         mesh_definitions.append(self.ExportedMeshes.get(mesh_cache_key))
                         continue
 
+                    dedup_key = self.dedup_key(obj, fingerprint, i)
+                    if dedup_key is not None:
+                        shared_definition = self.geometry_index.find(dedup_key)
+
+                        if shared_definition is not None:
+                            mesh_definitions.append(shared_definition)
+                            self.ExportedMeshes.add(mesh_cache_key, shared_definition)
+                            continue
+
                     # Put PLY files in frame-numbered subfolders to avoid
                     # clobbering when rendering animations
                     sc_fr = '%s/%s/%s/%05d' % (
@@ -422,9 +449,11 @@ class GeometryExporter(object):
                             del co_no_uv_vc_cache
                             del face_vert_indices
 
-                        PBRTv3Log('Binary PLY file written: %s' % ply_path)
+                        PBRTv3Logger.count('ply')
+                        PBRTv3Logger.debug('ply', 'Binary PLY file written: %s', ply_path)
                     else:
-                        PBRTv3Log('Skipping already exported PLY: %s' % mesh_name)
+                        PBRTv3Logger.count('ply skipped')
+                        PBRTv3Logger.debug('ply', 'Skipping already exported PLY: %s', mesh_name)
 
                     # Export the shape definition to LXO
                     shape_params = ParamSet().add_string('filename', efutil.path_relative_to_export(ply_path))
@@ -440,14 +469,17 @@ class GeometryExporter(object):
                         self.exportShapeDefinition(obj, mesh_definition)
                         self.ExportedMeshes.add(mesh_cache_key, mesh_definition)
 
+                    if dedup_key is not None:
+                        self.geometry_index.add(dedup_key, mesh_definition, os.path.getsize(ply_path))
+
                 except InvalidGeometryException as err:
-                    PBRTv3Log('Mesh export failed, skipping this mesh: %s' % err)
+                    PBRTv3Log('Mesh export failed, skipping this mesh: %s' % err, category='mesh')
 
             del ffaces_mats
             bpy.data.meshes.remove(mesh, do_unlink=False)
 
         except UnexportableObjectException as err:
-            PBRTv3Log('Object export failed, skipping this object: %s' % err)
+            PBRTv3Log('Object export failed, skipping this object: %s' % err, category='object')
 
         return mesh_definitions
 
@@ -466,6 +498,8 @@ class GeometryExporter(object):
             if mesh is None:
                 raise UnexportableObjectException('Cannot create render/export mesh')
 
+            fingerprint = self.dedup_fingerprint(obj, mesh)
+
             # collate faces by mat index
             ffaces_mats = {}
             mesh_faces = mesh.tessfaces
@@ -497,6 +531,15 @@ class GeometryExporter(object):
                         mesh_definitions.append(self.ExportedMeshes.get(mesh_cache_key))
                         continue
 
+                    dedup_key = self.dedup_key(obj, fingerprint, i)
+                    if dedup_key is not None:
+                        shared_definition = self.geometry_index.find(dedup_key)
+
+                        if shared_definition is not None:
+                            mesh_definitions.append(shared_definition)
+                            self.ExportedMeshes.add(mesh_cache_key, shared_definition)
+                            continue
+
                     # mesh_name must start with mesh data name to match with portals
                     mesh_name = '%s-%s_m%03d' % (obj.data.name, self.geometry_scene.name, i)
 
@@ -600,17 +643,49 @@ class GeometryExporter(object):
                         self.exportShapeDefinition(obj, mesh_definition)
                         self.ExportedMeshes.add(mesh_cache_key, mesh_definition)
 
+                    if dedup_key is not None:
+                        self.geometry_index.add(dedup_key, mesh_definition, shape_params.getSize())
+
                 except InvalidGeometryException as err:
-                    PBRTv3Log('Mesh export failed, skipping this mesh: %s' % err)
+                    PBRTv3Log('Mesh export failed, skipping this mesh: %s' % err, category='mesh')
 
             del ffaces_mats
             bpy.data.meshes.remove(mesh, do_unlink=False)
 
         except UnexportableObjectException as err:
-            PBRTv3Log('Object export failed, skipping this object: %s' % err)
+            PBRTv3Log('Object export failed, skipping this object: %s' % err, category='object')
 
         return mesh_definitions
 
+    def dedup_fingerprint(self, obj, mesh):
+        """
+        Returns the geometry fingerprint of the export mesh if mesh deduplication is enabled and possible for this
+        object (only instanced meshes can be shared, portals need their own definition), else None
+        """
+        if self.geometry_index is None or not self.allow_instancing(obj):
+            return None
+
+        if obj.type == 'MESH' and obj.data.pbrtv3_mesh.portal:
+            return None
+
+        return mesh_fingerprint(mesh)
+
+    def dedup_key(self, obj, fingerprint, material_index):
+        """
+        Key of a mesh part in the geometry index. Besides the geometry it contains the mesh parameters (e.g.
+        subdivision) and the material, because emission is part of the shape definition.
+        """
+        if fingerprint is None:
+            return None
+
+        try:
+            material = obj.material_slots[material_index].material
+        except IndexError:
+            material = None
+
+        mesh_params = tuple((p.type_name, repr(p.value)) for p in obj.data.pbrtv3_mesh.get_paramset())
+        return fingerprint, material_index, material.name if material else '', mesh_params
+
     is_preview = False
 
     def allow_instancing(self, obj):
@@ -621,6 +696,10 @@ class GeometryExporter(object):
         if obj.type == 'MESH' and obj.data.pbrtv3_mesh.instancing_mode != 'auto':
             return obj.data.pbrtv3_mesh.instancing_mode == 'always'
 
+        # Mesh deduplication shares one shape definition between objects
+        if self.geometry_index is not None:
+            return True
+
         # If the object is animated, for motion blur we need instances
         if self.is_object_animated(obj)[0]:
             return True
@@ -646,6 +725,39 @@ class GeometryExporter(object):
         if self.is_preview:
             return False
 
+    def buildLODMeshes(self, obj):
+        """
+        Returns the mesh definitions of the decimated levels 1..n of a dupli object (as list per level),
+        or None if the object has no levels of detail. The shape definitions are exported on first use.
+        """
+        if self.ExportedLODs.have(obj):
+            return self.ExportedLODs.get(obj)
+
+        lod_definitions = None
+        levels = self.lod_manager.get_levels(obj) if obj.type == 'MESH' else None
+
+        if levels:
+            lod_definitions = []
+
+            for parts in levels:
+                mesh_definitions = []
+
+                for material_index, path in sorted(parts.items()):
+                    # Named after the PLY file, so objects with the same geometry share the definition
+                    mesh_name = os.path.splitext(os.path.basename(path))[0] + '_lod'
+                    shape_params = ParamSet().add_string('filename', efutil.path_relative_to_export(path))
+                    mesh_definition = (mesh_name, material_index, 'plymesh', shape_params)
+                    mesh_definitions.append(mesh_definition)
+
+                    if self.allow_instancing(obj) and not self.ExportedMeshes.have(mesh_name):
+                        self.exportShapeDefinition(obj, mesh_definition)
+                        self.ExportedMeshes.add(mesh_name, mesh_definition)
+
+                lod_definitions.append(mesh_definitions)
+
+        self.ExportedLODs.add(obj, lod_definitions)
+        return lod_definitions
+
     def exportShapeDefinition(self, obj, mesh_definition, parent=None):
         """
         If the mesh is valid and instancing is allowed for this object, export
@@ -678,41 +790,49 @@ class GeometryExporter(object):
             ob_mat = mat_object.material_slots[me_mat_index].material
         except IndexError:
             ob_mat = None
-            PBRTv3Log('WARNING: material slot %d on object "%s" is unassigned!' % (me_mat_index + 1, mat_object.name))
+            PBRTv3Logger.warning(None, 'Material slot %d on object "%s" is unassigned!', me_mat_index + 1,
+                                 mat_object.name)
 
         # Emission check
         if ob_mat is not None:
-            output_node = find_node(ob_mat, 'pbrtv3_material_output_node')
-            object_is_emitter = False
-            light_node = None
-
-            if output_node is not None:
-                light_socket = output_node.inputs['Emission']
-
-                if light_socket.is_linked:
-                    light_node = light_socket.links[0].from_node
-                    object_is_emitter = light_socket.is_linked
-            else:
-                # No node tree, so check the classic mat editor
-                object_is_emitter = ob_mat.pbrtv3_emission.use_emission
+            material_info = MaterialRegistry.get_info(ob_mat)
 
             # Only add the AreaLightSource if this object's emission lightgroup is enabled
-            if object_is_emitter and \
+            if material_info.is_emitter and \
                     self.visibility_scene.pbrtv3_lightgroups.is_enabled(ob_mat.pbrtv3_emission.lightgroup):
                 if not self.visibility_scene.pbrtv3_lightgroups.ignore:
                     self.lux_context.lightGroup(ob_mat.pbrtv3_emission.lightgroup, [])
 
-                if not ob_mat.pbrtv3_material.nodetree:
-                    self.lux_context.areaLightSource(*ob_mat.pbrtv3_emission.api_output(ob_mat))
-                elif light_node is not None:
-                    # Texture exporting
-                    tex_maker = pbrtv3_texture_maker(self.lux_context, ob_mat.pbrtv3_material.nodetree)
-                    self.lux_context.areaLightSource(*light_node.export(tex_maker.make_texture))
+                MaterialRegistry.export_emission(self.lux_context, ob_mat, self.export_area_light(ob_mat,
+                                                                                                  material_info))
 
         self.lux_context.shape(me_shape_type, me_shape_params)
         self.lux_context.objectEnd()
 
-        PBRTv3Log('Mesh definition exported: %s' % me_name)
+        PBRTv3Logger.count('mesh')
+        PBRTv3Logger.debug('mesh', 'Mesh definition exported: %s', me_name)
+
+    def sample_motion(self, geometry_scene, extra_objects=()):
+        """
+        Sample the motion blur matrices of all visible objects of geometry_scene and of extra_objects (e.g. the
+        camera) with one scene evaluation per motion blur step. Returns the MotionSampler or None.
+        """
+        lux_camera = self.visibility_scene.camera.data.pbrtv3_camera
+        self.motion_sampler = None
+
+        if not lux_camera.usemblur:
+            return None
+
+        objects = list(extra_objects)
+
+        if lux_camera.objectmblur:
+            objects.extend(obj for obj in geometry_scene.objects if is_obj_visible(self.visibility_scene, obj))
+
+        if objects:
+            self.motion_sampler = MotionSampler(geometry_scene, lux_camera.motion_blur_samples)
+            self.motion_sampler.sample(objects)
+
+        return self.motion_sampler
 
     def is_object_animated(self, obj, matrix=None):
 
@@ -736,7 +856,7 @@ class GeometryExporter(object):
 
                 # object_anim_matrices returns steps+1 matrices, ie start and end of frame
                 # we don't want the start matrix
-                next_matrices = object_anim_matrices(self.geometry_scene, obj, steps)[1:]
+                next_matrices = object_anim_matrices(self.geometry_scene, obj, steps, sampler=self.motion_sampler)[1:]
 
                 is_object_animated = len(next_matrices) > 0
 
@@ -744,6 +864,21 @@ class GeometryExporter(object):
 
         return is_object_animated, next_matrices
 
+    def export_area_light(self, material, material_info):
+        """
+        Returns a function exporting the AreaLightSource of an emitting material into a context
+        """
+
+        def export_function(lux_context):
+            if not material.pbrtv3_material.nodetree:
+                lux_context.areaLightSource(*material.pbrtv3_emission.api_output(material))
+            elif material_info.light_node is not None:
+                # texture exporting
+                tex_maker = pbrtv3_texture_maker(lux_context, material.pbrtv3_material.nodetree)
+                lux_context.areaLightSource(*material_info.light_node.export(tex_maker.make_texture))
+
+        return export_function
+
     def exportShapeInstances(self, obj, mesh_definitions, matrix=None, parent=None):
         # Don't export instances of portal meshes
         if obj.type == 'MESH' and obj.data.pbrtv3_mesh.portal:
@@ -801,37 +936,27 @@ class GeometryExporter(object):
                 ob_mat = mat_object.material_slots[me_mat_index].material
             except IndexError:
                 ob_mat = None
-                PBRTv3Log('WARNING: material slot %d on object "%s" is unassigned!' % (me_mat_index + 1, mat_object.name))
+                PBRTv3Logger.warning(None, 'Material slot %d on object "%s" is unassigned!', me_mat_index + 1,
+                                     mat_object.name)
 
             if ob_mat is not None:
-                # Export material definition
-                if self.lux_context.API_TYPE == 'FILE':
-                    self.lux_context.set_output_file(Files.MATS)
-                    mat_export_result = ob_mat.pbrtv3_material.export(self.visibility_scene, self.lux_context,
-                                                                         ob_mat, mode='indirect')
-                    self.lux_context.set_output_file(Files.GEOM)
-
-                    if not 'CLAY' in mat_export_result:
-                        self.lux_context.namedMaterial(ob_mat.name)
-                elif self.lux_context.API_TYPE == 'PURE':
-                    mat_export_result = ob_mat.pbrtv3_material.export(self.visibility_scene, self.lux_context,
-                                                                         ob_mat, mode='direct')
-
-                # We need to check the material's output node for a light-emission connection
-                output_node = find_node(ob_mat, 'pbrtv3_material_output_node')
-                light_node = None
-
-                if ob_mat.pbrtv3_material.nodetree:
-                    object_is_emitter = False
-
-                if output_node is not None:
-                    light_socket = output_node.inputs['Emission']
-
-                    if light_socket.is_linked:
-                        light_node = light_socket.links[0].from_node
-                        object_is_emitter = light_socket.is_linked
-                else:  # no node tree, so check the classic mat editor
-                    object_is_emitter = ob_mat.pbrtv3_emission.use_emission
+                # Export material definition (built once per export, see MaterialRegistry)
+                with ExportProfiler.span('material', ob_mat.name):
+                    if self.lux_context.API_TYPE == 'FILE':
+                        self.lux_context.set_output_file(Files.MATS)
+                        mat_export_result = MaterialRegistry.export(self.visibility_scene, self.lux_context, ob_mat,
+                                                                    mode='indirect')
+                        self.lux_context.set_output_file(Files.GEOM)
+
+                        if not 'CLAY' in mat_export_result:
+                            self.lux_context.namedMaterial(ob_mat.name)
+                    elif self.lux_context.API_TYPE == 'PURE':
+                        mat_export_result = MaterialRegistry.export(self.visibility_scene, self.lux_context, ob_mat,
+                                                                    mode='direct')
+
+                # Light-emission and volumes of the material
+                material_info = MaterialRegistry.get_info(ob_mat)
+                object_is_emitter = material_info.is_emitter
 
                 # If exporting an instance, we need to set emission in the ObjectBegin/End block
                 if object_is_emitter and not self.allow_instancing(mat_object):
@@ -840,16 +965,12 @@ class GeometryExporter(object):
                         if not self.visibility_scene.pbrtv3_lightgroups.ignore:
                             self.lux_context.lightGroup(ob_mat.pbrtv3_emission.lightgroup, [])
 
-                        if not ob_mat.pbrtv3_material.nodetree:
-                            self.lux_context.areaLightSource(*ob_mat.pbrtv3_emission.api_output(ob_mat))
-                        elif light_node is not None:
-                            # texture exporting
-                            tex_maker = pbrtv3_texture_maker(self.lux_context, ob_mat.pbrtv3_material.nodetree)
-                            self.lux_context.areaLightSource(*light_node.export(tex_maker.make_texture))
+                        MaterialRegistry.export_emission(self.lux_context, ob_mat, self.export_area_light(ob_mat,
+                                                                                                          material_info))
                     else:
                         object_is_emitter = False
 
-                int_v, ext_v = get_material_volume_defs(ob_mat)
+                int_v, ext_v = material_info.interior, material_info.exterior
                 if int_v:
                     self.lux_context.interior(int_v)
                 elif self.geometry_scene.pbrtv3_world.default_interior_volume:
@@ -921,6 +1042,7 @@ class GeometryExporter(object):
             temp = temp + Basispolynom(controlpoints, i, u, degree) * points[i]
         return temp
 
+    @profiled('dupli', element_arg=1)
     def handler_Duplis_PATH(self, obj, *args, **kwargs):
         if not 'particle_system' in kwargs.keys():
             PBRTv3Log('ERROR: handler_Duplis_PATH called without particle_system')
@@ -1138,7 +1260,7 @@ class GeometryExporter(object):
                     for uv in uv_coords:
                         hair_file.write(struct.pack('<2f', *uv))
 
-            PBRTv3Log('Binary hair file written: %s' % (hair_file_path))
+            PBRTv3Log('Binary hair file written: %s' % (hair_file_path), category='hair')
 
             hair_mat = obj.material_slots[psys.settings.material - 1].material
 
@@ -1165,7 +1287,8 @@ class GeometryExporter(object):
             self.lux_context.transform(matrix_to_list(obj.matrix_world, apply_worldscale=True))
             self.lux_context.namedMaterial(hair_mat.name)
 
-            int_v, ext_v = get_material_volume_defs(hair_mat)
+            material_info = MaterialRegistry.get_info(hair_mat)
+            int_v, ext_v = material_info.interior, material_info.exterior
 
             if int_v:
                 self.lux_context.interior(int_v)
@@ -1180,8 +1303,8 @@ class GeometryExporter(object):
             self.lux_context.shape('hairfile', hair_shape_params)
             self.lux_context.attributeEnd()
             self.lux_context.set_output_file(Files.MATS)
-            mat_export_result = hair_mat.pbrtv3_material.export(self.visibility_scene, self.lux_context, hair_mat,
-                                                                   mode='indirect')
+            mat_export_result = MaterialRegistry.export(self.visibility_scene, self.lux_context, hair_mat,
+                                                        mode='indirect')
             self.lux_context.set_output_file(Files.GEOM)
 
         else:
@@ -1298,6 +1421,7 @@ class GeometryExporter(object):
         PBRTv3Log('... done, exported %s hairs' % det.exported_objects)
 
 
+    @profiled('dupli', element_arg=1)
     def handler_Duplis_GENERIC(self, obj, *args, **kwargs):
         try:
             PBRTv3Log('Exporting Duplis...')
@@ -1354,9 +1478,20 @@ class GeometryExporter(object):
                 if not gviz:
                     continue
 
+                mesh_definitions = None
+                if self.lod_manager is not None:
+                    lod_definitions = self.buildLODMeshes(do)
+                    if lod_definitions:
+                        level = self.lod_manager.select(do, dm)
+                        if level > 0:
+                            mesh_definitions = lod_definitions[level - 1]
+
+                if mesh_definitions is None:
+                    mesh_definitions = self.buildMesh(do)
+
                 self.exportShapeInstances(
                     obj,
-                    self.buildMesh(do),
+                    mesh_definitions,
                     matrix=[dm, None],
                     parent=do
                 )
@@ -1373,6 +1508,7 @@ class GeometryExporter(object):
         except Exception as err:
             PBRTv3Log('Error with handler_Duplis_GENERIC and object %s: %s' % (obj, err))
 
+    @profiled('object', element_arg=1)
     def handler_MESH(self, obj, *args, **kwargs):
         if self.visibility_scene.pbrtv3_testing.object_analysis:
             print(' -> handler_MESH: %s' % obj)
@@ -1393,6 +1529,9 @@ class GeometryExporter(object):
         self.geometry_scene = geometry_scene
         self.have_emitting_object = False
 
+        if self.motion_sampler is None or self.motion_sampler.scene != geometry_scene:
+            self.sample_motion(geometry_scene)
+
         progress_thread = MeshExportProgressThread()
         tot_objects = len(geometry_scene.objects)
         progress_thread.start(tot_objects)
@@ -0,0 +1,263 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import array
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+import bpy
+
+from ..extensions_framework import util as efutil
+from ..outputs.logger import PBRTv3Logger
+
+# File extensions of the formats image.save_render() can write
+FORMAT_EXTENSIONS = {
+    'BMP': 'bmp',
+    'IRIS': 'rgb',
+    'PNG': 'png',
+    'JPEG': 'jpg',
+    'JPEG2000': 'jp2',
+    'TARGA': 'tga',
+    'TARGA_RAW': 'tga',
+    'CINEON': 'cin',
+    'DPX': 'dpx',
+    'OPEN_EXR': 'exr',
+    'OPEN_EXR_MULTILAYER': 'exr',
+    'HDR': 'hdr',
+    'TIFF': 'tif',
+}
+
+
+def image_content_hash(image):
+    """
+    Hash of the pixels the image would be saved with. The pixels of unmodified images are defined by cheaper data:
+    the packed file (its contents, or its size and the file path where PackedFile.data is not available) or the
+    parameters of the generated image. Only images that were painted on are hashed by their pixel buffer, because
+    copying the pixels to Python is slower than extracting the image again.
+    """
+    digest = hashlib.sha1()
+    digest.update(('%d %d %d' % (image.size[0], image.size[1], image.channels)).encode())
+
+    if not image.is_dirty:
+        if image.packed_file:
+            # PackedFile.data is not available in all Blender versions
+            data = getattr(image.packed_file, 'data', None)
+
+            if data is not None:
+                digest.update(data if isinstance(data, bytes) else data.encode('latin-1'))
+            else:
+                # The image name is part of the cache key as well
+                digest.update(repr((image.packed_file.size, image.filepath)).encode())
+
+            return digest.hexdigest()
+
+        elif image.source == 'GENERATED':
+            digest.update(repr((image.generated_type, image.generated_width, image.generated_height,
+                                tuple(image.generated_color), image.use_generated_float)).encode())
+            return digest.hexdigest()
+
+    digest.update(array.array('f', image.pixels[:]).tobytes())
+    return digest.hexdigest()
+
+
+def save_settings(scene, file_format):
+    """
+    The scene settings image.save_render() uses, as tuple
+    """
+    image_settings = scene.render.image_settings
+    view_settings = scene.view_settings
+
+    return (file_format, image_settings.color_mode, image_settings.color_depth, image_settings.quality,
+            image_settings.compression, image_settings.exr_codec, view_settings.view_transform,
+            view_settings.look, view_settings.exposure, view_settings.gamma,
+            scene.display_settings.display_device)
+
+
+class ImageCache(object):
+    """
+    Extracts generated and packed images to files the renderer can load. The files are named by a hash of the image
+    name, its pixel data and the save settings, so an image is only encoded again when one of them changes.
+
+    Without a target directory the files go to the managed cache directory (texture cache settings of the scene, or
+    a temporary directory that is removed when Blender exits), which is trimmed to the configured size by trim().
+    Exports that have to keep their textures (classic scene files) pass their own directory, files there are reused
+    but never evicted.
+    """
+
+    # {(directory, key): path}
+    entries = {}
+    # {(directory, image name, library path): key}, to remove the file of the previous state of a changed image
+    current_keys = {}
+    # {path: (size in bytes, last use)} of the files in the managed directory
+    managed_files = {}
+    scanned_dirs = set()
+    session_dir = None
+
+    hit_count = 0
+    write_count = 0
+
+    @classmethod
+    def get_path(cls, image, scene, file_format=None, directory=None):
+        """
+        Returns the path of a file with the pixels of the image, writing it if it is not in the cache.
+        file_format defaults to the output format of the scene.
+        """
+        if file_format is None:
+            file_format = scene.render.image_settings.file_format
+
+        managed = directory is None
+        if managed:
+            directory = cls.managed_directory(scene)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        library = image.library.filepath if image.library else ''
+        key_hash = hashlib.sha1(repr((image.name, library, image_content_hash(image),
+                                      save_settings(scene, file_format))).encode())
+        key = key_hash.hexdigest()[:20]
+
+        image_id = (directory, image.name, library)
+        previous_key = cls.current_keys.get(image_id)
+        if previous_key is not None and previous_key != key and managed:
+            cls.__remove(cls.entries.pop((directory, previous_key), None))
+        cls.current_keys[image_id] = key
+
+        path = cls.entries.get((directory, key))
+        if path is None:
+            filename = '%s_%s.%s' % (bpy.path.clean_name(image.name), key,
+                                     FORMAT_EXTENSIONS.get(file_format, file_format.lower()))
+            path = os.path.join(directory, filename)
+
+        if os.path.exists(path):
+            cls.hit_count += 1
+            PBRTv3Logger.count('image_cache_hit')
+        else:
+            cls.__write(image, scene, file_format, path)
+
+        cls.entries[(directory, key)] = path
+
+        if managed:
+            cls.managed_files[path] = (os.path.getsize(path), time.time())
+
+        return path
+
+    @classmethod
+    def managed_directory(cls, scene):
+        settings = scene.pbrtv3_texture_cache
+
+        if settings.extract_cache_dir:
+            directory = efutil.filesystem_path(settings.extract_cache_dir)
+        else:
+            if cls.session_dir is None:
+                cls.session_dir = tempfile.mkdtemp(prefix='pbrtv3_image_cache_')
+            directory = cls.session_dir
+
+        os.makedirs(directory, exist_ok=True)
+
+        if directory not in cls.scanned_dirs:
+            # Files of earlier sessions in a persistent cache directory count towards the size limit
+            cls.scanned_dirs.add(directory)
+            for filename in os.listdir(directory):
+                path = os.path.join(directory, filename)
+                if os.path.isfile(path):
+                    cls.managed_files[path] = (os.path.getsize(path), os.path.getatime(path))
+
+        return directory
+
+    @classmethod
+    def trim(cls, scene):
+        """
+        Evict the least recently used files until the managed cache fits into its size limit. Call this before an
+        export, so no file the export references is removed.
+        """
+        max_bytes = scene.pbrtv3_texture_cache.extract_cache_size * 1024 * 1024
+        total = sum(size for size, last_use in cls.managed_files.values())
+
+        if total <= max_bytes:
+            return
+
+        evicted = set()
+        for path, (size, last_use) in sorted(cls.managed_files.items(), key=lambda item: item[1][1]):
+            if total <= max_bytes:
+                break
+
+            cls.__remove(path)
+            total -= size
+            evicted.add(path)
+
+        cls.entries = {entry: path for entry, path in cls.entries.items() if path not in evicted}
+
+        PBRTv3Logger.info('image_cache', 'Evicted %d extracted images, cache size now %.1f MB',
+                          len(evicted), total / 1024 / 1024)
+
+    @classmethod
+    def cleanup(cls):
+        """
+        Remove the temporary cache directory of this session
+        """
+        if cls.session_dir is not None:
+            shutil.rmtree(cls.session_dir, ignore_errors=True)
+            cls.scanned_dirs.discard(cls.session_dir)
+            cls.session_dir = None
+
+        cls.entries = {}
+        cls.current_keys = {}
+        cls.managed_files = {}
+
+    @classmethod
+    def __write(cls, image, scene, file_format, path):
+        image_settings = scene.render.image_settings
+        orig_file_format = image_settings.file_format
+
+        # save_render() writes in the output format of the scene
+        if file_format != orig_file_format:
+            image_settings.file_format = file_format
+
+        try:
+            image.save_render(path, scene)
+        finally:
+            if file_format != orig_file_format:
+                image_settings.file_format = orig_file_format
+
+        cls.write_count += 1
+        PBRTv3Logger.count('image_cache_write')
+        PBRTv3Logger.debug('image_cache', '[Image: %s] Extracted to %s', image.name, path)
+
+    @classmethod
+    def __remove(cls, path):
+        if path is None:
+            return
+
+        cls.managed_files.pop(path, None)
+
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+atexit.register(ImageCache.cleanup)
@@ -0,0 +1,180 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+"""
+Reads the resolution and pixel layout of image files from their headers, without decoding the pixels
+"""
+import collections
+import os
+import struct
+
+# bits is the size of one channel
+ImageInfo = collections.namedtuple('ImageInfo', ('format', 'width', 'height', 'channels', 'bits'))
+
+# PNG color type: channel count
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+# JPEG start of frame markers (all except DHT, JPG and DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# EXR channel pixel type: bits
+EXR_BITS = {0: 32, 1: 16, 2: 32}
+
+# Only the start of the file is read, the headers of all supported formats fit into it (except JPEGs with large
+# embedded thumbnails, which are read further in _read_jpeg())
+HEADER_SIZE = 64 * 1024
+
+
+def read_image_info(path):
+    """
+    Returns the ImageInfo of the image file, or None if the file does not exist or the format is not supported
+    """
+    try:
+        with open(path, 'rb') as image_file:
+            header = image_file.read(HEADER_SIZE)
+
+            if header.startswith(b'\x89PNG\r\n\x1a\n'):
+                return _read_png(header)
+            if header.startswith(b'\xff\xd8'):
+                return _read_jpeg(image_file)
+            if header.startswith(b'\x76\x2f\x31\x01'):
+                return _read_exr(header)
+            if header.startswith(b'#?RADIANCE') or header.startswith(b'#?RGBE'):
+                return _read_hdr(header)
+            if header.startswith(b'II*\x00') or header.startswith(b'MM\x00*'):
+                return _read_tiff(image_file, header)
+            if header.startswith(b'BM'):
+                return _read_bmp(header)
+            if os.path.splitext(path)[1].lower() in ('.tga', '.targa'):
+                return _read_tga(header)
+    except (OSError, struct.error, ValueError, IndexError):
+        pass
+
+    return None
+
+
+def _read_png(header):
+    width, height, bit_depth, color_type = struct.unpack('>IIBB', header[16:26])
+    return ImageInfo('PNG', width, height, PNG_CHANNELS.get(color_type, 4), bit_depth)
+
+
+def _read_jpeg(image_file):
+    image_file.seek(2)
+
+    while True:
+        marker = image_file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            # Markers without payload
+            continue
+
+        length = struct.unpack('>H', image_file.read(2))[0]
+
+        if marker[1] in JPEG_SOF_MARKERS:
+            precision, height, width, components = struct.unpack('>BHHB', image_file.read(6))
+            return ImageInfo('JPEG', width, height, components, precision)
+
+        image_file.seek(length - 2, os.SEEK_CUR)
+
+
+def _read_exr(header):
+    position = 8
+    width = height = None
+    channels = []
+
+    while header[position] != 0:
+        name_end = header.index(b'\x00', position)
+        type_end = header.index(b'\x00', name_end + 1)
+        name = header[position:name_end]
+        size = struct.unpack('<i', header[type_end + 1:type_end + 5])[0]
+        value = header[type_end + 5:type_end + 5 + size]
+        position = type_end + 5 + size
+
+        if name == b'dataWindow':
+            x_min, y_min, x_max, y_max = struct.unpack('<iiii', value[:16])
+            width = x_max - x_min + 1
+            height = y_max - y_min + 1
+        elif name == b'channels':
+            channel_position = 0
+            while value[channel_position] != 0:
+                channel_end = value.index(b'\x00', channel_position)
+                pixel_type = struct.unpack('<i', value[channel_end + 1:channel_end + 5])[0]
+                channels.append(EXR_BITS.get(pixel_type, 32))
+                # name, pixel type, pLinear, reserved, x/y sampling
+                channel_position = channel_end + 17
+
+    if width is None or not channels:
+        return None
+
+    return ImageInfo('OPEN_EXR', width, height, len(channels), max(channels))
+
+
+def _read_hdr(header):
+    # The resolution line follows the empty line that ends the header, e.g. "-Y 1024 +X 2048"
+    lines = header.split(b'\n')
+    resolution = lines[lines.index(b'') + 1].split()
+    size = dict((axis[-1:], int(value)) for axis, value in zip(resolution[0::2], resolution[1::2]))
+    return ImageInfo('HDR', size[b'X'], size[b'Y'], 3, 32)
+
+
+def _read_tiff(image_file, header):
+    endian = '<' if header.startswith(b'II') else '>'
+    # Value type: struct format (SHORT, LONG)
+    value_formats = {3: 'H', 4: 'I'}
+
+    image_file.seek(struct.unpack(endian + 'I', header[4:8])[0])
+    entry_count = struct.unpack(endian + 'H', image_file.read(2))[0]
+    entries = [struct.unpack(endian + 'HHI4s', image_file.read(12)) for i in range(entry_count)]
+    tags = {}
+
+    for tag, value_type, count, value in entries:
+        if value_type not in value_formats:
+            continue
+
+        value_format = endian + value_formats[value_type]
+        value_size = struct.calcsize(value_format)
+
+        if count * value_size > 4:
+            # The values do not fit into the entry, which stores their offset instead
+            image_file.seek(struct.unpack(endian + 'I', value)[0])
+            value = image_file.read(value_size)
+
+        # Only the first value is needed (bits per sample is the same for all channels)
+        tags[tag] = struct.unpack(value_format, value[:value_size])[0]
+
+    # ImageWidth, ImageLength, BitsPerSample, SamplesPerPixel
+    if 256 not in tags or 257 not in tags:
+        return None
+
+    return ImageInfo('TIFF', tags[256], tags[257], tags.get(277, 1), tags.get(258, 1))
+
+
+def _read_bmp(header):
+    width, height = struct.unpack('<ii', header[18:26])
+    bits_per_pixel = struct.unpack('<H', header[28:30])[0]
+    return ImageInfo('BMP', width, abs(height), max(bits_per_pixel // 8, 1), 8)
+
+
+def _read_tga(header):
+    width, height, bits_per_pixel = struct.unpack('<HHB', header[12:17])
+    return ImageInfo('TARGA', width, height, max(bits_per_pixel // 8, 1), 8)
@@ -0,0 +1,192 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import collections
+import os
+import queue
+import re
+import threading
+
+import bpy
+
+from ..extensions_framework import util as efutil
+from ..outputs.logger import PBRTv3Logger
+
+# The rightmost number in a file name is the frame number
+FRAME_NUMBER_PATTERN = re.compile(r'^(.*?)(\d+)(\D*)$')
+
+PREFETCH_BLOCK_SIZE = 1024 * 1024
+
+
+def sequence_frame_number(image_user, frame):
+    """
+    The number of the file an image sequence shows at the given scene frame (Blender's offset, start and cyclic
+    settings of the image user)
+    """
+    duration = image_user.frame_duration
+    offset = image_user.frame_offset
+    # The global frame at which the image sequence starts
+    start = image_user.frame_start
+
+    if frame < start:
+        number = 1 + offset
+    else:
+        number = frame - (start - 1) + offset
+
+    if number > duration:
+        if not image_user.use_cyclic:
+            number = duration
+        else:
+            number = (frame - (start - 1)) % duration
+            if number == 0:
+                number = duration
+
+    return number
+
+
+class ImageSequence(object):
+    """
+    The files of an image sequence, found by scanning the directory of one of its files for names that only differ
+    in the rightmost number
+    """
+
+    def __init__(self, path):
+        self.directory, filename = os.path.split(path)
+        match = FRAME_NUMBER_PATTERN.match(filename)
+
+        # {frame number: path}
+        self.frames = {}
+
+        if match is None:
+            self.prefix, self.padding, self.suffix = filename, 0, ''
+            return
+
+        self.prefix, digits, self.suffix = match.groups()
+        self.padding = len(digits)
+
+        file_pattern = re.compile('^%s(\\d+)%s$' % (re.escape(self.prefix), re.escape(self.suffix)))
+
+        try:
+            filenames = os.listdir(self.directory or '.')
+        except OSError:
+            filenames = []
+
+        for name in filenames:
+            file_match = file_pattern.match(name)
+            if file_match is not None:
+                self.frames[int(file_match.group(1))] = os.path.join(self.directory, name)
+
+    def get_path(self, number):
+        """
+        Returns the path of the file with the frame number and whether it exists
+        """
+        path = self.frames.get(number)
+
+        if path is not None:
+            return path, True
+
+        filename = '%s%s%s' % (self.prefix, str(number).zfill(self.padding), self.suffix)
+        return os.path.join(self.directory, filename), False
+
+
+class SequenceIndex(object):
+    """
+    Caches the ImageSequence of every sequence path, so the frame files of animated textures are not searched
+    again on every export. An index is rebuilt when the modification time of its directory changes, i.e. when
+    frames are added or removed.
+    """
+
+    # {path of the image: (directory mtime, ImageSequence)}
+    sequences = {}
+
+    @classmethod
+    def get_frame_path(cls, image, image_user, scene, library=None, prefetch_count=0):
+        """
+        Returns the path of the file the image sequence shows at the current frame of the scene and whether it
+        exists. With prefetch_count, the files of that many following frames are read in the background.
+        """
+        library_path = library.filepath if library is not None else ''
+        path = efutil.filesystem_path(bpy.path.abspath(image.filepath, library_path))
+        sequence = cls.get_sequence(path)
+
+        frame = scene.frame_current
+        frame_path, exists = sequence.get_path(sequence_frame_number(image_user, frame))
+
+        if prefetch_count > 0:
+            next_frames = range(frame + 1, min(frame + prefetch_count, scene.frame_end) + 1)
+            numbers = sorted(set(sequence_frame_number(image_user, next_frame) for next_frame in next_frames))
+            SequencePrefetcher.prefetch([sequence.frames[number] for number in numbers if number in sequence.frames])
+
+        return frame_path, exists
+
+    @classmethod
+    def get_sequence(cls, path):
+        try:
+            directory_mtime = os.stat(os.path.dirname(path) or '.').st_mtime
+        except OSError:
+            directory_mtime = None
+
+        cached = cls.sequences.get(path)
+        if cached is not None and cached[0] == directory_mtime:
+            return cached[1]
+
+        sequence = ImageSequence(path)
+        cls.sequences[path] = (directory_mtime, sequence)
+        PBRTv3Logger.debug('sequence', 'Indexed %d frames of image sequence %s', len(sequence.frames), path)
+        return sequence
+
+
+class SequencePrefetcher(object):
+    """
+    Reads files in a background thread, so they are in the OS file cache when the renderer loads them for the
+    next frames of an animation
+    """
+
+    queue = None
+    thread = None
+    # The last prefetched files, so consecutive frames do not read them again
+    recent = collections.deque(maxlen=256)
+
+    @classmethod
+    def prefetch(cls, paths):
+        if cls.thread is None:
+            cls.queue = queue.Queue()
+            cls.thread = threading.Thread(target=cls.__worker_loop, name='PBRTv3SequencePrefetch', daemon=True)
+            cls.thread.start()
+
+        for path in paths:
+            if path not in cls.recent:
+                cls.recent.append(path)
+                cls.queue.put(path)
+
+    @classmethod
+    def __worker_loop(cls):
+        while True:
+            path = cls.queue.get()
+
+            try:
+                with open(path, 'rb') as prefetch_file:
+                    while prefetch_file.read(PREFETCH_BLOCK_SIZE):
+                        pass
+            except OSError as err:
+                PBRTv3Logger.debug('sequence', 'Could not prefetch %s: %s', path, err)
@@ -0,0 +1,214 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import json
+import math
+import os
+
+import bpy
+
+from ..extensions_framework import util as efutil
+from ..outputs import PBRTv3Log
+from ..outputs.logger import PBRTv3Logger
+from .culling import CameraFrustum, object_bounds, transform_bounds
+from .dedup import mesh_fingerprint
+from . import ply
+
+
+def decimated_mesh(scene, mesh, ratio):
+    """
+    Returns a new mesh (with tessfaces) with the faces of mesh reduced to ratio by a Decimate modifier on a temporary
+    object. Unlike bpy.ops, this needs no context and does not change the user's scene or selection.
+    """
+    temp_obj = bpy.data.objects.new('pbrtv3_decimate_temp', mesh)
+    decimate = temp_obj.modifiers.new('Decimate', 'DECIMATE')
+    decimate.ratio = ratio
+
+    try:
+        result = temp_obj.to_mesh(scene, True, 'RENDER')
+    finally:
+        bpy.data.objects.remove(temp_obj, do_unlink=True)
+
+    result.update(calc_tessface=True)
+    return result
+
+
+class LODManager(object):
+    """
+    Automatic levels of detail for instanced geometry. For each mesh, several decimated levels are generated and
+    written as PLY files (one per material index). The files are cached on disk, keyed by the fingerprint of the
+    evaluated mesh (see mesh_fingerprint()), so they are only generated again when the geometry changes.
+
+    At export time, select() picks a level per instance from its projected size in the render camera:
+    level 0 (the original mesh) down to lod_pixel_size pixels, then one level more per halving of the size.
+    """
+
+    def __init__(self, scene, camera, settings):
+        self.scene = scene
+        self.level_count = settings.lod_levels
+        self.ratio = settings.lod_ratio
+        self.pixel_size = settings.lod_pixel_size
+        self.min_faces = settings.lod_min_faces
+
+        if settings.lod_cache_dir:
+            self.cache_dir = efutil.filesystem_path(settings.lod_cache_dir)
+        else:
+            self.cache_dir = os.path.join(efutil.temp_directory(), 'pbrtv3_lod')
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.frustum = CameraFrustum(scene, camera, camera.matrix_world, 0.0)
+
+        # {object name: list of levels 1..n as {material index: PLY path}, or None if the object has no LODs}
+        self.levels = {}
+        # {object name: (local bounding box center, radius)}
+        self.bounds = {}
+
+        self.distribution = [0] * (self.level_count + 1)
+        self.generated_count = 0
+        self.reused_count = 0
+
+    @classmethod
+    def from_settings(cls, scene):
+        """
+        Returns a LOD manager configured by the scene's LOD settings, or None if LODs are disabled or not possible
+        with the scene's camera
+        """
+        settings = scene.pbrtv3_lod
+        camera = scene.camera
+
+        if not settings.lod_enable or camera is None or camera.data.type == 'PANO':
+            return None
+
+        if not ply.NUMPY_AVAILABLE:
+            PBRTv3Log('WARNING: Automatic LOD needs numpy, exporting all instances in full detail')
+            return None
+
+        return cls(scene, camera, settings)
+
+    def get_levels(self, obj):
+        """
+        Returns the decimated levels 1..n of the object's render mesh as list of {material index: PLY path},
+        generating the PLY files if they are not in the cache. Returns None if the mesh is too small for LODs.
+        """
+        if obj.name in self.levels:
+            return self.levels[obj.name]
+
+        levels = None
+
+        if obj.type == 'MESH':
+            mesh = obj.to_mesh(self.scene, True, 'RENDER')
+
+            if mesh is not None:
+                try:
+                    mesh.update(calc_tessface=True)
+
+                    if len(mesh.tessfaces) >= max(self.min_faces, 1):
+                        digest = mesh_fingerprint(mesh)[2]
+                        levels = [self.__get_level(mesh, digest, self.ratio ** level)
+                                  for level in range(1, self.level_count + 1)]
+                finally:
+                    bpy.data.meshes.remove(mesh, do_unlink=False)
+
+        self.levels[obj.name] = levels
+        return levels
+
+    def select(self, obj, matrix):
+        """
+        Returns the level (0 = original mesh) for an instance of the object with this world matrix
+        """
+        bounds = self.bounds.get(obj.name)
+        if bounds is None:
+            bounds = self.bounds[obj.name] = object_bounds(obj)
+
+        center, radius = transform_bounds(bounds, matrix)
+        size = self.frustum.projected_size(self.frustum.world_to_camera * center, radius)
+
+        if size >= self.pixel_size:
+            level = 0
+        elif size <= 0:
+            level = self.level_count
+        else:
+            level = min(self.level_count, int(math.log2(self.pixel_size / size)) + 1)
+
+        self.distribution[level] += 1
+        return level
+
+    def report(self):
+        instance_count = sum(self.distribution)
+        if instance_count == 0:
+            return
+
+        parts = ['level %d: %d' % (level, count) for level, count in enumerate(self.distribution)]
+        PBRTv3Log('LOD: %d instances (%s), %d levels generated, %d reused from cache'
+                  % (instance_count, ', '.join(parts), self.generated_count, self.reused_count))
+
+    def __get_level(self, mesh, digest, ratio):
+        base_name = '%s_r%04d' % (digest, round(ratio * 1000))
+        index_path = os.path.join(self.cache_dir, base_name + '.lod')
+
+        parts = self.__read_index(index_path)
+        if parts is not None:
+            self.reused_count += 1
+            return parts
+
+        parts = self.__generate_level(mesh, base_name, ratio)
+
+        # The index is written last, so an interrupted export never leaves an incomplete level in the cache
+        with open(index_path, 'w') as index_file:
+            json.dump({str(index): os.path.basename(path) for index, path in parts.items()}, index_file)
+
+        self.generated_count += 1
+        return parts
+
+    def __read_index(self, index_path):
+        if not os.path.exists(index_path):
+            return None
+
+        try:
+            with open(index_path) as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return None
+
+        parts = {int(material_index): os.path.join(self.cache_dir, filename)
+                 for material_index, filename in index.items()}
+
+        if not all(os.path.exists(path) for path in parts.values()):
+            return None
+
+        return parts
+
+    def __generate_level(self, mesh, base_name, ratio):
+        lod_mesh = decimated_mesh(self.scene, mesh, ratio)
+
+        try:
+            parts = ply.write_ply_parts(lod_mesh, lambda index: os.path.join(self.cache_dir,
+                                                                             '%s_m%03d.ply' % (base_name, index)))
+        finally:
+            bpy.data.meshes.remove(lod_mesh, do_unlink=False)
+
+        PBRTv3Logger.count('LOD level')
+        PBRTv3Logger.debug('lod', 'LOD level %s: %d triangles', base_name, sum(t for p, t in parts.values()))
+
+        return {index: path for index, (path, triangle_count) in parts.items()}
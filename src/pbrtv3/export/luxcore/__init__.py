@@ -26,11 +26,21 @@
 #
 
 import bpy, time, os
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from ...outputs import PBRTv3Manager
 from ...outputs.luxcore_api import pyluxcore
+from ...outputs.logger import PBRTv3Logger
 from ...extensions_framework import util as efutil
+from ...export import MotionSampler, VisibilityIndex, is_obj_visible
+from ...properties import NodeTreeIndex, NodeExportCache
+from ...export.dedup import GeometryIndex, DefinitionIndex
+from ...export.lod import LODManager
 from ...export.volumes import SmokeCache
+from ...export.image_cache import ImageCache
+from ...export.texture_budget import TextureBudgetPlanner
+from ...export.profiler import ExportProfiler, profiled
 
 from .camera import CameraExporter
 from .config import ConfigExporter
@@ -41,11 +51,12 @@ from .meshes import MeshExporter
 from .objects import ObjectExporter
 from .textures import TextureExporter
 from .volumes import VolumeExporter
-from .utils import get_elem_key, LightgroupCache, is_lightgroup_opencl_compatible, ErrorCache
+from .utils import get_elem_key, LightgroupCache, is_lightgroup_opencl_compatible, ErrorCache, diff_element_properties
 
 
 class PBRTv3CoreExporter(object):
-    def __init__(self, blender_scene, renderengine, is_viewport_render=False, context=None, is_material_preview=False):
+    def __init__(self, blender_scene, renderengine, is_viewport_render=False, context=None, is_material_preview=False,
+                 is_incremental_animation=False):
         """
         Main exporter class. Only one instance should be used per rendering session.
         To update the rendering on the fly, convert the needed objects/materials etc., then get all updated properties
@@ -58,9 +69,13 @@ class PBRTv3CoreExporter(object):
         self.is_viewport_render = is_viewport_render
         self.context = context
         self.is_material_preview = is_material_preview
+        # The exporter is kept for the following frames of the animation and updated with convert_changes()
+        self.is_incremental_animation = is_incremental_animation
 
         self.config_properties = pyluxcore.Properties()
         self.scene_properties = pyluxcore.Properties()
+        # The pyluxcore.Scene the last convert() call exported to
+        self.luxcore_scene = None
         # All property changes since last pop_updated_scene_properties()
         self.updated_scene_properties = pyluxcore.Properties()
 
@@ -90,6 +105,35 @@ class PBRTv3CoreExporter(object):
         self.config_exporter = ConfigExporter(self, self.blender_scene, self.is_viewport_render)
         self.camera_exporter = CameraExporter(self.blender_scene, self.is_viewport_render, self.context)
 
+        # Shares the shapes of meshes with identical geometry (final renders only, because the viewport
+        # edits meshes of single objects)
+        if self.blender_scene.luxcore_translatorsettings.dedup_meshes and not self.is_viewport_render:
+            self.geometry_index = GeometryIndex('Mesh deduplication')
+        else:
+            self.geometry_index = None
+
+        # Defines materials and textures with identical definitions only once, the copies use the name of the first
+        # one (final renders only, the viewport would update all copies when one of them is edited)
+        # Not with incremental animation export either: materials converted again for later frames would keep the
+        # deduplication of the first frame
+        if (self.blender_scene.luxcore_translatorsettings.dedup_materials and not self.is_viewport_render
+                and not self.is_incremental_animation):
+            self.definition_index = DefinitionIndex('Material deduplication')
+        else:
+            self.definition_index = None
+
+        # Motion blur matrices of the objects and the camera, only valid during convert()
+        self.motion_sampler = None
+
+        # Levels of detail for particle/dupli instances (final renders only), only valid during convert()
+        self.lod_manager = None
+
+        # Texture memory estimate and downscaling (final renders only), only valid during convert()
+        self.texture_budget = None
+
+        # Duration of the phases of the last convert() call in seconds, e.g. for telemetry
+        self.export_phases = OrderedDict()
+
         # If errors happen during export they are added to this cache and printed after the export completes.
         # The summary is printed in core/__init__.py in luxcore_render(), because otherwise it is drowned in a flood
         # of PBRTv3Core-SDL related messages.
@@ -115,11 +159,67 @@ class PBRTv3CoreExporter(object):
         """
         Convert the whole scene
         """
+        with self.__export_session():
+            with ExportProfiler.span('export', 'PBRTv3Core scene'):
+                return self.__convert_scene(film_width, film_height, luxcore_scene)
+
+
+    def convert_changes(self, update_changes, film_width, film_height):
+        """
+        Convert only the elements in update_changes (incremental animation export, the rest of the scene was
+        converted for an earlier frame) and return a new RenderConfig
+        """
+        with self.__export_session():
+            with ExportProfiler.span('export', 'PBRTv3Core frame update'):
+                return self.__convert_changes(update_changes, film_width, film_height)
+
+
+    @contextmanager
+    def __export_session(self):
+        """
+        Set up the lookup indexes, the profiler and the logger of an export and free the per-export state afterwards
+        """
+        PBRTv3Logger.configure(self.blender_scene)
+        VisibilityIndex.begin(self.blender_scene)
+        NodeTreeIndex.begin()
+        ExportProfiler.begin(self.blender_scene, 'luxcore_export')
+
+        try:
+            yield
+        finally:
+            self.motion_sampler = None
+            self.camera_exporter.motion_sampler = None
+            self.lod_manager = None
+            if self.texture_budget is not None:
+                self.texture_budget.end()
+                self.texture_budget = None
+            VisibilityIndex.end()
+            NodeTreeIndex.end()
+            ExportProfiler.end()
+            PBRTv3Logger.summary('Export summary')
+
+
+    def __convert_scene(self, film_width, film_height, luxcore_scene):
         print('\nStarting export...')
         start_time = time.time()
+        self.export_phases = OrderedDict()
+        phase_start = start_time
+
+        if self.geometry_index is not None:
+            self.geometry_index.reset_stats()
+
+        if self.definition_index is not None:
+            self.definition_index.reset()
+
+        if not self.is_viewport_render:
+            self.texture_budget = TextureBudgetPlanner.from_settings(self.blender_scene, True)
+            if self.texture_budget is not None:
+                self.texture_budget.plan()
 
         if luxcore_scene is None:
             image_scale = self.blender_scene.luxcore_scenesettings.imageScale / 100.0
+            if self.texture_budget is not None:
+                image_scale = self.texture_budget.image_scale
             if image_scale < 0.99:
                 print('All textures will be scaled down by factor %.2f' % image_scale)
             else:
@@ -127,17 +227,30 @@ class PBRTv3CoreExporter(object):
 
             luxcore_scene = pyluxcore.Scene(image_scale)
 
+        self.luxcore_scene = luxcore_scene
+
+        local_view = self.is_viewport_render and self.context.space_data.local_view
+        blender_objects = self.context.visible_objects if local_view else self.blender_scene.objects
+
+        self.__sample_motion(blender_objects)
+        phase_start = self.__end_phase('motion', phase_start)
+
         # Convert camera and add it to the scene. This needs to be done before object conversion because e.g.
         # hair export needs a valid defined camera object in case it is view-dependent
         self.convert_camera()
         luxcore_scene.Parse(self.pop_updated_scene_properties())
+        phase_start = self.__end_phase('camera', phase_start)
+
+        self.__create_lod_manager()
 
         SmokeCache.reset()
+        ImageCache.trim(self.blender_scene)
         self.convert_all_volumes()
+        phase_start = self.__end_phase('volumes', phase_start)
 
-        if self.is_viewport_render and self.context.space_data.local_view:
+        if local_view:
             # In local view, only export "local" objects and add a white background light
-            for blender_object in self.context.visible_objects:
+            for blender_object in blender_objects:
                 self.convert_object(blender_object, luxcore_scene)
 
             background_props = pyluxcore.Properties()
@@ -146,10 +259,10 @@ class PBRTv3CoreExporter(object):
             self.__set_scene_properties(background_props)
         else:
             # Materials, textures, lights and meshes are all converted by their respective Blender object
-            object_amount = len(self.blender_scene.objects)
+            object_amount = len(blender_objects)
             object_counter = 0
 
-            for blender_object in self.blender_scene.objects:
+            for blender_object in blender_objects:
                 if self.renderengine.test_break():
                     print('EXPORT CANCELLED BY USER')
                     return None
@@ -160,10 +273,13 @@ class PBRTv3CoreExporter(object):
 
                 self.convert_object(blender_object, luxcore_scene)
 
+        phase_start = self.__end_phase('objects', phase_start)
+
         # Convert config at last because all lightgroups and passes have to be already defined
         self.convert_config(film_width, film_height)
         self.convert_imagepipeline()
         self.convert_lightgroup_scales(verbose=True)
+        phase_start = self.__end_phase('config', phase_start)
 
         # Debug output
         if self.blender_scene.luxcore_translatorsettings.print_cfg:
@@ -173,6 +289,15 @@ class PBRTv3CoreExporter(object):
             print('\nScene Properties:')
             print(self.scene_properties)
 
+        if self.geometry_index is not None:
+            self.geometry_index.report()
+
+        if self.definition_index is not None:
+            self.definition_index.report()
+
+        if self.lod_manager is not None:
+            self.lod_manager.report()
+
         # Show message in Blender UI
         export_time = time.time() - start_time
         print('Export finished (%.1fs)' % export_time)
@@ -188,10 +313,109 @@ class PBRTv3CoreExporter(object):
         # Create luxcore scene and config
         luxcore_scene.Parse(self.pop_updated_scene_properties())
         luxcore_config = pyluxcore.RenderConfig(self.config_properties, luxcore_scene)
+        self.__end_phase('scene parse', phase_start)
 
         return luxcore_config
 
 
+    def __convert_changes(self, update_changes, film_width, film_height):
+        luxcore_scene = self.luxcore_scene
+        changed_objects = update_changes.changed_objects_mesh | update_changes.changed_objects_transform
+
+        self.__sample_motion(changed_objects | update_changes.changed_duplicators)
+        self.convert_camera()
+        self.__create_lod_manager()
+
+        if update_changes.changed_materials:
+            # The downscaled textures of the budget only apply during an export
+            self.texture_budget = TextureBudgetPlanner.from_settings(self.blender_scene, True)
+            if self.texture_budget is not None:
+                self.texture_budget.plan()
+
+        # Smoke and other volume data can change from frame to frame
+        SmokeCache.reset()
+        self.convert_all_volumes()
+
+        for material in update_changes.changed_materials:
+            self.convert_material(material)
+
+        for blender_object in update_changes.removed_objects:
+            self.delete_object(blender_object, luxcore_scene)
+
+        for blender_object in update_changes.changed_objects_mesh:
+            self.convert_object(blender_object, luxcore_scene, update_mesh=True, update_material=False)
+
+        for blender_object in update_changes.changed_objects_transform:
+            self.convert_object(blender_object, luxcore_scene, update_mesh=False, update_material=False)
+
+        for blender_object in update_changes.changed_duplicators:
+            self.update_duplis(luxcore_scene, blender_object)
+
+        self.convert_config(film_width, film_height)
+        self.convert_imagepipeline()
+        self.convert_lightgroup_scales()
+
+        if self.lod_manager is not None:
+            self.lod_manager.report()
+
+        updated_properties = self.pop_updated_scene_properties()
+
+        if self.blender_scene.luxcore_translatorsettings.print_scn:
+            print('Updated scene properties:')
+            print(updated_properties, '\n')
+
+        luxcore_scene.Parse(updated_properties)
+
+        # Changed meshes got new deduplicated shapes, remove the previous ones if no object uses them anymore
+        if self.geometry_index is not None and self.geometry_index.pop_released() and \
+                hasattr(luxcore_scene, 'RemoveUnusedMeshes'):
+            luxcore_scene.RemoveUnusedMeshes()
+
+        return pyluxcore.RenderConfig(self.config_properties, luxcore_scene)
+
+
+    def __create_lod_manager(self):
+        # With multi-camera rendering, all cameras share one export
+        if not self.is_viewport_render and not self.blender_scene.luxcore_translatorsettings.multicam_render:
+            self.lod_manager = LODManager.from_settings(self.blender_scene)
+
+
+    def __sample_motion(self, blender_objects):
+        """
+        Sample the motion blur matrices of the camera and all visible objects with one scene evaluation per step
+        """
+        camera = self.blender_scene.camera
+
+        if camera is None or not camera.data.pbrtv3_camera.usemblur:
+            return
+
+        lux_camera = camera.data.pbrtv3_camera
+        sampled_objects = []
+
+        # Camera motion blur is disabled in viewport (see CameraExporter)
+        if lux_camera.cammblur and not self.is_viewport_render:
+            sampled_objects.append(camera)
+
+        if lux_camera.objectmblur:
+            sampled_objects.extend(obj for obj in blender_objects
+                                   if is_obj_visible(self.blender_scene, obj,
+                                                     is_viewport_render=self.is_viewport_render))
+
+        if not sampled_objects:
+            return
+
+        self.motion_sampler = MotionSampler(self.blender_scene, lux_camera.motion_blur_samples)
+        self.motion_sampler.sample(sampled_objects)
+        self.camera_exporter.motion_sampler = self.motion_sampler
+
+
+    def __end_phase(self, name, phase_start):
+        now = time.time()
+        self.export_phases[name] = now - phase_start
+        return now
+
+
+    @profiled('camera')
     def convert_camera(self):
         camera_props_keys = self.camera_exporter.properties.GetAllNames()
         self.scene_properties.DeleteAll(camera_props_keys)
@@ -200,6 +424,7 @@ class PBRTv3CoreExporter(object):
         self.__set_scene_properties(self.camera_exporter.properties)
 
 
+    @profiled('config')
     def convert_config(self, film_width, film_height):
         config_props_keys = self.config_exporter.properties.GetAllNames()
         self.config_properties.DeleteAll(config_props_keys)
@@ -404,6 +629,7 @@ class PBRTv3CoreExporter(object):
         return temp_properties
 
 
+    @profiled('object', element_arg=1)
     def convert_object(self, blender_object, luxcore_scene, update_mesh=True, update_material=True):
         cache = self.object_cache
         exporter = ObjectExporter(self, self.blender_scene, self.is_viewport_render, blender_object)
@@ -424,13 +650,15 @@ class PBRTv3CoreExporter(object):
         cache[obj_key] = exporter
 
 
+    @profiled('mesh', element_arg=1)
     def convert_mesh(self, blender_object, luxcore_scene, use_instancing, transformation):
         exporter = MeshExporter(self.blender_scene, self.is_viewport_render, blender_object, use_instancing,
-                                transformation)
+                                transformation, self.geometry_index)
         key = MeshExporter.get_mesh_key(blender_object, self.is_viewport_render, use_instancing)
         self.__convert_element(key, self.mesh_cache, exporter, luxcore_scene)
 
 
+    @profiled('material', element_arg=1)
     def convert_material(self, material):
         mat_key = get_elem_key(material)
 
@@ -439,9 +667,40 @@ class PBRTv3CoreExporter(object):
 
         self.temp_material_cache.add(mat_key)
         exporter = MaterialExporter(self, self.blender_scene, material)
-        self.__convert_element(mat_key, self.material_cache, exporter)
+
+        if not self.is_viewport_render:
+            self.__convert_element(mat_key, self.material_cache, exporter, definition_index=self.definition_index)
+            return
+
+        # The viewport only exports the nodes of node materials that changed since the last update
+        NodeExportCache.begin(self.blender_scene)
+        try:
+            self.__convert_element(mat_key, self.material_cache, exporter, definition_index=self.definition_index)
+        finally:
+            NodeExportCache.end()
+
+
+    def update_material(self, material):
+        """
+        Convert the material again (viewport renders) and return the properties of its materials and textures that
+        changed since the last conversion, or None if it did not change.
+        The properties are removed from the updated scene properties, so the caller decides whether to send them.
+        """
+        mat_key = get_elem_key(material)
+        old_exporter = self.material_cache.get(mat_key)
+        old_properties = old_exporter.properties if old_exporter is not None else None
+
+        self.temp_material_cache.discard(mat_key)
+        self.convert_material(material)
+
+        new_properties = self.material_cache[mat_key].properties
+        self.updated_scene_properties.DeleteAll(new_properties.GetAllNames())
+
+        changed_properties = diff_element_properties(old_properties, new_properties)
+        return changed_properties if changed_properties.GetAllNames() else None
 
 
+    @profiled('texture', element_arg=1)
     def convert_texture(self, texture):
         tex_key = get_elem_key(texture)
 
@@ -450,14 +709,16 @@ class PBRTv3CoreExporter(object):
 
         self.temp_texture_cache.add(tex_key)
         exporter = TextureExporter(self, self.blender_scene, texture)
-        self.__convert_element(tex_key, self.texture_cache, exporter)
+        self.__convert_element(tex_key, self.texture_cache, exporter, definition_index=self.definition_index)
 
 
+    @profiled('light', element_arg=1)
     def convert_light(self, blender_object, luxcore_scene):
         exporter = LightExporter(self, self.blender_scene, blender_object)
         self.__convert_element(get_elem_key(blender_object), self.light_cache, exporter, luxcore_scene)
 
 
+    @profiled('volume', element_arg=1)
     def convert_volume(self, volume):
         vol_key = get_elem_key(volume)
 
@@ -469,11 +730,53 @@ class PBRTv3CoreExporter(object):
         self.__convert_element(vol_key, self.volume_cache, exporter)
 
 
+    @profiled('dupli', element_arg=2)
     def convert_duplis(self, luxcore_scene, duplicator, dupli_system=None):
         exporter = DupliExporter(self, self.blender_scene, duplicator, self.is_viewport_render)
         self.__convert_element(get_elem_key(duplicator), self.dupli_cache, exporter, luxcore_scene)
 
 
+    def update_duplis(self, luxcore_scene, duplicator):
+        """
+        Re-export the duplis of an already converted duplicator (e.g. moving particles in animations).
+        Instances that do not exist anymore are deleted from the luxcore scene.
+        """
+        key = get_elem_key(duplicator)
+
+        if key in self.dupli_cache:
+            self.__delete_instances(self.dupli_cache[key].properties, luxcore_scene)
+
+        self.convert_duplis(luxcore_scene, duplicator)
+
+
+    def delete_object(self, blender_object, luxcore_scene):
+        """
+        Delete all luxcore objects and lights that were created for the Blender object from the luxcore scene
+        """
+        key = get_elem_key(blender_object)
+
+        if blender_object.type == 'LAMP':
+            if key in self.light_cache:
+                # In case of sunsky there might be multiple light sources, loop through them
+                for exported_light in self.light_cache[key].exported_lights:
+                    luxcore_name = exported_light.luxcore_name
+
+                    if exported_light.type == 'AREA':
+                        # Area lights are meshlights and treated like objects with glowing materials
+                        luxcore_scene.DeleteObject(luxcore_name)
+                    else:
+                        luxcore_scene.DeleteLight(luxcore_name)
+        else:
+            if key in self.object_cache:
+                # loop through object components (split by materials)
+                for exported_object in self.object_cache[key].exported_objects:
+                    luxcore_scene.DeleteObject(exported_object.luxcore_object_name)
+
+            if key in self.dupli_cache:
+                self.__delete_instances(self.dupli_cache[key].properties, luxcore_scene)
+
+
+    @profiled('volumes')
     def convert_all_volumes(self):
         self.__convert_world_volume()
 
@@ -483,7 +786,7 @@ class PBRTv3CoreExporter(object):
                 self.convert_volume(volume)
 
 
-    def __convert_element(self, cache_key, cache, exporter, luxcore_scene=None):
+    def __convert_element(self, cache_key, cache, exporter, luxcore_scene=None, definition_index=None):
         if cache_key in cache:
             exporter = cache[cache_key]
             old_properties = exporter.properties.GetAllNames()
@@ -493,11 +796,23 @@ class PBRTv3CoreExporter(object):
             self.updated_scene_properties.DeleteAll(old_properties)
 
         new_properties = exporter.convert(luxcore_scene) if luxcore_scene else exporter.convert()
+
+        if definition_index is not None:
+            new_properties = definition_index.deduplicate(exporter, new_properties)
+
         self.__set_scene_properties(new_properties)
 
         cache[cache_key] = exporter
 
 
+    def __delete_instances(self, properties, luxcore_scene):
+        for object_prefix in properties.GetAllUniqueSubNames('scene.objects'):
+            luxcore_scene.DeleteObject(object_prefix.split('.')[-1])
+
+        for light_prefix in properties.GetAllUniqueSubNames('scene.lights'):
+            luxcore_scene.DeleteLight(light_prefix.split('.')[-1])
+
+
     def __set_scene_properties(self, properties):
         self.updated_scene_properties.Set(properties)
         self.scene_properties.Set(properties)
@@ -43,6 +43,10 @@ class CameraExporter(object):
         self.is_viewport_render = is_viewport_render
         self.context = context
         self.properties = pyluxcore.Properties()
+        # Camera to use instead of the scene camera (multi-camera rendering)
+        self.blender_camera = None
+        # MotionSampler with precomputed motion blur matrices, set by the exporter during convert()
+        self.motion_sampler = None
 
 
     def convert(self):
@@ -169,8 +173,12 @@ class CameraExporter(object):
             self.__convert_shutter(luxCamera)
 
 
+    def get_camera(self):
+        return self.blender_camera if self.blender_camera is not None else self.blender_scene.camera
+
+
     def __convert_final_camera(self):
-        blCamera = self.blender_scene.camera
+        blCamera = self.get_camera()
         blCameraData = blCamera.data
         luxCamera = blCameraData.pbrtv3_camera
 
@@ -268,7 +276,8 @@ class CameraExporter(object):
             set_prop_cam(self.properties, 'lookat.target', [0, 0, -1])
             set_prop_cam(self.properties, 'up', [0, 1, 0])
 
-            anim_matrices = object_anim_matrices(self.blender_scene, blCamera, steps=luxCamera.motion_blur_samples)
+            anim_matrices = object_anim_matrices(self.blender_scene, blCamera, steps=luxCamera.motion_blur_samples,
+                                                 sampler=self.motion_sampler)
 
             if anim_matrices:
                 for i in range(len(anim_matrices)):
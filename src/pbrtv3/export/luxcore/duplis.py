@@ -25,14 +25,16 @@
 # ***** END GPL LICENCE BLOCK *****
 #
 
-import math, mathutils, time
+import math, mathutils, os, time
 from ...outputs.luxcore_api import pyluxcore
 from ...outputs.luxcore_api import ToValidPBRTv3CoreName
+from ...outputs.logger import PBRTv3Logger
 from ...export import matrix_to_list, is_obj_visible
+from ...export.culling import DupliCuller
 
-from .objects import ObjectExporter
+from .objects import ObjectExporter, ExportedObject, convert_pointiness_shape
 from .lights import LightExporter
-from .utils import log_exception
+from .utils import get_elem_key, log_exception
 
 
 class DupliExporter(object):
@@ -96,7 +98,7 @@ class DupliExporter(object):
         """
         obj = self.duplicator
 
-        print('[%s] Exporting particle systems/duplis' % obj.name)
+        PBRTv3Logger.debug('dupli', '[%s] Exporting particle systems/duplis', obj.name)
         time_start = time.time()
 
         mode = 'VIEWPORT' if self.is_viewport_render else 'RENDER'
@@ -106,6 +108,11 @@ class DupliExporter(object):
 
         self.dupli_amount = len(self.duplicator.dupli_list)
 
+        culler = None
+        if not self.is_viewport_render:
+            culler = DupliCuller.from_settings(self.blender_scene, self.luxcore_exporter.camera_exporter.get_camera(),
+                                               self.luxcore_exporter.motion_sampler)
+
         # Create our own DupliOb list to work around incorrect layers
         # attribute when inside create_dupli_list()..free_dupli_list()
         duplis = []
@@ -123,6 +130,11 @@ class DupliExporter(object):
                 non_invertible_count += 1
                 continue
 
+            # Lights can illuminate the frame from anywhere, they are never culled
+            if culler is not None and dupli_ob.object.type != 'LAMP' and culler.is_culled(dupli_ob.object,
+                                                                                          dupli_ob.matrix):
+                continue
+
             if dupli_ob.object not in self.luxcore_exporter.instanced_duplis:
                 self.luxcore_exporter.instanced_duplis.add(dupli_ob.object)
 
@@ -138,6 +150,12 @@ class DupliExporter(object):
         if non_invertible_count > 0:
             print('WARNING: %d particles with non-invertible matrix were skipped.' % non_invertible_count)
 
+        if culler is not None:
+            PBRTv3Logger.count('culled outside view', amount=culler.frustum_culled)
+            PBRTv3Logger.count('culled too small', amount=culler.size_culled)
+            PBRTv3Logger.debug('dupli', '[%s] Culled %d instances outside of the view and %d too small instances',
+                               obj.name, culler.frustum_culled, culler.size_culled)
+
         obj.dupli_list_clear()
 
         # Preprocessing step to speed up particle export below.
@@ -150,6 +168,14 @@ class DupliExporter(object):
                 object_exporter.convert(False, False, luxcore_scene, None, dm)
                 unique_objs[do.name] = object_exporter.exported_objects
 
+        # Decimated levels of the unique objects, {object name: [exported objects of level 1, level 2, ...]}
+        lod_manager = self.luxcore_exporter.lod_manager
+        lod_objs = {}
+        if lod_manager is not None:
+            for do, dm, psys_name, persistent_id in duplis:
+                if do.name not in lod_objs and do.type == 'MESH':
+                    lod_objs[do.name] = self.__convert_lod_levels(do, lod_manager.get_levels(do))
+
         # dupli object, dupli matrix
         for do, dm, psys_name, persistent_id in duplis:
             # Increment dupli number for progress display
@@ -181,6 +207,12 @@ class DupliExporter(object):
             else:
                 exported_objects = unique_objs[do.name]
 
+                lod_levels = lod_objs.get(do.name)
+                if lod_levels:
+                    level = lod_manager.select(do, dm)
+                    if level > 0:
+                        exported_objects = lod_levels[level - 1]
+
                 name = do.name + dupli_name_suffix
                 if do.library:
                     name += do.library.name
@@ -197,7 +229,45 @@ class DupliExporter(object):
         del duplis
 
         time_elapsed = time.time() - time_start
-        print('[%s] Particle export finished (%.3fs)' % (obj.name, time_elapsed))
+        PBRTv3Logger.count('dupli', time_elapsed)
+        PBRTv3Logger.debug('dupli', '[%s] Particle export finished (%.3fs)', obj.name, time_elapsed)
+
+
+    def __convert_lod_levels(self, obj, levels):
+        """
+        Define the shapes of the LOD levels (PLY files, one per material index) and return a list of exported
+        objects per level
+        """
+        if not levels:
+            return None
+
+        lod_objs = []
+
+        for level, parts in enumerate(levels, 1):
+            exported_objects = []
+
+            for material_index, path in sorted(parts.items()):
+                try:
+                    material = obj.material_slots[material_index].material
+                except IndexError:
+                    material = None
+
+                if get_elem_key(material) not in self.luxcore_exporter.material_cache:
+                    self.luxcore_exporter.convert_material(material)
+                luxcore_material_name = self.luxcore_exporter.material_cache[get_elem_key(material)].luxcore_name
+
+                # Named after the PLY file, so objects with the same geometry share the shape
+                shape_name = ToValidPBRTv3CoreName(os.path.splitext(os.path.basename(path))[0] + '_lod')
+                self.properties.Set(pyluxcore.Property('scene.shapes.' + shape_name + '.type', 'mesh'))
+                self.properties.Set(pyluxcore.Property('scene.shapes.' + shape_name + '.ply', path))
+                # Like the full detail shape, wrapped in a pointiness shape if a material uses pointiness
+                shape_name = convert_pointiness_shape(obj, self.properties, shape_name)
+
+                exported_objects.append(ExportedObject(None, shape_name, luxcore_material_name))
+
+            lod_objs.append(exported_objects)
+
+        return lod_objs
 
 
     def __convert_hair(self, luxcore_scene, particle_system):
@@ -217,7 +287,7 @@ class DupliExporter(object):
         elif not mod.particle_system.name == psys.name or not mod.show_render:
             return
 
-        print('[%s: %s] Exporting hair' % (self.duplicator.name, psys.name))
+        PBRTv3Logger.debug('hair', '[%s: %s] Exporting hair', self.duplicator.name, psys.name)
         time_start = time.time()
 
         # Export code copied from export/geometry (line 947)
@@ -419,4 +489,5 @@ class DupliExporter(object):
             psys.set_resolution(self.blender_scene, obj, 'PREVIEW')
 
         time_elapsed = time.time() - time_start
-        print('[%s: %s] Hair export finished (%.3fs)' % (obj.name, psys.name, time_elapsed))
+        PBRTv3Logger.count('hair', time_elapsed)
+        PBRTv3Logger.debug('hair', '[%s: %s] Hair export finished (%.3fs)', obj.name, psys.name, time_elapsed)
@@ -31,6 +31,8 @@ import bpy
 
 from ...outputs.luxcore_api import pyluxcore
 from ...outputs.luxcore_api import ToValidPBRTv3CoreName
+from ...outputs.logger import PBRTv3Logger
+from ...export.dedup import mesh_fingerprint, estimate_mesh_size
 
 
 class ExportedShape(object):
@@ -42,12 +44,14 @@ class ExportedShape(object):
 
 class MeshExporter(object):
     def __init__(self, blender_scene, is_viewport_render=False, blender_object=None, use_instancing=False,
-                 transformation=None):
+                 transformation=None, geometry_index=None):
         self.blender_scene = blender_scene
         self.is_viewport_render = is_viewport_render
         self.blender_object = blender_object
         self.use_instancing = use_instancing
         self.transformation = transformation
+        # GeometryIndex to share the shapes of identical meshes (only used for instanced meshes)
+        self.geometry_index = geometry_index
 
         self.properties = pyluxcore.Properties()
         self.exported_shapes = []
@@ -106,14 +110,18 @@ class MeshExporter(object):
         if prepared_mesh is None or len(prepared_mesh.tessfaces) == 0:
             return
 
-        luxcore_shape_name = self.__generate_shape_name()
-        self.__export_mesh_to_shape(luxcore_shape_name, prepared_mesh, luxcore_scene)
+        if self.geometry_index is not None and self.use_instancing:
+            self.__export_deduplicated_shape(prepared_mesh, luxcore_scene)
+        else:
+            luxcore_shape_name = self.__generate_shape_name()
+            self.__export_mesh_to_shape(luxcore_shape_name, prepared_mesh, luxcore_scene)
 
         bpy.data.meshes.remove(prepared_mesh, do_unlink=False)
 
         end_time = time.time() - start_time
+        PBRTv3Logger.count('mesh', end_time)
         if end_time > 0.5:
-            print('Export of mesh %s took %.3fs' % (self.blender_object.data.name, end_time))
+            PBRTv3Logger.debug('mesh', 'Export of mesh %s took %.3fs', self.blender_object.data.name, end_time)
 
 
     def __prepare_export_mesh(self):
@@ -153,6 +161,24 @@ class MeshExporter(object):
             self.exported_shapes.append(ExportedShape(entry))
 
 
+    def __export_deduplicated_shape(self, mesh, luxcore_scene):
+        """
+        Reuse the shapes of an already exported mesh with identical geometry, or export the mesh under a name
+        derived from its fingerprint (so re-exporting a changed mesh never overwrites the shapes of other objects)
+        """
+        fingerprint = mesh_fingerprint(mesh)
+        mesh_key = MeshExporter.get_mesh_key(self.blender_object, self.is_viewport_render, self.use_instancing)
+        shared_shapes = self.geometry_index.find(fingerprint, mesh_key)
+
+        if shared_shapes is not None:
+            self.exported_shapes = shared_shapes
+            return
+
+        luxcore_shape_name = ToValidPBRTv3CoreName('%s_dedup_%s' % (self.blender_scene.name, fingerprint[2]))
+        self.__export_mesh_to_shape(luxcore_shape_name, mesh, luxcore_scene)
+        self.geometry_index.add(fingerprint, self.exported_shapes, estimate_mesh_size(mesh), mesh_key)
+
+
     def __generate_shape_name(self, matIndex=-1):
         mesh_key = MeshExporter.get_mesh_key(self.blender_object, self.is_viewport_render, self.use_instancing)
         shape_name = self.blender_scene.name
@@ -30,6 +30,7 @@ import os
 from ...extensions_framework import util as efutil
 from ...outputs.luxcore_api import pyluxcore
 from ...outputs.luxcore_api import ToValidPBRTv3CoreName
+from ...outputs.logger import PBRTv3Logger
 from ...export import is_obj_visible
 from ...export import object_anim_matrices
 from ...export import matrix_to_list
@@ -39,6 +40,34 @@ from .utils import calc_shutter, get_elem_key, log_exception
 from .meshes import MeshExporter
 
 
+def convert_pointiness_shape(blender_object, properties, luxcore_shape_name):
+    """
+    Insert a pointiness shape (defined in properties) if a pointiness node or texture is used in one of the
+    materials of the object. Returns the name of the shape to use for the object.
+    """
+    use_pointiness = False
+
+    for mat_slot in blender_object.material_slots:
+        if mat_slot.material:
+            if mat_slot.material.pbrtv3_material.nodetree:
+                # Material with nodetree, check the nodes for pointiness node
+                use_pointiness = find_node(mat_slot.material, 'pbrtv3_texture_pointiness_node')
+            else:
+                # Material without nodetree, check its textures for pointiness texture
+                for tex_slot in mat_slot.material.texture_slots:
+                    if tex_slot and tex_slot.texture and tex_slot.texture.pbrtv3_texture.type == 'pointiness':
+                        use_pointiness = True
+                        break
+
+    if use_pointiness:
+        pointiness_shape = luxcore_shape_name + '_pointiness'
+        properties.Set(pyluxcore.Property('scene.shapes.' + pointiness_shape + '.type', 'pointiness'))
+        properties.Set(pyluxcore.Property('scene.shapes.' + pointiness_shape + '.source', luxcore_shape_name))
+        luxcore_shape_name = pointiness_shape
+
+    return luxcore_shape_name
+
+
 class ExportedObject(object):
     def __init__(self, name, shape_name, material_name):
         self.luxcore_object_name = name
@@ -88,6 +117,10 @@ class ObjectExporter(object):
         if self.is_dupli or (obj.pbrtv3_object.append_proxy and obj.pbrtv3_object.proxy_type == 'plymesh'):
             return True
 
+        # Mesh deduplication shares one shape between objects, so the transformation can't be baked into the mesh
+        if self.luxcore_exporter.geometry_index is not None:
+            return True
+
         # If the mesh is only used once, instancing is a waste of memory
         # However, duplis don't increase the users count, so we count those separately
         if (not ((obj.parent and obj.parent.is_duplicator) or
@@ -175,7 +208,8 @@ class ObjectExporter(object):
         use_instancing = self.__use_instancing(anim_matrices)
 
         if not self.is_dupli:
-            print('Converting object %s %s' % (obj.name, 'as instance' if use_instancing else ''))
+            PBRTv3Logger.count('object')
+            PBRTv3Logger.debug('object', 'Converting object %s %s', obj.name, 'as instance' if use_instancing else '')
 
         # Check if mesh is in cache
         if MeshExporter.get_mesh_key(obj, self.is_viewport_render, use_instancing) in self.luxcore_exporter.mesh_cache:
@@ -249,27 +283,7 @@ class ObjectExporter(object):
 
 
     def __handle_pointiness(self, luxcore_shape_name):
-        use_pointiness = False
-
-        for mat_slot in self.blender_object.material_slots:
-            if mat_slot.material:
-                if mat_slot.material.pbrtv3_material.nodetree:
-                    # Material with nodetree, check the nodes for pointiness node
-                    use_pointiness = find_node(mat_slot.material, 'pbrtv3_texture_pointiness_node')
-                else:
-                    # Material without nodetree, check its textures for pointiness texture
-                    for tex_slot in mat_slot.material.texture_slots:
-                        if tex_slot and tex_slot.texture and tex_slot.texture.pbrtv3_texture.type == 'pointiness':
-                            use_pointiness = True
-                            break
-
-        if use_pointiness:
-            pointiness_shape = luxcore_shape_name + '_pointiness'
-            self.properties.Set(pyluxcore.Property('scene.shapes.' + pointiness_shape + '.type', 'pointiness'))
-            self.properties.Set(pyluxcore.Property('scene.shapes.' + pointiness_shape + '.source', luxcore_shape_name))
-            luxcore_shape_name = pointiness_shape
-
-        return luxcore_shape_name
+        return convert_pointiness_shape(self.blender_object, self.properties, luxcore_shape_name)
 
 
     def __create_object_properties(self, luxcore_object_name, luxcore_shape_name, luxcore_material_name, transform, anim_matrices):
@@ -309,6 +323,7 @@ class ObjectExporter(object):
 
         if lux_camera.usemblur and lux_camera.objectmblur:
             steps = lux_camera.motion_blur_samples
-            return object_anim_matrices(self.blender_scene, self.blender_object, steps=steps)
+            return object_anim_matrices(self.blender_scene, self.blender_object, steps=steps,
+                                        sampler=self.luxcore_exporter.motion_sampler)
         else:
             return None
\ No newline at end of file
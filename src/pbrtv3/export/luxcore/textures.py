@@ -25,7 +25,7 @@
 # ***** END GPL LICENCE BLOCK *****
 #
 
-import bpy, math, mathutils, os, tempfile
+import bpy, math, mathutils, os
 
 from ...extensions_framework import util as efutil
 from ...outputs.luxcore_api import pyluxcore
@@ -33,6 +33,9 @@ from ...outputs.luxcore_api import ToValidPBRTv3CoreName
 from ...export import matrix_to_list
 from ...export import get_expanded_file_name
 from ...export.volumes import SmokeCache
+from ...export.image_cache import ImageCache
+from ...export.texture_pyramid import TexturePyramid
+from ...export.image_sequence import SequenceIndex
 
 from .utils import convert_texture_channel
 
@@ -213,15 +216,12 @@ class TextureExporter(object):
             # IMAGE/MOVIE/SEQUENCE
             ####################################################################
             elif bl_texType == 'IMAGE' and texture.image and texture.image.source in ['GENERATED', 'FILE', 'SEQUENCE']:
-                temp_file = tempfile.NamedTemporaryFile(delete=False)
-                tex_image = temp_file.name
-
                 if texture.image.source == 'GENERATED':
-                    texture.image.save_render(tex_image, self.blender_scene)
+                    tex_image = ImageCache.get_path(texture.image, self.blender_scene)
 
                 if texture.image.source == 'FILE':
                     if texture.image.packed_file:
-                        texture.image.save_render(tex_image, self.blender_scene)
+                        tex_image = ImageCache.get_path(texture.image, self.blender_scene)
                     else:
                         if texture.library is not None:
                             f_path = efutil.filesystem_path(
@@ -237,57 +237,21 @@ class TextureExporter(object):
 
                 if texture.image.source == 'SEQUENCE':
                     if texture.image.packed_file:
-                        tex_image = 'luxblend_extracted_image_%s.%s' % (
-                            bpy.path.clean_name(texture.name), self.blender_scene.render.image_settings.file_format)
-                        tex_image = os.path.join(extract_path, tex_image)
-                        texture.image.save_render(tex_image, self.blender_scene)
+                        tex_image = ImageCache.get_path(texture.image, self.blender_scene)
                     else:
                         # sequence params from blender
                         # remove tex_preview extension to avoid error
                         sequence = bpy.data.textures[(texture.name).replace('.001', '')].image_user
-                        seqframes = sequence.frame_duration
-                        seqoffset = sequence.frame_offset
-                        seqstartframe = sequence.frame_start  # the global frame at which the imagesequence starts
-                        seqcyclic = sequence.use_cyclic
-                        currentframe = self.blender_scene.frame_current
-
-                        if texture.library is not None:
-                            f_path = efutil.filesystem_path(
-                                bpy.path.abspath(texture.image.filepath, texture.library.filepath))
-                        else:
-                            f_path = efutil.filesystem_path(texture.image.filepath)
 
-                        if currentframe < seqstartframe:
-                            fnumber = 1 + seqoffset
+                        if self.luxcore_exporter.is_viewport_render:
+                            prefetch_count = 0
                         else:
-                            fnumber = currentframe - (seqstartframe - 1) + seqoffset
+                            prefetch_count = self.blender_scene.pbrtv3_texture_cache.sequence_prefetch
 
-                        if fnumber > seqframes:
-                            if not seqcyclic:
-                                fnumber = seqframes
-                            else:
-                                fnumber = (currentframe - (seqstartframe - 1)) % seqframes
-                                if fnumber == 0:
-                                    fnumber = seqframes
+                        f_path, exists = SequenceIndex.get_frame_path(texture.image, sequence, self.blender_scene,
+                                                                      texture.library, prefetch_count)
 
-                        import re
-
-                        def get_seq_filename(number, f_path):
-                            m = re.findall(r'(\d+)', f_path)
-                            if len(m) == 0:
-                                return 'ERR: Can\'t find pattern'
-
-                            rightmost_number = m[len(m) - 1]
-                            seq_length = len(rightmost_number)
-
-                            nstr = '%i' % number
-                            new_seq_number = nstr.zfill(seq_length)
-
-                            return f_path.replace(rightmost_number, new_seq_number)
-
-                        f_path = get_seq_filename(fnumber, f_path)
-
-                        if not os.path.exists(f_path):
+                        if not exists:
                             raise Exception(
                                 'Image referenced in blender texture %s doesn\'t exist: %s' % (texture.name, f_path))
                         tex_image = efutil.filesystem_path(f_path)
@@ -298,6 +262,7 @@ class TextureExporter(object):
                 channel = texture.pbrtv3_texture.pbrtv3_tex_imagesampling.channel_luxcore
 
                 self.properties.Set(pyluxcore.Property(prefix + '.type', ['imagemap']))
+                tex_image = TexturePyramid.resolve(self.blender_scene, tex_image)
                 self.properties.Set(pyluxcore.Property(prefix + '.file', [tex_image]))
                 self.properties.Set(pyluxcore.Property(prefix + '.gamma', gamma))
                 self.properties.Set(pyluxcore.Property(prefix + '.gain', gain))
@@ -541,6 +506,7 @@ class TextureExporter(object):
             ####################################################################
             elif texType == 'imagemap':
                 full_name, base_name = get_expanded_file_name(texture, luxTex.filename)
+                full_name = TexturePyramid.resolve(self.blender_scene, full_name)
                 self.properties.Set(pyluxcore.Property(prefix + '.file', full_name))
                 self.properties.Set(pyluxcore.Property(prefix + '.gamma', [float(luxTex.gamma)]))
                 self.properties.Set(pyluxcore.Property(prefix + '.gain', [float(luxTex.gain)]))
@@ -557,6 +523,7 @@ class TextureExporter(object):
             ####################################################################
             elif texType == 'normalmap':
                 full_name, base_name = get_expanded_file_name(texture, luxTex.filename)
+                full_name = TexturePyramid.resolve(self.blender_scene, full_name)
                 self.properties.Set(pyluxcore.Property(prefix + '.file', full_name))
                 self.__convert_mapping(prefix, texture)
             ####################################################################
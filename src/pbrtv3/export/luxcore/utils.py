@@ -112,6 +112,37 @@ def convert_param_to_luxcore_property(param):
     return [parsed[0], param[1]]
 
 
+def group_element_properties(properties):
+    """
+    Returns {element prefix: {property name: property string}} of the properties, where the element prefix is the
+    first three parts of the name (e.g. scene.materials.<name> or scene.textures.<name>)
+    """
+    elements = {}
+
+    for name in properties.GetAllNames():
+        element = '.'.join(name.split('.')[:3])
+        elements.setdefault(element, {})[name] = str(properties.Get(name))
+
+    return elements
+
+
+def diff_element_properties(old_properties, new_properties):
+    """
+    Returns the properties of the elements in new_properties that are not defined exactly the same in
+    old_properties (which may be None). Elements are compared and returned as a whole, because PBRTv3Core redefines
+    a material or texture only from the properties passed to the same Parse() call.
+    """
+    old_elements = group_element_properties(old_properties) if old_properties is not None else {}
+    changed_properties = pyluxcore.Properties()
+
+    for element, element_properties in group_element_properties(new_properties).items():
+        if old_elements.get(element) != element_properties:
+            for name in element_properties:
+                changed_properties.Set(new_properties.Get(name))
+
+    return changed_properties
+
+
 def calc_shutter(blender_scene, lux_camera_settings):
     fps = blender_scene.render.fps / blender_scene.render.fps_base
 
@@ -24,6 +24,7 @@
 #
 # ***** END GPL LICENCE BLOCK *****
 #
+import collections
 import os
 
 import bpy
@@ -31,8 +32,13 @@ import bpy
 from ..extensions_framework import util as efutil
 
 from ..export import ParamSet
+from ..export.image_cache import ImageCache
+from ..export.texture_pyramid import TexturePyramid
+from ..export.image_sequence import SequenceIndex
+from ..export.profiler import ExportProfiler
 from ..outputs import PBRTv3Log, PBRTv3Manager
-from ..properties import find_node
+from ..outputs.logger import PBRTv3Logger
+from ..properties import NodeTreeIndex
 
 
 class TextureCounter(object):
@@ -60,7 +66,8 @@ class ExportedTextures(object):
     texture_types = []  # Float|Color
     texture_texts = []  # Texture plugin name
     texture_psets = []  # ParamSets
-    exported_texture_names = []
+    exported_texture_names = []  # In export order, the last one is used by the alpha texture export
+    exported_texture_set = set()
     scalers_count = 0
 
     @staticmethod
@@ -71,6 +78,7 @@ class ExportedTextures(object):
         ExportedTextures.texture_texts = []
         ExportedTextures.texture_psets = []
         ExportedTextures.exported_texture_names = []
+        ExportedTextures.exported_texture_set = set()
         ExportedTextures.scalers_count = 0
 
     @staticmethod
@@ -83,9 +91,10 @@ class ExportedTextures(object):
         if lux_context.API_TYPE == 'PURE':
             lux_context.texture(name, type, texture, params)
             ExportedTextures.exported_texture_names.append(name)
+            ExportedTextures.exported_texture_set.add(name)
             return
 
-        if name not in ExportedTextures.exported_texture_names:
+        if name not in ExportedTextures.exported_texture_set:
             ExportedTextures.texture_names.append(name)
             ExportedTextures.texture_types.append(type)
             ExportedTextures.texture_texts.append(texture)
@@ -99,9 +108,16 @@ class ExportedTextures(object):
                 ExportedTextures.texture_texts,
                 ExportedTextures.texture_psets
         ):
-            if lux_context.API_TYPE != 'PURE' and n not in ExportedTextures.exported_texture_names:
+            if lux_context.API_TYPE != 'PURE' and n not in ExportedTextures.exported_texture_set:
                 lux_context.texture(n, ty, tx, p)
                 ExportedTextures.exported_texture_names.append(n)
+                ExportedTextures.exported_texture_set.add(n)
+
+        # All pending textures are exported now
+        ExportedTextures.texture_names = []
+        ExportedTextures.texture_types = []
+        ExportedTextures.texture_texts = []
+        ExportedTextures.texture_psets = []
 
 
 class MaterialCounter(object):
@@ -128,14 +144,15 @@ class ExportedMaterials(object):
     # Static class variables
     material_names = []
     material_psets = []
-    exported_material_names = []
+    exported_material_names = set()
 
     @staticmethod
     def clear():
         MaterialCounter.reset()
+        MaterialRegistry.clear()
         ExportedMaterials.material_names = []
         ExportedMaterials.material_psets = []
-        ExportedMaterials.exported_material_names = []
+        ExportedMaterials.exported_material_names = set()
 
     @staticmethod
     def makeNamedMaterial(lux_context, name, paramset):
@@ -152,7 +169,143 @@ class ExportedMaterials(object):
         for n, p in zip(ExportedMaterials.material_names, ExportedMaterials.material_psets):
             if lux_context.API_TYPE != 'PURE' and n not in ExportedMaterials.exported_material_names:
                 lux_context.makeNamedMaterial(n, p)
-                ExportedMaterials.exported_material_names.append(n)
+                ExportedMaterials.exported_material_names.add(n)
+
+        # All pending materials are exported now
+        ExportedMaterials.material_names = []
+        ExportedMaterials.material_psets = []
+
+
+class ContextRecorder(object):
+    """
+    Forwards all calls to a Context and records them, so they can be replayed into the Context later
+    """
+
+    # Named definitions, file exports write them only once (see ExportedTextures and ExportedMaterials)
+    NAMED_DEFINITIONS = {'texture', 'makeNamedMaterial', 'makeNamedVolume'}
+
+    def __init__(self, lux_context):
+        self.lux_context = lux_context
+        self.calls = []
+
+    def __getattr__(self, name):
+        attr = getattr(self.lux_context, name)
+
+        if not callable(attr):
+            return attr
+
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return attr(*args, **kwargs)
+
+        return record
+
+    @staticmethod
+    def replay(lux_context, calls):
+        skip_definitions = lux_context.API_TYPE != 'PURE'
+
+        for name, args, kwargs in calls:
+            if skip_definitions and name in ContextRecorder.NAMED_DEFINITIONS:
+                continue
+
+            getattr(lux_context, name)(*args, **kwargs)
+
+
+# Everything the shape export needs to know about a material, besides its definition
+MaterialInfo = collections.namedtuple('MaterialInfo', ('is_emitter', 'light_node', 'interior', 'exterior'))
+
+
+class MaterialRegistry(object):
+    """
+    Per-export cache of the materials used by shapes, so a material shared by thousands of objects is only built
+    once: the first export() of a material builds its paramsets and textures, later calls return the cached
+    result. Named materials (mode 'indirect') only have to be defined once, the calls of direct material
+    exports (which are scoped to the current attribute block) are recorded and replayed. The same is done for
+    the area light of emitting materials.
+
+    Cleared with ExportedMaterials.clear() at the start of every export.
+    """
+
+    # {(material name, mode): (export result, recorded calls of direct exports)}
+    definitions = {}
+    # {material name: MaterialInfo}
+    infos = {}
+    # {material name: recorded calls}
+    emissions = {}
+
+    @staticmethod
+    def clear():
+        MaterialRegistry.definitions = {}
+        MaterialRegistry.infos = {}
+        MaterialRegistry.emissions = {}
+
+    @staticmethod
+    def export(scene, lux_context, material, mode='indirect'):
+        """
+        Export the material like pbrtv3_material.export(), returns its export result
+        """
+        key = (material.name, mode)
+        cached = MaterialRegistry.definitions.get(key)
+
+        if cached is not None:
+            result, calls = cached
+
+            if calls is not None:
+                ContextRecorder.replay(lux_context, calls)
+
+            PBRTv3Logger.count('material reused')
+            return result
+
+        if mode == 'direct':
+            recorder = ContextRecorder(lux_context)
+            result = material.pbrtv3_material.export(scene, recorder, material, mode=mode)
+            calls = recorder.calls
+        else:
+            result = material.pbrtv3_material.export(scene, lux_context, material, mode=mode)
+            calls = None
+
+        MaterialRegistry.definitions[key] = (result, calls)
+        return result
+
+    @staticmethod
+    def get_info(material):
+        info = MaterialRegistry.infos.get(material.name)
+
+        if info is not None:
+            return info
+
+        # Node materials emit light if the emission socket of their output node is linked
+        output = NodeTreeIndex.get_material_output(material)
+        light_node = None
+
+        if output is not None:
+            light_node = output.light_node
+            is_emitter = light_node is not None
+        elif material.pbrtv3_material.nodetree:
+            is_emitter = False
+        else:  # no node tree, so check the classic mat editor
+            is_emitter = material.pbrtv3_emission.use_emission
+
+        interior, exterior = get_material_volume_defs(material)
+        info = MaterialInfo(is_emitter, light_node, interior, exterior)
+        MaterialRegistry.infos[material.name] = info
+        return info
+
+    @staticmethod
+    def export_emission(lux_context, material, export_function):
+        """
+        Calls export_function(lux_context) for the first emitter with the material, later emitters get the
+        recorded calls
+        """
+        calls = MaterialRegistry.emissions.get(material.name)
+
+        if calls is not None:
+            ContextRecorder.replay(lux_context, calls)
+            return
+
+        recorder = ContextRecorder(lux_context)
+        export_function(recorder)
+        MaterialRegistry.emissions[material.name] = recorder.calls
 
 
 def get_instance_materials(ob):
@@ -173,17 +326,13 @@ def get_instance_materials(ob):
 
 def get_material_volume_defs(m):
     if m.pbrtv3_material.nodetree:
-        outputNode = find_node(m, 'pbrtv3_material_output_node')
-        tree_name = m.pbrtv3_material.nodetree
+        output = NodeTreeIndex.get_material_output(m)
 
-        if outputNode is None:
+        if output is None:
             print('Node tree is assigned, but does not contain an output node')
             return "", ""
 
-        int_vol_name = outputNode.interior_volume
-        ext_vol_name = outputNode.exterior_volume
-
-        return int_vol_name, ext_vol_name
+        return output.interior_volume, output.exterior_volume
     else:
         return m.pbrtv3_material.Interior_volume, m.pbrtv3_material.Exterior_volume
 
@@ -301,34 +450,26 @@ def convert_texture(scene, texture, variant_hint=None):
 
     # Translate Blender Image/movie into lux tex
     if texture.type == 'IMAGE' and texture.image and texture.image.source in ['GENERATED', 'FILE', 'SEQUENCE']:
+        # Generated and packed images are extracted once per content, all frames of an animation share the files
         extract_path = os.path.join(
             efutil.export_path,
             efutil.scene_filename(),
             bpy.path.clean_name(scene.name),
-            '%05d' % scene.frame_current
+            'textures'
         )
 
         if texture.image.packed_file and not PBRTv3Manager.CurrentScene.name == "preview":
-            # Store the render output setting
-            orig_render_format = scene.render.image_settings.file_format
-            # Read the fileformat
-            temp_unpack_format = texture.image.file_format
-            # Temporary change the file_format to render packed images in their original format
-            scene.render.image_settings.file_format = temp_unpack_format
+            # Extract packed images in their original format
+            extract_format = texture.image.file_format
+        else:
+            extract_format = None
 
         if texture.image.source == 'GENERATED':
-            tex_image = 'luxblend_baked_image_%s.%s' % (
-                bpy.path.clean_name(texture.name), scene.render.image_settings.file_format)
-            tex_image = os.path.join(extract_path, tex_image)
-            texture.image.save_render(tex_image, scene)
+            tex_image = ImageCache.get_path(texture.image, scene, extract_format, extract_path)
 
         if texture.image.source == 'FILE':
             if texture.image.packed_file:
-                tex_image = 'luxblend_extracted_image_%s.%s' % (
-                    bpy.path.clean_name(texture.name), scene.render.image_settings.file_format)
-
-                tex_image = os.path.join(extract_path, tex_image)
-                texture.image.save_render(tex_image, scene)
+                tex_image = ImageCache.get_path(texture.image, scene, extract_format, extract_path)
             else:
                 if texture.library is not None:
                     f_path = efutil.filesystem_path(bpy.path.abspath(texture.image.filepath, texture.library.filepath))
@@ -342,71 +483,21 @@ def convert_texture(scene, texture, variant_hint=None):
 
         if texture.image.source == 'SEQUENCE':
             if texture.image.packed_file:
-                tex_image = 'luxblend_extracted_image_%s.%s' % (
-                    bpy.path.clean_name(texture.name), scene.render.image_settings.file_format)
-
-                tex_image = os.path.join(extract_path, tex_image)
-                texture.image.save_render(tex_image, scene)
+                tex_image = ImageCache.get_path(texture.image, scene, extract_format, extract_path)
             else:
                 # sequence params from blender
                 # remove tex_preview extension to avoid error
                 sequence = bpy.data.textures[texture.name.replace('.001', '')].image_user
 
-                seqframes = sequence.frame_duration
-                seqoffset = sequence.frame_offset
-                seqstartframe = sequence.frame_start  # the global frame at which the imagesequence starts
-                seqcyclic = sequence.use_cyclic
-                currentframe = scene.frame_current
+                f_path, exists = SequenceIndex.get_frame_path(texture.image, sequence, scene, texture.library,
+                                                              scene.pbrtv3_texture_cache.sequence_prefetch)
 
-                if texture.library is not None:
-                    f_path = efutil.filesystem_path(bpy.path.abspath(texture.image.filepath, texture.library.filepath))
-                else:
-                    f_path = efutil.filesystem_path(texture.image.filepath)
-
-                if currentframe < seqstartframe:
-                    fnumber = 1 + seqoffset
-                else:
-                    fnumber = currentframe - (seqstartframe - 1) + seqoffset
-
-                if fnumber > seqframes:
-                    if not seqcyclic:
-                        fnumber = seqframes
-                    else:
-                        fnumber = (currentframe - (seqstartframe - 1)) % seqframes
-
-                        if fnumber == 0:
-                            fnumber = seqframes
-
-                import re
-
-                def get_seq_filename(number, f_path):
-                    m = re.findall(r'(\d+)', f_path)
-
-                    if len(m) == 0:
-                        return "ERR: Can't find pattern"
-
-                    rightmost_number = m[len(m) - 1]
-                    seq_length = len(rightmost_number)
-
-                    nstr = "%i" % number
-                    new_seq_number = nstr.zfill(seq_length)
-
-                    return f_path.replace(rightmost_number, new_seq_number)
-
-                f_path = get_seq_filename(fnumber, f_path)
-
-                # print("-----------------", f_path)
-
-                if not os.path.exists(f_path):
+                if not exists:
                     raise Exception(
                         'Image referenced in blender texture %s doesn\'t exist: %s' % (texture.name, f_path))
 
                 tex_image = efutil.filesystem_path(f_path)
 
-        if texture.image.packed_file and not PBRTv3Manager.CurrentScene.name == "preview":
-            # Restore the render output setting
-            scene.render.image_settings.file_format = orig_render_format
-
         lux_tex_name = 'imagemap'
         sampling = texture.pbrtv3_texture.pbrtv3_tex_imagesampling
 
@@ -415,7 +506,7 @@ def convert_texture(scene, texture, variant_hint=None):
         else:
             variant = 'color'
 
-        paramset.add_string('filename', tex_image)
+        paramset.add_string('filename', TexturePyramid.resolve(scene, tex_image))
 
         if variant_hint == float:
             paramset.add_string('channel', sampling.channel)
@@ -517,7 +608,7 @@ def add_texture_parameter(lux_context, lux_prop_name, variant, property_group, v
         if getattr(property_group, '%s_use%stexture' % (lux_prop_name, variant)):
             texture_name = getattr(property_group, '%s_%stexturename' % (lux_prop_name, variant))
             if texture_name:
-                with TextureCounter(texture_name):
+                with TextureCounter(texture_name), ExportProfiler.span('texture', texture_name):
                     texture = get_texture_from_scene(PBRTv3Manager.CurrentScene, texture_name)
 
                     if texture != False:
@@ -529,8 +620,8 @@ def add_texture_parameter(lux_context, lux_prop_name, variant, property_group, v
                                 ExportedTextures.texture(lux_context, texture_name, variant, tex_pbrtv3_texture.type,
                                                          paramset)
                             else:
-                                PBRTv3Log('WARNING: Texture %s is wrong variant; needed %s, got %s' % (
-                                    lux_prop_name, variant, lux_tex_variant))
+                                PBRTv3Logger.warning(None, 'Texture %s is wrong variant; needed %s, got %s',
+                                                     lux_prop_name, variant, lux_tex_variant)
                         else:
                             lux_tex_variant, lux_tex_name, paramset = convert_texture(PBRTv3Manager.CurrentScene, texture,
                                                                                       variant_hint=variant)
@@ -541,8 +632,8 @@ def add_texture_parameter(lux_context, lux_prop_name, variant, property_group, v
                                 ExportedTextures.texture(lux_context, texture_name, lux_tex_variant, lux_tex_name,
                                                          paramset)
                             else:
-                                PBRTv3Log('WARNING: Texture %s is wrong variant; needed %s, got %s' % (
-                                    lux_prop_name, variant, lux_tex_variant))
+                                PBRTv3Logger.warning(None, 'Texture %s is wrong variant; needed %s, got %s',
+                                                     lux_prop_name, variant, lux_tex_variant)
 
                         if hasattr(property_group, '%s_multiplyfloat' % lux_prop_name) and \
                                 getattr(property_group, '%s_multiplyfloat' % lux_prop_name):
@@ -599,7 +690,7 @@ def add_texture_parameter(lux_context, lux_prop_name, variant, property_group, v
                         )
 
             elif export_param_name not in ['bumpmap', 'displacementmap']:
-                PBRTv3Log('WARNING: Unassigned %s texture slot %s' % (variant, export_param_name))
+                PBRTv3Logger.warning(None, 'Unassigned %s texture slot %s', variant, export_param_name)
         else:
             if variant == 'float':
                 fval = float(getattr(property_group, '%s_floatvalue' % lux_prop_name))
@@ -620,6 +711,6 @@ def add_texture_parameter(lux_context, lux_prop_name, variant, property_group, v
                     fval
                 )
     else:
-        PBRTv3Log('WARNING: Texture %s is unsupported variant; needed %s' % (lux_prop_name, variant))
+        PBRTv3Logger.warning(None, 'Texture %s is unsupported variant; needed %s', lux_prop_name, variant)
 
     return params
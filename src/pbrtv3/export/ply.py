@@ -0,0 +1,193 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+try:
+    import numpy
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+def _get(collection, attr, dtype, count, width=1):
+    data = numpy.empty(count * width, dtype=dtype)
+
+    if count > 0:
+        collection.foreach_get(attr, data)
+
+    return data.reshape(count, width) if width > 1 else data
+
+
+class MeshArrays(object):
+    """
+    The face corner data (position, normal, uv, vertex color) of a mesh with tessfaces, read with foreach_get
+    into numpy arrays of shape (faces, 4, n). Used to write PLY files without a Python loop over the faces.
+    """
+
+    def __init__(self, mesh):
+        vertex_count = len(mesh.vertices)
+        face_count = len(mesh.tessfaces)
+
+        co = _get(mesh.vertices, 'co', numpy.float32, vertex_count, 3)
+        vertex_normals = _get(mesh.vertices, 'normal', numpy.float32, vertex_count, 3)
+        faces = _get(mesh.tessfaces, 'vertices_raw', numpy.int32, face_count, 4)
+        face_normals = _get(mesh.tessfaces, 'normal', numpy.float32, face_count, 3)
+        smooth = _get(mesh.tessfaces, 'use_smooth', numpy.int32, face_count) != 0
+
+        self.face_count = face_count
+        self.material_indices = _get(mesh.tessfaces, 'material_index', numpy.int32, face_count)
+        # Triangles have 0 as 4th vertex index
+        self.is_quad = faces[:, 3] != 0
+
+        self.co = co[faces]
+        # Smooth faces use the vertex normals, flat faces the face normal
+        self.normals = numpy.where(smooth[:, None, None], vertex_normals[faces], face_normals[:, None, :])
+
+        uv_textures = mesh.tessface_uv_textures
+        if len(uv_textures) > 0 and mesh.uv_textures.active and uv_textures.active.data:
+            self.uvs = _get(uv_textures.active.data, 'uv_raw', numpy.float32, face_count, 8).reshape(face_count, 4, 2)
+        else:
+            self.uvs = None
+
+        vertex_color = mesh.tessface_vertex_colors.active
+        if vertex_color:
+            self.colors = numpy.stack([_get(vertex_color.data, attr, numpy.float32, face_count, 3)
+                                       for attr in ('color1', 'color2', 'color3', 'color4')], axis=1)
+        else:
+            self.colors = None
+
+    def used_material_indices(self):
+        return sorted(set(numpy.unique(self.material_indices).tolist()))
+
+    def build_part(self, material_index=None):
+        """
+        Returns the vertices (structured array in PLY vertex layout) and the triangles (array of shape (n, 3))
+        of the faces with the material index (all faces if material_index is None).
+        Corners with equal position, normal, uv and color share one vertex.
+        """
+        columns = [self.co, self.normals]
+        if self.uvs is not None:
+            columns.append(self.uvs)
+        if self.colors is not None:
+            columns.append(self.colors)
+
+        vertex_data, triangles = self.__merge_corners(columns, material_index)
+        return self.__vertex_records(vertex_data), triangles
+
+    def build_positions(self, material_index=None):
+        """
+        Like build_part(), but corners are only merged by position and only the positions are returned
+        (array of shape (n, 3)), e.g. for preview meshes
+        """
+        return self.__merge_corners([self.co], material_index)
+
+    def __merge_corners(self, columns, material_index):
+        if material_index is None:
+            selection = numpy.arange(self.face_count)
+        else:
+            selection = numpy.nonzero(self.material_indices == material_index)[0]
+
+        face_count = len(selection)
+        is_quad = self.is_quad[selection]
+
+        corners = numpy.concatenate([column[selection] for column in columns], axis=2).reshape(face_count * 4, -1)
+
+        # The 4th corner of triangles is unused
+        valid = numpy.ones((face_count, 4), dtype=bool)
+        valid[:, 3] = is_quad
+        valid = valid.reshape(-1)
+        corners = numpy.ascontiguousarray(corners[valid])
+
+        # Merge equal corners (unique rows, compatible with old numpy versions that have no axis argument)
+        row_type = numpy.dtype((numpy.void, corners.dtype.itemsize * corners.shape[1]))
+        unique_rows, first_index, inverse = numpy.unique(corners.view(row_type), return_index=True,
+                                                         return_inverse=True)
+        vertex_data = corners[first_index]
+
+        corner_vertices = numpy.full(face_count * 4, -1, dtype=numpy.int64)
+        corner_vertices[valid] = inverse.reshape(-1)
+        corner_vertices = corner_vertices.reshape(face_count, 4)
+
+        # Split quads into two triangles
+        triangles = numpy.concatenate((corner_vertices[:, [0, 1, 2]], corner_vertices[is_quad][:, [0, 2, 3]]))
+
+        return vertex_data, triangles.astype(numpy.uint32)
+
+    def __vertex_records(self, vertex_data):
+        fields = [('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('nx', '<f4'), ('ny', '<f4'), ('nz', '<f4')]
+        if self.uvs is not None:
+            fields += [('s', '<f4'), ('t', '<f4')]
+        if self.colors is not None:
+            fields += [('red', 'u1'), ('green', 'u1'), ('blue', 'u1')]
+
+        records = numpy.empty(len(vertex_data), dtype=fields)
+
+        for column, (name, _) in enumerate(fields):
+            if name in ('red', 'green', 'blue'):
+                records[name] = (vertex_data[:, column] * 255).astype(numpy.uint8)
+            else:
+                records[name] = vertex_data[:, column]
+
+        return records
+
+
+def write_ply(path, vertices, triangles):
+    """
+    Write a binary PLY file from the vertex records and triangles returned by MeshArrays.build_part()
+    """
+    faces = numpy.empty(len(triangles), dtype=[('count', 'u1'), ('indices', '<u4', (3,))])
+    faces['count'] = 3
+    faces['indices'] = triangles
+
+    with open(path, 'wb') as ply:
+        ply.write(b'ply\n')
+        ply.write(b'format binary_little_endian 1.0\n')
+        ply.write(b'comment Created by LuxBlend 2.6 exporter for PBRTv3 - www.luxrender.net\n')
+
+        ply.write(('element vertex %d\n' % len(vertices)).encode())
+        for name in vertices.dtype.names:
+            ply.write(('property %s %s\n' % ('uchar' if name in ('red', 'green', 'blue') else 'float', name)).encode())
+
+        ply.write(('element face %d\n' % len(faces)).encode())
+        ply.write(b'property list uchar uint vertex_indices\n')
+        ply.write(b'end_header\n')
+
+        ply.write(vertices.tobytes())
+        ply.write(faces.tobytes())
+
+
+def write_ply_parts(mesh, make_path):
+    """
+    Write one binary PLY file per used material index of the mesh (which needs tessfaces).
+    make_path(material_index) returns the file path of a part.
+    Returns {material_index: (path, triangle count)}
+    """
+    arrays = MeshArrays(mesh)
+    parts = {}
+
+    for material_index in arrays.used_material_indices():
+        vertices, triangles = arrays.build_part(material_index)
+        path = make_path(material_index)
+        write_ply(path, vertices, triangles)
+        parts[material_index] = (path, len(triangles))
+
+    return parts
@@ -31,7 +31,6 @@ from ..export.geometry import GeometryExporter
 from ..export.materials import ExportedTextures, convert_texture, get_material_volume_defs, get_preview_flip, \
     get_preview_zoom
 from ..outputs import PBRTv3Log, PBRTv3Manager
-from ..outputs.pure_api import PBRTv3_VERSION
 from ..properties import find_node
 from ..properties.node_material import pbrtv3_texture_maker
 
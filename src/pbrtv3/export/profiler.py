@@ -0,0 +1,216 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import functools
+import json
+import os
+import threading
+import time
+
+from ..extensions_framework import util as efutil
+from ..outputs import PBRTv3Log
+
+# Span categories that belong to a single scene element, used for the "slowest elements" summary
+ELEMENT_CATEGORIES = {'object', 'mesh', 'material', 'texture', 'light', 'volume', 'dupli'}
+
+
+class _NullSpan(object):
+    """
+    Returned by ExportProfiler.span() when profiling is disabled
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+    __slots__ = ('category', 'name', 'start', 'child_time')
+
+    def __init__(self, category, name):
+        self.category = category
+        self.name = name
+        self.start = 0.0
+        self.child_time = 0.0
+
+    def __enter__(self):
+        ExportProfiler.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        stack = ExportProfiler.stack
+        stack.pop()
+
+        if stack:
+            stack[-1].child_time += duration
+
+        ExportProfiler.events.append((self.category, self.name, self.start, duration, duration - self.child_time,
+                                      len(stack)))
+        return False
+
+
+class ExportProfiler(object):
+    """
+    Records nested timing spans of an export (objects, meshes, materials, textures, volumes, dupli systems...)
+    and writes them as Chrome trace-event JSON (open it in chrome://tracing or https://ui.perfetto.dev).
+
+    Usage:
+        with ExportProfiler.span('mesh', obj.name):
+            ...
+
+        @profiled('material', element_arg=1)
+        def convert_material(self, material):
+            ...
+
+    When profiling is disabled, span() returns a shared no-op context manager and decorated functions are
+    called directly, so the overhead is one attribute lookup.
+    """
+    enabled = False
+    # Nesting depth of begin() calls, only the outermost export writes the trace
+    depth = 0
+    events = []
+    stack = []
+    start_time = 0.0
+    top_n = 10
+    trace_name = 'export'
+
+    @classmethod
+    def begin(cls, scene, trace_name='export'):
+        """
+        Start profiling if it is enabled in the scene settings. Returns True if profiling is active.
+        """
+        if cls.enabled:
+            cls.depth += 1
+            return True
+
+        if not scene.pbrtv3_testing.profile_export:
+            return False
+
+        cls.enabled = True
+        cls.depth = 1
+        cls.events = []
+        cls.stack = []
+        cls.start_time = time.perf_counter()
+        cls.top_n = scene.pbrtv3_testing.profile_top_n
+        cls.trace_name = '%s_%04d' % (trace_name, scene.frame_current)
+        return True
+
+    @classmethod
+    def end(cls):
+        if not cls.enabled:
+            return
+
+        cls.depth -= 1
+        if cls.depth > 0:
+            return
+
+        cls.enabled = False
+        filepath = cls.write_trace()
+        cls.print_summary(filepath)
+
+    @classmethod
+    def span(cls, category, name):
+        if not cls.enabled:
+            return _NULL_SPAN
+
+        return _Span(category, name)
+
+    @classmethod
+    def write_trace(cls):
+        directory = efutil.export_path if efutil.export_path else efutil.temp_directory()
+        filepath = os.path.join(efutil.filesystem_path(directory), cls.trace_name + '.trace.json')
+
+        pid = os.getpid()
+        tid = threading.get_ident()
+        trace_events = []
+
+        for category, name, start, duration, self_time, depth in cls.events:
+            trace_events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': (start - cls.start_time) * 1e6,
+                'dur': duration * 1e6,
+                'pid': pid,
+                'tid': tid,
+                'args': {'self_ms': round(self_time * 1000, 3)},
+            })
+
+        try:
+            with open(filepath, 'w') as f:
+                json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+        except OSError as err:
+            PBRTv3Log('Could not write export trace %s: %s' % (filepath, err))
+            return None
+
+        return filepath
+
+    @classmethod
+    def print_summary(cls, filepath):
+        total_time = time.perf_counter() - cls.start_time
+        PBRTv3Log('Export profile: %d spans in %.2fs, trace written to %s' % (len(cls.events), total_time, filepath))
+
+        elements = [event for event in cls.events if event[0] in ELEMENT_CATEGORIES]
+        elements.sort(key=lambda event: event[3], reverse=True)
+
+        if elements:
+            PBRTv3Log('Slowest elements (total / self):')
+
+        for category, name, start, duration, self_time, depth in elements[:cls.top_n]:
+            PBRTv3Log('  %8.3fs / %8.3fs  %-8s %s' % (duration, self_time, category, name))
+
+
+def profiled(category, element_arg=None):
+    """
+    Decorator that records a span for each call of the function while profiling is enabled.
+    element_arg: index of the argument (positional or passed by keyword) whose name is used as span name
+    (default: function name, also used if the element is None, e.g. an empty material slot)
+    """
+    def decorator(func):
+        element_param = func.__code__.co_varnames[element_arg] if element_arg is not None else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ExportProfiler.enabled:
+                return func(*args, **kwargs)
+
+            if element_arg is None:
+                element = None
+            elif element_arg < len(args):
+                element = args[element_arg]
+            else:
+                element = kwargs.get(element_param)
+
+            with _Span(category, getattr(element, 'name', func.__name__)):
+                return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
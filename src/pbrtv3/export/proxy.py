@@ -0,0 +1,191 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import os
+
+import bpy
+import mathutils
+
+from ..outputs.logger import PBRTv3Logger
+from .lod import decimated_mesh
+from . import ply
+
+GEOMETRY_TYPES = {'MESH', 'CURVE', 'SURFACE', 'META', 'FONT'}
+
+
+def mesh_from_triangles(name, positions, triangles):
+    """
+    Create a new Blender mesh from the arrays returned by ply.MeshArrays.build_positions()
+    """
+    mesh = bpy.data.meshes.new(name)
+    triangle_count = len(triangles)
+
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set('co', positions.astype(ply.numpy.float32).ravel())
+
+    mesh.loops.add(triangle_count * 3)
+    mesh.loops.foreach_set('vertex_index', triangles.astype(ply.numpy.int32).ravel())
+
+    mesh.polygons.add(triangle_count)
+    mesh.polygons.foreach_set('loop_start', ply.numpy.arange(0, triangle_count * 3, 3, dtype=ply.numpy.int32))
+    mesh.polygons.foreach_set('loop_total', ply.numpy.full(triangle_count, 3, dtype=ply.numpy.int32))
+
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+class ProxyBuilder(object):
+    """
+    Converts objects to PBRTv3 proxies on the data level: the evaluated render mesh is split by material index in
+    memory, each part is written as PLY file, and a new object with a decimated preview mesh and the PLY as external
+    mesh is created per part. The original object is unlinked from the scene, but its data is not modified, so
+    no bpy.ops (and no selection or mode changes) are needed and the conversion can be undone.
+    """
+
+    def __init__(self, scene, directory, quality, overwrite=True):
+        self.scene = scene
+        self.directory = directory
+        self.quality = quality
+        self.overwrite = overwrite
+
+        self.converted_count = 0
+        self.skipped_count = 0
+        self.ply_count = 0
+        self.proxy_objects = []
+
+    def convert(self, obj):
+        """
+        Convert one object, returns the list of created proxy objects (empty if the object was skipped)
+        """
+        if obj.type not in GEOMETRY_TYPES:
+            return self.__skip(obj, 'not a geometry object')
+
+        if obj.pbrtv3_object.append_proxy:
+            return self.__skip(obj, 'already a proxy')
+
+        mesh = obj.to_mesh(self.scene, True, 'RENDER')
+        if mesh is None:
+            return self.__skip(obj, 'failed to create export mesh')
+
+        try:
+            mesh.update(calc_tessface=True)
+
+            if len(mesh.tessfaces) == 0:
+                return self.__skip(obj, 'does not contain geometry')
+
+            arrays = ply.MeshArrays(mesh)
+
+            preview = decimated_mesh(self.scene, mesh, self.quality)
+            try:
+                preview_arrays = ply.MeshArrays(preview)
+            finally:
+                bpy.data.meshes.remove(preview, do_unlink=False)
+        finally:
+            bpy.data.meshes.remove(mesh, do_unlink=False)
+
+        material_indices = arrays.used_material_indices()
+        proxies = []
+
+        for material_index in material_indices:
+            ply_path = self.__write_part(obj, arrays, material_index)
+
+            if len(material_indices) > 1:
+                name = '%s_lux_proxy_m%03d' % (obj.name, material_index)
+            else:
+                name = obj.name + '_lux_proxy'
+
+            positions, triangles = preview_arrays.build_positions(material_index)
+            preview_mesh = mesh_from_triangles(name, positions, triangles)
+
+            try:
+                material = obj.material_slots[material_index].material
+            except IndexError:
+                material = None
+
+            if material is not None:
+                preview_mesh.materials.append(material)
+
+            proxy = self.__link_object(bpy.data.objects.new(name, preview_mesh), obj)
+            proxy.pbrtv3_object.append_proxy = True
+            proxy.pbrtv3_object.external_mesh = ply_path
+            proxies.append(proxy)
+
+        if len(proxies) > 1:
+            # Group the parts under an empty with the transformation of the original object
+            bounding_box = self.__link_object(bpy.data.objects.new(obj.name + '_boundingBox', None), obj)
+            bounding_box.empty_draw_type = 'CUBE'
+
+            self.__copy_transform(bounding_box, obj)
+
+            for proxy in proxies:
+                proxy.parent = bounding_box
+                proxy.matrix_parent_inverse = mathutils.Matrix.Identity(4)
+                proxy.matrix_basis = mathutils.Matrix.Identity(4)
+        else:
+            for proxy in proxies:
+                self.__copy_transform(proxy, obj)
+
+        self.scene.objects.unlink(obj)
+
+        self.converted_count += 1
+        self.proxy_objects.extend(proxies)
+        PBRTv3Logger.count('proxy')
+        PBRTv3Logger.debug('proxy', '[Object: %s] Created %d proxy objects', obj.name, len(proxies))
+
+        return proxies
+
+    def summary(self):
+        return 'Converted %d objects to %d proxies (%d PLY files written, %d objects skipped)' \
+               % (self.converted_count, len(self.proxy_objects), self.ply_count, self.skipped_count)
+
+    def __write_part(self, obj, arrays, material_index):
+        # Named by the object, because the geometry includes its modifiers: objects that share a mesh datablock
+        # can have different render geometry
+        filename = '%s.ply' % bpy.path.clean_name('%s_m%03d' % (obj.name, material_index))
+        ply_path = os.path.join(self.directory, filename)
+
+        if self.overwrite or not os.path.exists(ply_path):
+            vertices, triangles = arrays.build_part(material_index)
+            ply.write_ply(ply_path, vertices, triangles)
+            self.ply_count += 1
+            PBRTv3Logger.debug('proxy', '[Object: %s] Binary PLY file written: %s', obj.name, ply_path)
+
+        return ply_path
+
+    def __link_object(self, new_obj, original):
+        self.scene.objects.link(new_obj)
+        new_obj.layers = original.layers
+        return new_obj
+
+    @staticmethod
+    def __copy_transform(target, original):
+        target.parent = original.parent
+        target.parent_type = original.parent_type
+        target.parent_bone = original.parent_bone
+        target.matrix_parent_inverse = original.matrix_parent_inverse.copy()
+        target.matrix_basis = original.matrix_basis.copy()
+
+    def __skip(self, obj, reason):
+        self.skipped_count += 1
+        PBRTv3Logger.info('proxy', '[Object: %s] Skipped: %s', obj.name, reason)
+        return []
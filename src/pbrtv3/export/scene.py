@@ -33,17 +33,20 @@ import bpy
 from ..extensions_framework import util as efutil
 
 # PBRTv3 libs
-from ..export import get_worldscale, object_anim_matrices
+from ..export import get_worldscale, object_anim_matrices, VisibilityIndex
 from ..export import lights        as export_lights
 from ..export import materials    as export_materials
 from ..export import geometry        as export_geometry
 from ..export import volumes        as export_volumes
 from ..export import fix_matrix_order
 from ..export import is_obj_visible
+from ..export.profiler import ExportProfiler
+from ..export.image_cache import ImageCache
+from ..export.texture_budget import TextureBudgetPlanner
 from ..outputs import PBRTv3Manager, PBRTv3Log
 from ..outputs.file_api import Files
-from ..outputs.pure_api import PBRTv3_VERSION
-from ..properties import find_node
+from ..outputs.logger import PBRTv3Logger
+from ..properties import NodeTreeIndex
 
 
 class SceneExporterProperties(object):
@@ -113,13 +116,10 @@ class SceneExporter(object):
                         break
 
                 if mat.pbrtv3_material.nodetree:
-                    output_node = find_node(mat, 'pbrtv3_material_output_node')
+                    output = NodeTreeIndex.get_material_output(mat)
 
-                    if output_node is not None:
-                        light_socket = output_node.inputs['Emission']
-
-                        if light_socket.is_linked:
-                            have_emitter = light_socket.is_linked
+                    if output is not None and output.light_node is not None:
+                        have_emitter = True
 
         if have_lamp or have_emitter:
             return True
@@ -140,6 +140,31 @@ class SceneExporter(object):
         return False
 
     def export(self):
+        if self.scene is None:
+            return self.__export_scene()
+
+        PBRTv3Logger.configure(self.scene)
+        VisibilityIndex.begin(self.scene)
+        NodeTreeIndex.begin()
+        ExportProfiler.begin(self.scene, 'classic_export')
+        ImageCache.trim(self.scene)
+
+        texture_budget = TextureBudgetPlanner.from_settings(self.scene, False)
+        if texture_budget is not None:
+            texture_budget.plan()
+
+        try:
+            with ExportProfiler.span('export', 'PBRTv3 scene'):
+                return self.__export_scene()
+        finally:
+            if texture_budget is not None:
+                texture_budget.end()
+            VisibilityIndex.end()
+            NodeTreeIndex.end()
+            ExportProfiler.end()
+            PBRTv3Logger.summary('Export summary')
+
+    def __export_scene(self):
         scene = self.scene
 
         try:
@@ -225,10 +250,15 @@ class SceneExporter(object):
             # Set up camera, view and film
             is_cam_animated = False
 
+            # Sample the motion of the camera and all objects of the scene in one pass over the subframes
+            with ExportProfiler.span('stage', 'motion'):
+                motion_sampler = GE.sample_motion(scene, [scene.camera]
+                                                  if scene.camera.data.pbrtv3_camera.cammblur else [])
+
             if scene.camera.data.pbrtv3_camera.usemblur and scene.camera.data.pbrtv3_camera.cammblur:
 
                 STEPS = scene.camera.data.pbrtv3_camera.motion_blur_samples
-                anim_matrices = object_anim_matrices(scene, scene.camera, steps=STEPS)
+                anim_matrices = object_anim_matrices(scene, scene.camera, steps=STEPS, sampler=motion_sampler)
 
                 if anim_matrices:
                     num_steps = len(anim_matrices) - 1
@@ -271,13 +301,21 @@ class SceneExporter(object):
                         lux_context.set_output_file(Files.MATS)
 
                     for volume in geom_scene.pbrtv3_volumes.volumes:
-                        lux_context.makeNamedVolume(volume.name, *volume.api_output(lux_context))
+                        with ExportProfiler.span('volume', volume.name):
+                            lux_context.makeNamedVolume(volume.name, *volume.api_output(lux_context))
 
                 self.report({'INFO'}, 'Exporting geometry')
                 if self.properties.api_type == 'FILE':
                     lux_context.set_output_file(Files.GEOM)
 
-                lights_in_export |= GE.iterateScene(geom_scene)
+                with ExportProfiler.span('stage', 'geometry: ' + geom_scene.name):
+                    lights_in_export |= GE.iterateScene(geom_scene)
+
+            if GE.geometry_index is not None:
+                GE.geometry_index.report('export size')
+
+            if GE.lod_manager is not None:
+                GE.lod_manager.report()
 
             for geom_scene in geom_scenes:
                 # Make sure lamp textures go back into main file, not geom file
@@ -285,7 +323,8 @@ class SceneExporter(object):
                     lux_context.set_output_file(Files.MAIN)
 
                 self.report({'INFO'}, 'Exporting lights')
-                lights_in_export |= export_lights.lights(lux_context, geom_scene, scene, GE.ExportedMeshes)
+                with ExportProfiler.span('stage', 'lights: ' + geom_scene.name):
+                    lights_in_export |= export_lights.lights(lux_context, geom_scene, scene, GE.ExportedMeshes)
 
             if not lights_in_export:
                 raise Exception('No lights in exported data!')
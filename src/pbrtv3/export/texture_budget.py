@@ -0,0 +1,367 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import heapq
+import math
+
+import bpy
+
+from ..extensions_framework import util as efutil
+from ..outputs import PBRTv3Log
+from ..outputs.logger import PBRTv3Logger
+from . import get_expanded_file_name
+from .image_info import read_image_info
+from .texture_pyramid import TexturePyramid, WRITABLE_FORMATS, MIN_LEVEL_SIZE, select_level, texture_key
+
+IMAGE_NODES = {'pbrtv3_texture_image_map_node', 'pbrtv3_texture_blender_image_map_node',
+               'pbrtv3_texture_normal_map_node'}
+
+
+def estimate_bytes(width, height, channels, bits):
+    """
+    Memory the renderer needs for the pixels of an image (8 bit channels are stored as bytes, 16 bit as half floats
+    and everything else as floats)
+    """
+    if bits <= 8:
+        channel_size = 1
+    elif bits <= 16:
+        channel_size = 2
+    else:
+        channel_size = 4
+
+    return width * height * channels * channel_size
+
+
+class TextureEntry(object):
+    __slots__ = ('path', 'users', 'width', 'height', 'channels', 'bits', 'scalable', 'level')
+
+    def __init__(self, path, width, height, channels, bits, scalable):
+        self.path = path
+        self.users = set()
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.bits = bits
+        # Only image files can be replaced by downscaled copies
+        self.scalable = scalable
+        # Pyramid level the texture is exported with
+        self.level = 0
+
+    def get_bytes(self, level=None, image_scale=1.0):
+        if level is None:
+            level = self.level
+
+        width = max(int((self.width >> level) * image_scale), 1)
+        height = max(int((self.height >> level) * image_scale), 1)
+        return estimate_bytes(width, height, self.channels, self.bits)
+
+    def can_shrink(self):
+        return self.scalable and max(self.width, self.height) >> (self.level + 1) >= MIN_LEVEL_SIZE
+
+
+class TextureBudgetPlanner(object):
+    """
+    Estimates the memory the renderer needs for the textures of a scene before the export: the imagemaps of all
+    materials of the exported objects (classic textures and node trees, following mix materials and textures that
+    use other textures), the HDRIs of hemi lamps and the PBRTv3Core background image. Image files are measured by
+    their headers (see image_info.py), so no pixels are decoded.
+
+    If the estimate exceeds the budget, plan() either only warns, or downscales the largest textures (one pyramid
+    level at a time, through TexturePyramid), or scales all textures uniformly with imageScale (PBRTv3Core only).
+    """
+
+    def __init__(self, scene, settings, is_luxcore):
+        self.scene = scene
+        self.budget_bytes = settings.budget_size * 1024 * 1024
+        self.action = settings.budget_action
+        self.report_count = settings.budget_report_count
+        self.is_luxcore = is_luxcore
+
+        if self.action == 'imagescale' and not is_luxcore:
+            # The classic renderer has no global texture scale
+            self.action = 'pyramid'
+
+        # {normalized path or image name: TextureEntry}
+        self.entries = {}
+
+        # Uniform texture scale (PBRTv3Core imageScale), reduced further by action imagescale
+        self.image_scale = 1.0
+        if is_luxcore and scene.luxcore_scenesettings.imageScale < 99:
+            self.image_scale = scene.luxcore_scenesettings.imageScale / 100.0
+
+        self.visited_materials = set()
+        self.visited_objects = set()
+        self.visited_textures = set()
+
+    @classmethod
+    def from_settings(cls, scene, is_luxcore):
+        settings = scene.pbrtv3_texture_budget
+
+        if not settings.budget_enable:
+            return None
+
+        return cls(scene, settings, is_luxcore)
+
+    def plan(self):
+        """
+        Collect the textures, apply the budget action and print the report
+        """
+        self.collect()
+
+        pyramid_settings = self.scene.pbrtv3_texture_cache
+        if pyramid_settings.pyramid_enable:
+            # Start from the levels the pyramid settings already select
+            target_size = TexturePyramid.target_size(self.scene)
+            for entry in self.entries.values():
+                if entry.scalable:
+                    entry.level = select_level(max(entry.width, entry.height), target_size)
+
+        total = self.total_bytes()
+        original_total = total
+
+        if total > self.budget_bytes:
+            if self.action == 'pyramid':
+                total = self.__shrink_largest(total)
+            elif self.action == 'imagescale':
+                self.image_scale = max(self.image_scale * math.sqrt(self.budget_bytes / total), 0.01)
+                total = self.total_bytes()
+
+        self.report(original_total, total)
+
+    def end(self):
+        TexturePyramid.target_overrides = {}
+
+    def total_bytes(self):
+        return sum(entry.get_bytes(image_scale=self.image_scale) for entry in self.entries.values())
+
+    def report(self, original_total, total):
+        entries = sorted(self.entries.values(), key=lambda entry: entry.get_bytes(0), reverse=True)
+
+        PBRTv3Log('Texture memory: %d textures, estimated %s (budget %s)'
+                  % (len(entries), self.__format_size(original_total), self.__format_size(self.budget_bytes)))
+
+        if total != original_total:
+            if self.action == 'imagescale':
+                PBRTv3Log('Texture memory: scaling all textures by %.2f, estimated %s'
+                          % (self.image_scale, self.__format_size(total)))
+            else:
+                PBRTv3Log('Texture memory: downscaled %d textures, estimated %s'
+                          % (len(TexturePyramid.target_overrides), self.__format_size(total)))
+
+        if total > self.budget_bytes:
+            PBRTv3Logger.warning(None, 'The textures of this scene probably need more memory than the budget of %s',
+                                 self.__format_size(self.budget_bytes))
+
+        for entry in entries[:self.report_count]:
+            line = '  %10s  %5dx%-5d %dx%d bit' % (self.__format_size(entry.get_bytes(0)), entry.width,
+                                                   entry.height, entry.channels, entry.bits)
+
+            if entry.level > 0:
+                line += ' -> %dx%d' % (max(entry.width >> entry.level, 1), max(entry.height >> entry.level, 1))
+
+            PBRTv3Log('%s  %s (%s)' % (line, entry.path, ', '.join(sorted(entry.users))))
+
+    def collect(self):
+        for obj in self.scene.objects:
+            if not obj.hide_render:
+                self.__collect_object(obj)
+
+        if self.is_luxcore and self.scene.camera is not None:
+            imagepipeline = self.scene.camera.data.pbrtv3_camera.luxcore_imagepipeline
+
+            if imagepipeline.use_background_image:
+                path = efutil.filesystem_path(imagepipeline.background_image)
+                # The background image is always stored with 8 bit channels
+                self.__add_file(path, 'background image', bits=8, scalable=False)
+
+    def __collect_object(self, obj):
+        """
+        Collect the textures of an object and of the objects it instances (dupli groups, particle objects/groups),
+        which are not necessarily in the scene (e.g. linked group assets)
+        """
+        if obj.as_pointer() in self.visited_objects:
+            return
+
+        self.visited_objects.add(obj.as_pointer())
+
+        if obj.type == 'LAMP':
+            self.__collect_lamp(obj)
+
+        for slot in getattr(obj, 'material_slots', []):
+            if slot.material is not None:
+                self.__collect_material(slot.material)
+
+        if obj.dupli_type == 'GROUP' and obj.dupli_group is not None:
+            for group_obj in obj.dupli_group.objects:
+                self.__collect_object(group_obj)
+
+        for psys in getattr(obj, 'particle_systems', []):
+            settings = psys.settings
+
+            if settings.render_type == 'OBJECT' and settings.dupli_object is not None:
+                self.__collect_object(settings.dupli_object)
+            elif settings.render_type == 'GROUP' and settings.dupli_group is not None:
+                for group_obj in settings.dupli_group.objects:
+                    self.__collect_object(group_obj)
+
+    def __collect_lamp(self, obj):
+        if obj.data.type != 'HEMI':
+            return
+
+        hemi = obj.data.pbrtv3_lamp.pbrtv3_lamp_hemi
+        if hemi.infinite_map:
+            path, basename = get_expanded_file_name(obj.data, hemi.infinite_map)
+            # Environment maps are seen directly by the camera and are not downscaled
+            self.__add_file(efutil.filesystem_path(path), 'lamp ' + obj.name, scalable=False)
+
+    def __collect_material(self, material):
+        if material.name in self.visited_materials:
+            return
+
+        self.visited_materials.add(material.name)
+        pbrtv3_material = material.pbrtv3_material
+
+        if pbrtv3_material.nodetree:
+            node_tree = bpy.data.node_groups.get(pbrtv3_material.nodetree)
+
+            if node_tree is not None:
+                self.__collect_node_tree(node_tree, material)
+            return
+
+        property_group = getattr(pbrtv3_material, 'pbrtv3_mat_' + pbrtv3_material.type, None)
+        if property_group is not None:
+            self.__collect_references(property_group, 'material ' + material.name)
+
+    def __collect_node_tree(self, node_tree, material):
+        user = 'material ' + material.name
+
+        for node in node_tree.nodes:
+            if node.bl_idname not in IMAGE_NODES:
+                continue
+
+            if node.bl_idname == 'pbrtv3_texture_blender_image_map_node' and node.source == 'blender_image':
+                image = bpy.data.images.get(node.image_name)
+                if image is not None:
+                    self.__add_image(image, node.id_data, user)
+            else:
+                path = node.manual_filepath if hasattr(node, 'manual_filepath') else node.filename
+                if path:
+                    self.__add_file(efutil.filesystem_path(get_expanded_file_name(node.id_data, path)[0]), user)
+
+    def __collect_references(self, property_group, user):
+        """
+        Follow the textures and materials referenced by name in a material or texture property group
+        """
+        for prop in property_group.properties:
+            attr = prop.get('attr')
+            name = getattr(property_group, attr, None) if attr else None
+
+            if not isinstance(name, str) or not name:
+                continue
+
+            if attr.endswith('texturename'):
+                # e.g. Kd_colortexturename is used if Kd_usecolortexture is enabled
+                base, separator, variant = attr[:-len('texturename')].rpartition('_')
+                use_attr = '%s_use%stexture' % (base, variant)
+                if getattr(property_group, use_attr, True) and name in bpy.data.textures:
+                    self.__collect_texture(bpy.data.textures[name])
+
+            elif attr.endswith('_material') and name in bpy.data.materials:
+                self.__collect_material(bpy.data.materials[name])
+
+    def __collect_texture(self, texture):
+        if texture.name in self.visited_textures:
+            return
+
+        self.visited_textures.add(texture.name)
+        user = 'texture ' + texture.name
+        texture_type = texture.pbrtv3_texture.type
+
+        if texture_type == 'BLENDER':
+            if texture.type == 'IMAGE' and texture.image is not None:
+                self.__add_image(texture.image, texture, user)
+            return
+
+        property_group = getattr(texture.pbrtv3_texture, 'pbrtv3_tex_' + texture_type, None)
+        if property_group is None:
+            return
+
+        if texture_type in ('imagemap', 'normalmap') and property_group.filename:
+            path, basename = get_expanded_file_name(texture, property_group.filename)
+            self.__add_file(efutil.filesystem_path(path), user)
+
+        self.__collect_references(property_group, user)
+
+    def __add_image(self, image, owner, user):
+        if image.source == 'GENERATED' or image.packed_file:
+            # Extracted at export time, measured from the image in memory
+            key = 'image:' + image.name
+            if key not in self.entries:
+                bits = 32 if image.is_float else 8
+                self.entries[key] = TextureEntry('%s (%s)' % (image.name, image.source.lower()), image.size[0],
+                                                 image.size[1], image.channels, bits, False)
+            self.entries[key].users.add(user)
+        elif image.source in ('FILE', 'SEQUENCE'):
+            library_path = owner.library.filepath if owner.library else ''
+            path = efutil.filesystem_path(bpy.path.abspath(image.filepath, library_path))
+            # Sequences are measured by their first frame and not downscaled
+            self.__add_file(path, user, scalable=image.source == 'FILE')
+
+    def __add_file(self, path, user, bits=None, scalable=True):
+        key = texture_key(path)
+
+        if key not in self.entries:
+            info = read_image_info(path)
+
+            if info is None:
+                return
+
+            self.entries[key] = TextureEntry(key, info.width, info.height, info.channels,
+                                             info.bits if bits is None else bits,
+                                             scalable and info.format in WRITABLE_FORMATS)
+
+        self.entries[key].users.add(user)
+
+    def __shrink_largest(self, total):
+        """
+        Halve the resolution of the largest texture until the total fits into the budget
+        """
+        heap = [(-entry.get_bytes(), key) for key, entry in self.entries.items() if entry.can_shrink()]
+        heapq.heapify(heap)
+
+        while total > self.budget_bytes and heap:
+            size, key = heapq.heappop(heap)
+            entry = self.entries[key]
+
+            entry.level += 1
+            total -= -size - entry.get_bytes()
+            TexturePyramid.target_overrides[key] = max(entry.width, entry.height) >> entry.level
+
+            if entry.can_shrink():
+                heapq.heappush(heap, (-entry.get_bytes(), key))
+
+        return total
+
+    @staticmethod
+    def __format_size(size):
+        return '%.1f MB' % (size / 1024 / 1024)
@@ -0,0 +1,208 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import hashlib
+import math
+import os
+
+import bpy
+
+from ..extensions_framework import util as efutil
+from ..outputs.logger import PBRTv3Logger
+from .image_info import read_image_info
+
+# Formats Blender can write the downscaled levels in, the levels keep the format of their source
+WRITABLE_FORMATS = {'PNG', 'JPEG', 'OPEN_EXR', 'HDR', 'TIFF', 'BMP', 'TARGA'}
+
+# Levels are not made smaller than this (longest side in pixels)
+MIN_LEVEL_SIZE = 16
+
+
+def texture_key(path):
+    """
+    Normalized absolute path of an image file, the key of the texture budget overrides. The exporters pass the same
+    file with different spellings (symlinks, '..', slashes, case on Windows) to TexturePyramid.resolve()
+    """
+    return os.path.normcase(os.path.normpath(os.path.realpath(path)))
+
+
+def file_digest(path):
+    """
+    SHA-1 of the file contents
+    """
+    digest = hashlib.sha1()
+
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def select_level(longest_side, target_size):
+    """
+    Returns the pyramid level (0 = original, each level halves the resolution) of the image with the given longest
+    side that is the smallest level still at least as large as target_size
+    """
+    if longest_side <= target_size or target_size <= 0:
+        return 0
+
+    level = int(math.floor(math.log2(longest_side / target_size)))
+    return min(level, int(math.log2(max(longest_side // MIN_LEVEL_SIZE, 1))))
+
+
+class TexturePyramid(object):
+    """
+    Downscaled copies (a mip chain) of the imagemaps referenced by the exporters. resolve() returns the path of
+    the level fitting into the configured texture size, so the renderer loads and stores the smaller file instead of
+    scaling down the full resolution image itself on every render (like luxcore_scenesettings.imageScale does).
+
+    The levels are written to a content-addressed cache (named by the SHA-1 of the source file), so they are shared
+    by all textures, scenes and sessions using the same image and only built once.
+    """
+
+    # {source path: (size, mtime, digest)}
+    digests = {}
+    # {texture_key(source path): target size}, set by the TextureBudgetPlanner for the current export
+    target_overrides = {}
+
+    built_count = 0
+    reused_count = 0
+
+    @classmethod
+    def resolve(cls, scene, path):
+        """
+        Returns the path of the pyramid level to use for the image file at path (which is returned unchanged if
+        pyramids are disabled and the texture budget did not downscale it, the image is small enough or its
+        format is not supported)
+        """
+        settings = scene.pbrtv3_texture_cache
+        target_size = cls.target_overrides.get(texture_key(path))
+
+        if target_size is None:
+            if not settings.pyramid_enable:
+                return path
+            target_size = cls.target_size(scene)
+        elif settings.pyramid_enable:
+            target_size = min(target_size, cls.target_size(scene))
+
+        info = read_image_info(path)
+
+        if info is None or info.format not in WRITABLE_FORMATS:
+            return path
+
+        level = select_level(max(info.width, info.height), target_size)
+
+        if level == 0:
+            return path
+
+        try:
+            return cls.get_level(scene, path, info, level)
+        except Exception as err:
+            PBRTv3Logger.warning('texture_pyramid', 'Could not build downscaled copies of %s, using the original '
+                                                    'image: %s', path, err)
+            return path
+
+    @classmethod
+    def target_size(cls, scene):
+        """
+        The longest side in pixels the textures are scaled down to
+        """
+        settings = scene.pbrtv3_texture_cache
+
+        if settings.pyramid_mode == 'film':
+            render = scene.render
+            film_size = max(render.resolution_x, render.resolution_y) * render.resolution_percentage / 100
+            return int(film_size * settings.pyramid_film_factor)
+
+        return settings.pyramid_max_size
+
+    @classmethod
+    def cache_directory(cls, scene):
+        settings = scene.pbrtv3_texture_cache
+
+        if settings.pyramid_cache_dir:
+            directory = efutil.filesystem_path(settings.pyramid_cache_dir)
+        else:
+            directory = os.path.join(efutil.temp_directory(), 'pbrtv3_texture_pyramid')
+
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    @classmethod
+    def get_level(cls, scene, path, info, level):
+        """
+        Returns the path of the level, building it and the levels above it if they are not in the cache
+        """
+        directory = cls.cache_directory(scene)
+        digest = cls.get_digest(path)
+        extension = os.path.splitext(path)[1]
+
+        source_path = path
+        for current_level in range(1, level + 1):
+            level_path = os.path.join(directory, '%s_l%d%s' % (digest, current_level, extension))
+
+            if os.path.exists(level_path):
+                cls.reused_count += 1
+                PBRTv3Logger.count('texture_pyramid_reused')
+            else:
+                width = max(info.width >> current_level, 1)
+                height = max(info.height >> current_level, 1)
+                cls.__write_level(source_path, level_path, width, height)
+
+            source_path = level_path
+
+        PBRTv3Logger.debug('texture_pyramid', 'Using level %d (%dx%d) of %s', level, max(info.width >> level, 1),
+                           max(info.height >> level, 1), path)
+        return source_path
+
+    @classmethod
+    def get_digest(cls, path):
+        stat = os.stat(path)
+        cached = cls.digests.get(path)
+
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime):
+            return cached[2]
+
+        digest = file_digest(path)
+        cls.digests[path] = (stat.st_size, stat.st_mtime, digest)
+        return digest
+
+    @classmethod
+    def __write_level(cls, source_path, level_path, width, height):
+        # Write to a temporary name first, so an interrupted export does not leave a broken level in the cache
+        temp_path = level_path + '.tmp'
+        image = bpy.data.images.load(source_path, check_existing=False)
+
+        try:
+            image.scale(width, height)
+            image.filepath_raw = temp_path
+            image.save()
+        finally:
+            bpy.data.images.remove(image, do_unlink=True)
+
+        os.replace(temp_path, level_path)
+
+        cls.built_count += 1
+        PBRTv3Logger.count('texture_pyramid_built')
+        PBRTv3Logger.debug('texture_pyramid', 'Wrote %dx%d level %s', width, height, level_path)
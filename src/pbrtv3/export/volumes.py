@@ -36,6 +36,7 @@ from ..extensions_framework import util as efutil
 # PBRTv3 libs
 from . import ParamSet, matrix_to_list, PBRTv3Manager
 from ..outputs import PBRTv3Log
+from ..outputs.logger import PBRTv3Logger
 from ..outputs.file_api import Files
 
 
@@ -668,7 +669,7 @@ class SmokeCache(object):
 
 
 def export_smoke(smoke_obj_name, channel):
-    print('[%s] Beginning smoke export (channel: %s)' % (smoke_obj_name, channel))
+    PBRTv3Logger.debug('smoke', '[%s] Beginning smoke export (channel: %s)', smoke_obj_name, channel)
     start_time = time.time()
 
     if PBRTv3Manager.CurrentScene.name == 'preview':
@@ -775,6 +776,7 @@ def export_smoke(smoke_obj_name, channel):
                     #	        	PBRTv3Log('Binary SMOKE file written: %s' % (smoke_path))
 
     elapsed_time = time.time() - start_time
-    print('[%s] Smoke export of channel %s took %.3fs' % (smoke_obj_name, channel, elapsed_time))
+    PBRTv3Logger.count('smoke', elapsed_time)
+    PBRTv3Logger.debug('smoke', '[%s] Smoke export of channel %s took %.3fs', smoke_obj_name, channel, elapsed_time)
 
     return big_res[0], big_res[1], big_res[2], channeldata
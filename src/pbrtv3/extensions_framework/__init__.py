@@ -52,6 +52,35 @@ def log(str, popup=False, module_name='EF'):
 
 added_property_cache = {}
 
+_NUMBER_ARGUMENTS = ("name", "description", "default", "min", "max", "soft_min", "soft_max", "step", "options",
+                     "subtype", "update")
+
+# {declarative property type: (bpy.props function, accepted keyword arguments)}
+# 'ptype' is passed as the 'type' argument of collection and pointer properties.
+_PROPERTY_TYPES = {
+    'bool': (bpy.props.BoolProperty,
+             frozenset(("name", "description", "default", "options", "subtype", "update"))),
+    'bool_vector': (bpy.props.BoolVectorProperty,
+                    frozenset(("name", "description", "default", "options", "subtype", "size", "update"))),
+    'collection': (bpy.props.CollectionProperty,
+                   frozenset(("ptype", "name", "description", "default", "options"))),
+    'enum': (bpy.props.EnumProperty,
+             frozenset(("items", "name", "description", "default", "options", "update"))),
+    'float': (bpy.props.FloatProperty,
+              frozenset(_NUMBER_ARGUMENTS + ("precision", "unit"))),
+    'float_vector': (bpy.props.FloatVectorProperty,
+                     frozenset(_NUMBER_ARGUMENTS + ("precision", "size"))),
+    'int': (bpy.props.IntProperty,
+            frozenset(_NUMBER_ARGUMENTS)),
+    'int_vector': (bpy.props.IntVectorProperty,
+                   frozenset(("name", "description", "default", "min", "max", "soft_min", "soft_max", "options",
+                              "subtype", "size", "update"))),
+    'pointer': (bpy.props.PointerProperty,
+                frozenset(("ptype", "name", "description", "options", "update"))),
+    'string': (bpy.props.StringProperty,
+               frozenset(("name", "description", "default", "maxlen", "options", "subtype", "update"))),
+}
+
 
 def init_properties(obj, props, cache=True):
     """Initialise custom properties in the given object or type.
@@ -62,76 +91,26 @@ def init_properties(obj, props, cache=True):
 
     """
 
-    if not obj in added_property_cache.keys():
-        added_property_cache[obj] = []
+    added = added_property_cache.setdefault(obj, set())
 
     for prop in props:
         try:
-            if cache and prop['attr'] in added_property_cache[obj]:
+            if cache and prop['attr'] in added:
                 continue
 
-            if prop['type'] == 'bool':
-                t = bpy.props.BoolProperty
-                a = {k: v for k, v in prop.items() if k in ["name",
-                                                            "description", "default", "options", "subtype", "update"]}
-            elif prop['type'] == 'bool_vector':
-                t = bpy.props.BoolVectorProperty
-                a = {k: v for k, v in prop.items() if k in ["name",
-                                                            "description", "default", "options", "subtype", "size",
-                                                            "update"]}
-            elif prop['type'] == 'collection':
-                t = bpy.props.CollectionProperty
-                a = {k: v for k, v in prop.items() if k in ["ptype", "name",
-                                                            "description", "default", "options"]}
-                a['type'] = a['ptype']
-                del a['ptype']
-            elif prop['type'] == 'enum':
-                t = bpy.props.EnumProperty
-                a = {k: v for k, v in prop.items() if k in ["items", "name",
-                                                            "description", "default", "options", "update"]}
-            elif prop['type'] == 'float':
-                t = bpy.props.FloatProperty
-                a = {k: v for k, v in prop.items() if k in ["name",
-                                                            "description", "default", "min", "max", "soft_min",
-                                                            "soft_max",
-                                                            "step", "precision", "options", "subtype", "unit",
-                                                            "update"]}
-            elif prop['type'] == 'float_vector':
-                t = bpy.props.FloatVectorProperty
-                a = {k: v for k, v in prop.items() if k in ["name",
-                                                            "description", "default", "min", "max", "soft_min",
-                                                            "soft_max",
-                                                            "step", "precision", "options", "subtype", "size",
-                                                            "update"]}
-            elif prop['type'] == 'int':
-                t = bpy.props.IntProperty
-                a = {k: v for k, v in prop.items() if k in ["name",
-                                                            "description", "default", "min", "max", "soft_min",
-                                                            "soft_max",
-                                                            "step", "options", "subtype", "update"]}
-            elif prop['type'] == 'int_vector':
-                t = bpy.props.IntVectorProperty
-                a = {k: v for k, v in prop.items() if k in ["name",
-                                                            "description", "default", "min", "max", "soft_min",
-                                                            "soft_max",
-                                                            "options", "subtype", "size", "update"]}
-            elif prop['type'] == 'pointer':
-                t = bpy.props.PointerProperty
-                a = {k: v for k, v in prop.items() if k in ["ptype", "name",
-                                                            "description", "options", "update"]}
-                a['type'] = a['ptype']
-                del a['ptype']
-            elif prop['type'] == 'string':
-                t = bpy.props.StringProperty
-                a = {k: v for k, v in prop.items() if k in ["name",
-                                                            "description", "default", "maxlen", "options", "subtype",
-                                                            "update"]}
-            else:
+            property_type = _PROPERTY_TYPES.get(prop['type'])
+            if property_type is None:
                 continue
 
+            t, accepted = property_type
+            a = {k: v for k, v in prop.items() if k in accepted}
+
+            if 'ptype' in accepted:
+                a['type'] = a.pop('ptype')
+
             setattr(obj, prop['attr'], t(**a))
 
-            added_property_cache[obj].append(prop['attr'])
+            added.add(prop['attr'])
         except KeyError:
             # Silently skip invalid entries in props
             continue
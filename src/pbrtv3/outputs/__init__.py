@@ -28,17 +28,18 @@ import time, threading, os
 
 import bpy
 
-from ..extensions_framework import log
 from ..extensions_framework.util import TimerThread, format_elapsed_time
+from .logger import PBRTv3Logger, INFO
 
 # This def ia above the following import statements for a reason!
-def PBRTv3Log(*args, popup=False):
+def PBRTv3Log(*args, popup=False, level=INFO, category=None):
     """
-    Send string to AF log, marked as belonging to PBRTv3 module.
-    Accepts variable args (can be used as pylux.errorHandler)
+    Send string to the PBRTv3 log (see PBRTv3Logger), marked as belonging to PBRTv3 module.
+    Accepts variable args (can be used as pylux.errorHandler), they are joined with spaces. Like with PBRTv3Logger,
+    the args are only converted to strings if the level is enabled.
     """
     if len(args) > 0:
-        log(' '.join(['%s' % a for a in args]), module_name='Lux', popup=popup)
+        PBRTv3Logger.log(level, category, ' '.join(['%s'] * len(args)), *args, popup=popup)
 
 # CHOOSE API TYPE
 # Write conventional lx* files and use pylux to manage lux process or external process
@@ -225,7 +226,7 @@ class PBRTv3Manager(object):
         if api_type == 'FILE':
             Context = file_api.Custom_Context
         elif api_type == 'API':
-            Context = pure_api.Custom_Context
+            Context = pure_api.get_context_class()
         elif api_type == 'LBM2':
             Context = lbm2_api.Custom_Context
         elif api_type == 'LXM':
@@ -31,7 +31,6 @@ import bpy
 from ..extensions_framework import util as efutil
 
 from ..outputs import PBRTv3Log
-from ..outputs.pure_api import PBRTv3_VERSION
 from ..properties import ExportedVolumes
 
 
@@ -396,10 +395,10 @@ class Custom_Context(object):
         which must be passed back to PBRTv3Manager so that it can control the
         rendering process.
         """
-        from ..outputs.pure_api import PYLUX_AVAILABLE
+        from ..outputs import pure_api
 
-        if PYLUX_AVAILABLE:
-            from ..outputs.pure_api import Custom_Context as Pylux_Context
+        if pure_api.load_pylux():
+            Pylux_Context = pure_api.Custom_Context
 
             c = Pylux_Context(self.context_name)
 
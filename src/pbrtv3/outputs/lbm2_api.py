@@ -126,7 +126,7 @@ class Custom_Context(object):
             obj['paramset'].append({
                 'type': p.type,
                 'name': p.name,
-                'value': p.value
+                'value': p.get_native_value()
             })
 
         self.lbm2_objects.append(obj)
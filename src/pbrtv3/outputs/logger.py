@@ -0,0 +1,281 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import atexit
+import queue
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {'DEBUG': DEBUG, 'INFO': INFO, 'WARNING': WARNING, 'ERROR': ERROR}
+
+
+class _CategoryState(object):
+    __slots__ = ('count', 'duration', 'window_start', 'window_lines', 'suppressed', 'last_message', 'repeated')
+
+    def __init__(self):
+        # Statistics for the export summary
+        self.count = 0
+        self.duration = 0.0
+        # Rate limiting
+        self.window_start = 0.0
+        self.window_lines = 0
+        self.suppressed = 0
+        # Aggregation of repeated messages
+        self.last_message = None
+        self.repeated = 0
+
+
+class PBRTv3Logger(object):
+    """
+    Leveled logging used by PBRTv3Log. Messages are formatted lazily (only if their level is enabled) and
+    written to the console by a background thread, so hot export paths do not wait for console I/O.
+
+    Messages can have a category (e.g. 'object', 'mesh', 'ply'). For each category, identical consecutive
+    messages are aggregated into one line with a repeat count, at most rate_limit lines per second are printed
+    (the rest is counted and reported), and counts/durations are collected for the compact export summary.
+    """
+    level = INFO
+    # Max. lines per category and second
+    rate_limit = 20
+
+    categories = {}
+    lock = threading.Lock()
+    queue = None
+    thread = None
+
+    @classmethod
+    def configure(cls, scene):
+        """
+        Apply the scene's log settings and reset the summary counters, called at the start of an export
+        """
+        cls.level = LEVEL_NAMES.get(scene.pbrtv3_testing.log_level, INFO)
+
+        with cls.lock:
+            cls.categories = {}
+
+    @classmethod
+    def is_enabled(cls, level):
+        return level >= cls.level
+
+    @classmethod
+    def log(cls, level, category, message, *args, popup=False, module_name='Lux'):
+        """
+        Log a message. The args are only applied to the message (with %) if the message is printed.
+        Use count() to add the element to the export summary.
+        """
+        if level < cls.level:
+            return
+
+        if args:
+            message = message % args
+
+        if category is not None and not cls.__pass_filters(category, message):
+            return
+
+        if level >= ERROR:
+            message = 'ERROR: ' + message
+        elif level >= WARNING:
+            message = 'WARNING: ' + message
+
+        cls.write(message, module_name)
+
+        if popup:
+            # Needs the Blender UI, so it can't be done by the writer thread
+            import bpy
+            bpy.ops.ef.msg(msg_type='WARNING', msg_text=message)
+
+    @classmethod
+    def debug(cls, category, message, *args):
+        cls.log(DEBUG, category, message, *args)
+
+    @classmethod
+    def info(cls, category, message, *args):
+        cls.log(INFO, category, message, *args)
+
+    @classmethod
+    def warning(cls, category, message, *args):
+        cls.log(WARNING, category, message, *args)
+
+    @classmethod
+    def error(cls, category, message, *args):
+        cls.log(ERROR, category, message, *args)
+
+    @classmethod
+    def count(cls, category, duration=0.0, amount=1):
+        """
+        Count exported elements for the summary without logging a message
+        """
+        state = cls.__get_state(category)
+        state.count += amount
+        state.duration += duration
+
+    @classmethod
+    def add_duration(cls, category, duration):
+        cls.__get_state(category).duration += duration
+
+    @classmethod
+    def write(cls, message, module_name='Lux'):
+        """
+        Queue a line for the writer thread, the timestamp is taken now
+        """
+        if cls.thread is None or not cls.thread.is_alive():
+            cls.__start_writer()
+
+        cls.queue.put('[%s %s] %s' % (module_name, time.strftime('%Y-%b-%d %H:%M:%S'), message))
+
+    @classmethod
+    def flush(cls):
+        """
+        Print pending aggregated messages and wait until the writer thread has printed everything
+        """
+        with cls.lock:
+            states = list(cls.categories.items())
+
+        for category, state in states:
+            cls.__flush_category(category, state)
+
+        if cls.queue is not None and cls.thread is not None and cls.thread.is_alive():
+            cls.queue.join()
+
+    @classmethod
+    def shutdown(cls):
+        """
+        Print everything that is still queued and stop the writer thread, registered with atexit so no lines are
+        lost when Blender quits
+        """
+        cls.flush()
+
+        if cls.thread is not None and cls.thread.is_alive():
+            cls.queue.put(None)
+            cls.thread.join()
+
+    @classmethod
+    def summary(cls, title):
+        """
+        Print one compact line with the counts (and durations) of all categories
+        """
+        cls.flush()
+
+        with cls.lock:
+            states = sorted(cls.categories.items())
+
+        parts = []
+        for category, state in states:
+            if state.count == 0:
+                continue
+
+            part = '%d %s' % (state.count, category)
+            if state.duration > 0:
+                part += ' (%.2fs)' % state.duration
+            parts.append(part)
+
+        if parts:
+            cls.write('%s: %s' % (title, ', '.join(parts)))
+            cls.flush()
+
+    @classmethod
+    def __get_state(cls, category):
+        state = cls.categories.get(category)
+
+        if state is None:
+            with cls.lock:
+                state = cls.categories.setdefault(category, _CategoryState())
+
+        return state
+
+    @classmethod
+    def __pass_filters(cls, category, message):
+        state = cls.__get_state(category)
+
+        if message == state.last_message:
+            state.repeated += 1
+            return False
+
+        cls.__flush_repeated(category, state)
+        state.last_message = message
+
+        now = time.time()
+        if now - state.window_start >= 1.0:
+            if state.suppressed:
+                cls.write('[%s] %d messages suppressed' % (category, state.suppressed))
+                state.suppressed = 0
+            state.window_start = now
+            state.window_lines = 0
+
+        if state.window_lines >= cls.rate_limit:
+            state.suppressed += 1
+            return False
+
+        state.window_lines += 1
+        return True
+
+    @classmethod
+    def __flush_repeated(cls, category, state):
+        if state.repeated:
+            cls.write('[%s] last message repeated %d times' % (category, state.repeated))
+            state.repeated = 0
+
+    @classmethod
+    def __flush_category(cls, category, state):
+        cls.__flush_repeated(category, state)
+        state.last_message = None
+
+        if state.suppressed:
+            cls.write('[%s] %d messages suppressed' % (category, state.suppressed))
+            state.suppressed = 0
+
+    @classmethod
+    def __start_writer(cls):
+        with cls.lock:
+            if cls.thread is not None and cls.thread.is_alive():
+                return
+
+            if cls.queue is None:
+                cls.queue = queue.Queue()
+                atexit.register(cls.shutdown)
+
+            cls.thread = threading.Thread(target=cls.__writer_loop, name='PBRTv3LogWriter', daemon=True)
+            cls.thread.start()
+
+    @classmethod
+    def __writer_loop(cls):
+        while True:
+            line = cls.queue.get()
+            try:
+                if line is None:
+                    sys.stdout.flush()
+                    return
+
+                print(line)
+
+                # Flush once per batch instead of once per line
+                if cls.queue.empty():
+                    sys.stdout.flush()
+            finally:
+                cls.queue.task_done()
@@ -29,7 +29,7 @@ import bpy
 
 from collections import Iterable
 from ..outputs import PBRTv3Log
-from .. import import_bindings_module
+from .. import LazyBindingsModule, bindings_module_available
 
 PREFIX_MATERIALS = 'scene.materials'
 PREFIX_TEXTURES = 'scene.textures'
@@ -86,22 +86,29 @@ def UsePBRTv3Core():
     return True if bpy.context.scene.pbrtv3_engine.selected_pbrtv3_api == 'luxcore' else False
 
 
+def PBRTv3CoreIsOutdated():
+    """
+    True if the pyluxcore module does not support scene edits of running sessions (RenderSession.Parse). Only
+    checked once pyluxcore has been loaded, because the UI must not import it while drawing.
+    """
+    module = pyluxcore.loaded_module()
+    return module is not None and not hasattr(module.RenderSession, 'Parse')
+
+
 def ScenePrefix():
     return 'importlib.import_module(\'bpy\').context.scene.'
 
 
-if not 'PYLUXCORE_AVAILABLE' in locals():
-    try:
-        pyluxcore = import_bindings_module('pyluxcore')
-        pyluxcore.Init()
-        LUXCORE_VERSION = pyluxcore.Version()
+def init_pyluxcore(module):
+    module.Init()
+    PBRTv3Log('Using pyluxcore version %s' % module.Version())
+
 
-        PYLUXCORE_AVAILABLE = True
-        PBRTv3Log('Using pyluxcore version %s' % LUXCORE_VERSION)
+if not 'PYLUXCORE_AVAILABLE' in locals():
+    # pyluxcore is imported and initialised on first use (usually the first PBRTv3Core render), not on addon startup
+    pyluxcore = LazyBindingsModule('pyluxcore', init_pyluxcore)
+    PYLUXCORE_AVAILABLE = bindings_module_available('pyluxcore')
 
-    except ImportError as err:
+    if not PYLUXCORE_AVAILABLE:
         PBRTv3Log('WARNING: Binary pyluxcore module not available! Visit '
                'http://www.luxrender.net/ to obtain one for your system.')
-        PBRTv3Log('(ImportError was: %s)' % err)
-        pyluxcore = None
-        PYLUXCORE_AVAILABLE = False
@@ -25,7 +25,7 @@
 # ***** END GPL LICENCE BLOCK *****
 #
 from ..outputs import PBRTv3Log
-from ..outputs.pure_api import PBRTv3_VERSION
+from ..outputs.pure_api import get_pylux_version
 
 
 class Custom_Context(object):
@@ -94,7 +94,7 @@ class Custom_Context(object):
 
     def portalInstance(self, name):
         # Backwards compatibility
-        if PBRTv3_VERSION < '0.8':
+        if get_pylux_version() < '0.8':
             PBRTv3Log('WARNING: Exporting PortalInstance as ObjectInstance; Portal will not be effective')
             self._api('ObjectInstance ', [name, []])
         else:
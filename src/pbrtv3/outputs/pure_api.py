@@ -25,130 +25,190 @@
 # ***** END GPL LICENCE BLOCK *****
 #
 from ..outputs import PBRTv3Log
-from .. import import_bindings_module
+from .. import LazyBindingsModule, bindings_module_available
 
-if not 'PYLUX_AVAILABLE' in locals():
-    # If pylux is not available, revert to 0.8 feature set
-    PBRTv3_VERSION = '0.8'
+# The pylux.Context methods that take a ParamSet
+PARAMSET_METHODS = (
+    'accelerator', 'areaLightSource', 'camera', 'film', 'lightGroup', 'lightSource', 'makeNamedMaterial',
+    'makeNamedVolume', 'material', 'pixelFilter', 'portalShape', 'renderer', 'sampler', 'shape',
+    'surfaceIntegrator', 'texture', 'volume', 'volumeIntegrator',
+)
+
+
+def native_params(method):
+    """
+    ParamSets store numeric lists in compact arrays, pylux gets them as plain lists
+    """
+
+    def wrapper(self, *args):
+        return method(self, *[arg.to_native() if hasattr(arg, 'to_native') else arg for arg in args])
+
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+def create_context_class(pylux):
+    """
+    Create Custom_Context, the subclass of pylux.Context used by the addon
+    """
+    class Custom_Context(pylux.Context):
+        """
+        This is the 'pure' entry point to the pylux.Context API
+
+        Some methods in this class have been overridden with
+        extensions to provide additional functionality in other
+        API types (eg. file_api).
 
-    try:
-        pylux = import_bindings_module('pylux')
-        PBRTv3_VERSION = pylux.version()
+        The other Custom_Context APIs are based on this one
+        """
 
-        class Custom_Context(pylux.Context):
+        PYLUX = pylux
+        API_TYPE = 'PURE'
+
+        def attributeBegin(self, comment='', file=None):
+            """
+            Added for compatibility with file_api
             """
-            This is the 'pure' entry point to the pylux.Context API
 
-            Some methods in this class have been overridden with
-            extensions to provide additional functionality in other
-            API types (eg. file_api).
+            pylux.Context.attributeBegin(self)
 
-            The other Custom_Context APIs are based on this one
+        def transformBegin(self, comment='', file=None):
+            """
+            Added for compatibility with file_api
             """
 
-            PYLUX = pylux
-            API_TYPE = 'PURE'
-
-            def attributeBegin(self, comment='', file=None):
-                """
-                Added for compatibility with file_api
-                """
-
-                pylux.Context.attributeBegin(self)
-
-            def transformBegin(self, comment='', file=None):
-                """
-                Added for compatibility with file_api
-                """
-
-                pylux.Context.transformBegin(self)
-
-            def logVerbosity(self, verbosity):
-                """
-                verbose, default, quiet, very-quiet
-                """
-                try:
-                    filterMap = {
-                        'verbose': pylux.ErrorSeverity.LUX_DEBUG,
-                        'default': pylux.ErrorSeverity.LUX_INFO,
-                        'quiet': pylux.ErrorSeverity.LUX_WARNING,
-                        'very-quiet': pylux.ErrorSeverity.LUX_ERROR,
-                    }
-
-                    pylux.errorFilter(filterMap[verbosity])
-                except ValueError:
-                    pass
-                # backwards compatibility
-                except NameError:
-                    pass
-                except AttributeError:
-                    pass
-
-        # Backwards-compatibility Context method substitution
-        if PBRTv3_VERSION < '0.8':
-            from ..extensions_framework.util import format_elapsed_time
-
-            def printableStatistics(self, add_total):
-                stats_dict = {
-                    'secElapsed': 0.0,
-                    'samplesSec': 0.0,
-                    'samplesTotSec': 0.0,
-                    'samplesPx': 0.0,
-                    'efficiency': 0.0,
-                }
+            pylux.Context.transformBegin(self)
 
-                stats_format = {
-                    'secElapsed': format_elapsed_time,
-                    'samplesSec': lambda x: 'Samples/Sec: %0.2f' % x,
-                    'samplesTotSec': lambda x: 'Total Samples/Sec: %0.2f' % x,
-                    'samplesPx': lambda x: 'Samples/Px: %0.2f' % x,
-                    'efficiency': lambda x: 'Efficiency: %0.2f %%' % x,
+        def logVerbosity(self, verbosity):
+            """
+            verbose, default, quiet, very-quiet
+            """
+            try:
+                filterMap = {
+                    'verbose': pylux.ErrorSeverity.LUX_DEBUG,
+                    'default': pylux.ErrorSeverity.LUX_INFO,
+                    'quiet': pylux.ErrorSeverity.LUX_WARNING,
+                    'very-quiet': pylux.ErrorSeverity.LUX_ERROR,
                 }
 
-                for k in stats_dict.keys():
-                    stats_dict[k] = self.statistics(k)
+                pylux.errorFilter(filterMap[verbosity])
+            except ValueError:
+                pass
+            # backwards compatibility
+            except NameError:
+                pass
+            except AttributeError:
+                pass
+
+    # Backwards-compatibility Context method substitution
+    if PBRTv3_VERSION < '0.8':
+        from ..extensions_framework.util import format_elapsed_time
+
+        def printableStatistics(self, add_total):
+            stats_dict = {
+                'secElapsed': 0.0,
+                'samplesSec': 0.0,
+                'samplesTotSec': 0.0,
+                'samplesPx': 0.0,
+                'efficiency': 0.0,
+            }
+
+            stats_format = {
+                'secElapsed': format_elapsed_time,
+                'samplesSec': lambda x: 'Samples/Sec: %0.2f' % x,
+                'samplesTotSec': lambda x: 'Total Samples/Sec: %0.2f' % x,
+                'samplesPx': lambda x: 'Samples/Px: %0.2f' % x,
+                'efficiency': lambda x: 'Efficiency: %0.2f %%' % x,
+            }
 
-                    stats_string = ' | '.join(['%s' % stats_format[k](v) for k, v in stats_dict.items()])
-                    network_servers = self.getServerCount()
+            for k in stats_dict.keys():
+                stats_dict[k] = self.statistics(k)
 
-                    if network_servers > 0:
-                        stats_string += ' | %i Network Servers Active' % network_servers
+                stats_string = ' | '.join(['%s' % stats_format[k](v) for k, v in stats_dict.items()])
+                network_servers = self.getServerCount()
 
-                return stats_string
+                if network_servers > 0:
+                    stats_string += ' | %i Network Servers Active' % network_servers
 
-            Custom_Context.printableStatistics = printableStatistics
+            return stats_string
 
-            Custom_Context.setAttribute = Custom_Context.setOption
-            Custom_Context.getAttribute = Custom_Context.getOption
+        Custom_Context.printableStatistics = printableStatistics
 
-            def getRenderingServersStatus(self):
-                server_list = []
+        Custom_Context.setAttribute = Custom_Context.setOption
+        Custom_Context.getAttribute = Custom_Context.getOption
 
-                for i in range(self.getServerCount()):
-                    rsi = pylux.RenderingServerInfo()
-                    pylux.Context.getRenderingServersStatus(self, rsi, i + 1)
-                    server_list.append(rsi)
+        def getRenderingServersStatus(self):
+            server_list = []
 
-                return server_list
+            for i in range(self.getServerCount()):
+                rsi = pylux.RenderingServerInfo()
+                pylux.Context.getRenderingServersStatus(self, rsi, i + 1)
+                server_list.append(rsi)
 
-            Custom_Context.getRenderingServersStatus = getRenderingServersStatus
+            return server_list
 
-            def saveEXR(self, filename, useHalfFloat, includeZBuffer, tonemapped):
-                pass  # can't do anything
+        Custom_Context.getRenderingServersStatus = getRenderingServersStatus
 
-            Custom_Context.saveEXR = saveEXR
+        def saveEXR(self, filename, useHalfFloat, includeZBuffer, tonemapped):
+            pass  # can't do anything
 
-            def portalInstance(self, name):
-                PBRTv3Log('WARNING: Exporting PortalInstance as ObjectInstance; Portal will not be effective')
-                self.objectInstance(name)
+        Custom_Context.saveEXR = saveEXR
 
-            Custom_Context.portalInstace = portalInstance
+        def portalInstance(self, name):
+            PBRTv3Log('WARNING: Exporting PortalInstance as ObjectInstance; Portal will not be effective')
+            self.objectInstance(name)
+
+        Custom_Context.portalInstace = portalInstance
+
+    for method_name in PARAMSET_METHODS:
+        if hasattr(Custom_Context, method_name):
+            setattr(Custom_Context, method_name, native_params(getattr(Custom_Context, method_name)))
+
+    return Custom_Context
+
+
+def init_pylux(module):
+    global PBRTv3_VERSION, Custom_Context
+
+    PBRTv3_VERSION = module.version()
+    Custom_Context = create_context_class(module)
+    PBRTv3Log('Using pylux version %s' % PBRTv3_VERSION)
+
+
+def load_pylux():
+    """
+    Import pylux if this was not tried yet (it is loaded on first use, not on addon startup).
+    Returns True if Custom_Context is available.
+    """
+    return pylux.load() is not None
+
+
+def get_pylux_version():
+    """
+    Returns the version of the pylux module (imported on first use), or '0.8' if pylux is not available.
+    Read PBRTv3_VERSION through this function, a copy imported from this module is not updated when pylux is loaded.
+    """
+    if PYLUX_AVAILABLE:
+        load_pylux()
+
+    return PBRTv3_VERSION
+
+
+def get_context_class():
+    if not load_pylux():
+        raise ImportError('pylux module not available')
+
+    return Custom_Context
+
+
+if not 'PYLUX_AVAILABLE' in locals():
+    # If pylux is not available, revert to 0.8 feature set
+    PBRTv3_VERSION = '0.8'
+    Custom_Context = None
 
-        PYLUX_AVAILABLE = True
-        PBRTv3Log('Using pylux version %s' % PBRTv3_VERSION)
+    pylux = LazyBindingsModule('pylux', init_pylux)
+    PYLUX_AVAILABLE = bindings_module_available('pylux')
 
-    except ImportError as err:
+    if not PYLUX_AVAILABLE:
         PBRTv3Log('WARNING: Binary pylux module not available! Visit '
                'http://www.luxrender.net/ to obtain one for your system.')
-        PBRTv3Log('(ImportError was: %s)' % err)
-        PYLUX_AVAILABLE = False
@@ -0,0 +1,168 @@
+# -*- coding: utf8 -*-
+#
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# --------------------------------------------------------------------------
+# Blender 2.5 PBRTv3 Add-On
+# --------------------------------------------------------------------------
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# ***** END GPL LICENCE BLOCK *****
+#
+import collections
+import csv
+import json
+import os
+import time
+
+from ..extensions_framework import util as efutil
+from ..outputs import PBRTv3Log
+
+# (column name, PBRTv3Core statistics key, getter)
+STATS_KEYS = [
+    ('render_time', 'stats.renderengine.time', 'GetFloat'),
+    ('pass', 'stats.renderengine.pass', 'GetInt'),
+    ('convergence', 'stats.renderengine.convergence', 'GetFloat'),
+    ('samples_per_sec', 'stats.renderengine.total.samplesec', 'GetFloat'),
+    ('rays_per_sec', 'stats.renderengine.performance.total', 'GetFloat'),
+    ('triangles', 'stats.dataset.trianglecount', 'GetFloat'),
+]
+
+
+class TelemetryRecorder(object):
+    """
+    Records PBRTv3Core render statistics as a time series, together with the export phase timings and the
+    display refresh overhead. Samples are kept in a ring buffer (the oldest samples are dropped when it is full)
+    and written to a JSON or CSV file per frame by flush().
+    """
+
+    def __init__(self, name, directory, interval=1.0, capacity=3600, file_format='json'):
+        self.name = name
+        self.directory = directory
+        self.interval = interval
+        self.file_format = file_format
+        self.samples = collections.deque(maxlen=capacity)
+        self.sample_count = 0
+        self.phases = collections.OrderedDict()
+        self.start_time = time.time()
+        self.last_sample_time = -1
+        # Name of the view (camera) being rendered, recorded with the samples of multi-camera renders
+        self.view = None
+
+    @classmethod
+    def from_settings(cls, scene, name, directory=None):
+        """
+        Returns a recorder configured by the scene's translator settings, or None if telemetry is disabled
+        """
+        settings = scene.luxcore_translatorsettings
+
+        if not settings.telemetry_enable:
+            return None
+
+        if directory is None:
+            directory = os.path.join(efutil.temp_directory(), 'pbrtv3_telemetry')
+
+        return cls(name, directory, settings.telemetry_interval, settings.telemetry_capacity,
+                   settings.telemetry_format)
+
+    def add_phase(self, name, duration):
+        """
+        Record the duration of an export or session phase (in seconds)
+        """
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def sample(self, stats, force=False, **extra):
+        """
+        Add a sample of the PBRTv3Core statistics if the sampling interval has passed since the last one.
+        Additional values (e.g. the display overhead) can be passed as keyword arguments.
+        """
+        now = time.time()
+
+        if not force and now - self.last_sample_time < self.interval:
+            return
+
+        self.last_sample_time = now
+
+        sample = collections.OrderedDict()
+        sample['wall_time'] = round(now - self.start_time, 3)
+
+        if self.view is not None:
+            sample['view'] = self.view
+
+        for column, key, getter in STATS_KEYS:
+            if stats.IsDefined(key):
+                sample[column] = getattr(stats.Get(key), getter)()
+            else:
+                sample[column] = None
+
+        sample.update(extra)
+        self.samples.append(sample)
+        self.sample_count += 1
+
+    def flush(self, frame):
+        """
+        Write all recorded samples to a file and clear the ring buffer. Returns the path of the file.
+        """
+        filepath = os.path.join(self.directory, '%s_%04d.%s' % (self.name, frame, self.file_format))
+        dropped = self.sample_count - len(self.samples)
+
+        try:
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+
+            if self.file_format == 'csv':
+                self.__write_csv(filepath)
+            else:
+                self.__write_json(filepath, frame, dropped)
+        except OSError as err:
+            PBRTv3Log('Could not write telemetry file %s: %s' % (filepath, err))
+            return None
+
+        PBRTv3Log('Telemetry: %d samples written to %s%s' % (len(self.samples), filepath,
+                                                           ' (%d dropped)' % dropped if dropped else ''))
+        self.samples.clear()
+        self.sample_count = 0
+        return filepath
+
+    def __write_json(self, filepath, frame, dropped):
+        data = collections.OrderedDict()
+        data['name'] = self.name
+        data['frame'] = frame
+        data['start_time'] = self.start_time
+        data['phases'] = self.phases
+        data['dropped_samples'] = dropped
+        data['samples'] = list(self.samples)
+
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=1)
+
+    def __write_csv(self, filepath):
+        # Phases go to a separate file because they don't fit into the columns of the time series
+        columns = []
+        for sample in self.samples:
+            for column in sample:
+                if column not in columns:
+                    columns.append(column)
+
+        with open(filepath, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(self.samples)
+
+        with open(os.path.splitext(filepath)[0] + '_phases.csv', 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['phase', 'seconds'])
+            for phase, duration in self.phases.items():
+                writer.writerow([phase, '%.4f' % duration])
@@ -25,8 +25,12 @@
 # ***** END GPL LICENCE BLOCK *****
 #
 
+import collections
+import hashlib
+
 import bpy
-from ..outputs.luxcore_api import ToValidPBRTv3CoreName, UsePBRTv3Core, set_prop_mat, set_prop_vol
+from ..outputs.logger import PBRTv3Logger
+from ..outputs.luxcore_api import pyluxcore, ToValidPBRTv3CoreName, UsePBRTv3Core, set_prop_mat, set_prop_vol
 
 
 class pbrtv3_node(bpy.types.Node):
@@ -58,17 +62,335 @@ class ExportedVolumes(object):
         ExportedVolumes.vol_names = []
 
 
+class SessionSettingsUpdates(object):
+    """
+    Counts changes of settings that are applied to a running PBRTv3Core session (imagepipeline, lightgroup scales).
+    Final renders compare the counter instead of converting and comparing the settings on every update.
+    """
+    counter = 0
+
+    @staticmethod
+    def tag(self, context):
+        # Used as property update callback
+        SessionSettingsUpdates.counter += 1
+
+    @staticmethod
+    def chain(update):
+        """
+        Returns an update callback that calls update (the existing callback of a property) and tags the change
+        """
+        if update is None:
+            return SessionSettingsUpdates.tag
+
+        if update is SessionSettingsUpdates.tag or getattr(update, 'tags_session_settings', False):
+            return update
+
+        def update_and_tag(self, context):
+            update(self, context)
+            SessionSettingsUpdates.counter += 1
+
+        update_and_tag.tags_session_settings = True
+        return update_and_tag
+
+    @staticmethod
+    def add_update_callbacks(properties, exclude=(), include=None):
+        for prop in properties:
+            attr = prop.get('attr')
+
+            if prop['type'] in ('text', 'operator', 'collection') or attr in exclude:
+                continue
+
+            if include is None or attr in include:
+                prop['update'] = SessionSettingsUpdates.chain(prop.get('update'))
+
+
+# The output node of a material node tree, the node linked to its emission socket and its volumes
+NodeTreeOutput = collections.namedtuple('NodeTreeOutput',
+                                        ('output_node', 'light_node', 'interior_volume', 'exterior_volume'))
+
+
+class NodeTreeIndex(object):
+    """
+    Index of the node trees used during an export: the node tree of every material, the first node of every type
+    in a node tree (for find_node()) and the output of material node trees, so the exporters look them up in
+    constant time instead of scanning bpy.data.node_groups and the nodes for every object, shape instance and
+    material.
+
+    Usage:
+        NodeTreeIndex.begin()
+        try:
+            ...
+        finally:
+            NodeTreeIndex.end()
+
+    The index is cleared at the end of the outermost export. During an export, the entry of a node tree is
+    rebuilt when it was edited (the update() callback of the node tree calls invalidate()) or when Blender flags it
+    as updated. Outside of an export, the nodes are searched directly.
+    """
+    depth = 0
+    # {material pointer: (node tree name, node tree or None)}
+    material_trees = {}
+    # {node tree name: (node tree pointer, {bl_idname: first node of this type})}
+    tree_nodes = {}
+    # {node tree name: NodeTreeOutput or None}
+    tree_outputs = {}
+
+    @classmethod
+    def begin(cls):
+        cls.depth += 1
+
+    @classmethod
+    def end(cls):
+        cls.depth = max(cls.depth - 1, 0)
+
+        if cls.depth == 0:
+            cls.invalidate()
+
+    @classmethod
+    def invalidate(cls, nodetree_name=None):
+        if nodetree_name is None:
+            cls.material_trees = {}
+            cls.tree_nodes = {}
+            cls.tree_outputs = {}
+        else:
+            cls.tree_nodes.pop(nodetree_name, None)
+            cls.tree_outputs.pop(nodetree_name, None)
+
+    @classmethod
+    def get_material_tree(cls, material):
+        """
+        Returns the node tree of the material, or None if it has none
+        """
+        nodetree_name = material.pbrtv3_material.nodetree
+
+        if not nodetree_name:
+            return None
+
+        if cls.depth == 0:
+            return bpy.data.node_groups.get(nodetree_name)
+
+        cached = cls.material_trees.get(material.as_pointer())
+
+        if cached is not None and cached[0] == nodetree_name:
+            return cached[1]
+
+        nodetree = bpy.data.node_groups.get(nodetree_name)
+        cls.material_trees[material.as_pointer()] = (nodetree_name, nodetree)
+        return nodetree
+
+    @classmethod
+    def get_nodes(cls, nodetree):
+        """
+        Returns {bl_idname: first node of this type} of the node tree, or None outside of an export
+        """
+        if cls.depth == 0:
+            return None
+
+        cached = cls.tree_nodes.get(nodetree.name)
+
+        if cached is not None and cached[0] == nodetree.as_pointer() \
+                and not (nodetree.is_updated or nodetree.is_updated_data):
+            return cached[1]
+
+        nodes = {}
+        for node in nodetree.nodes:
+            nodes.setdefault(getattr(node, 'bl_idname', None), node)
+
+        cls.tree_nodes[nodetree.name] = (nodetree.as_pointer(), nodes)
+        cls.tree_outputs.pop(nodetree.name, None)
+        return nodes
+
+    @classmethod
+    def get_material_output(cls, material):
+        """
+        Returns the NodeTreeOutput of the material's node tree, or None if it has no node tree or output node
+        """
+        nodetree = cls.get_material_tree(material)
+
+        if nodetree is None:
+            return None
+
+        # Validates the cached output, too
+        nodes = cls.get_nodes(nodetree)
+
+        if nodes is not None and nodetree.name in cls.tree_outputs:
+            return cls.tree_outputs[nodetree.name]
+
+        output_node = find_node_in_nodetree(nodetree, 'pbrtv3_material_output_node')
+        output = None
+
+        if output_node is not None:
+            light_socket = output_node.inputs['Emission']
+            light_node = light_socket.links[0].from_node if light_socket.is_linked else None
+            output = NodeTreeOutput(output_node, light_node, output_node.interior_volume,
+                                    output_node.exterior_volume)
+
+        if nodes is not None:
+            cls.tree_outputs[nodetree.name] = output
+
+        return output
+
+
+def rna_values(struct, base_type):
+    """
+    The values of the RNA properties of a node or socket, without the properties of its base type (name, location,
+    selection etc.) and without pointers and collections
+    """
+    base_properties = base_type.bl_rna.properties
+    values = []
+
+    for prop in struct.bl_rna.properties:
+        identifier = prop.identifier
+
+        if prop.type in ('POINTER', 'COLLECTION') or identifier in base_properties:
+            continue
+
+        value = getattr(struct, identifier, None)
+
+        if isinstance(value, set):
+            # Enum flags
+            value = tuple(sorted(value))
+        elif hasattr(value, '__len__') and not isinstance(value, str):
+            value = tuple(value)
+
+        values.append((identifier, value))
+
+    return values
+
+
+class NodeExportCache(object):
+    """
+    Caches the PBRTv3Core properties of the nodes of material node trees during viewport renders, so an edit of a
+    node only exports that node and the nodes using it again instead of the whole node tree. A node (with all nodes
+    linked to its inputs) is exported again when its fingerprint changes: its settings, the values of its unlinked
+    input sockets and the fingerprints of the linked nodes.
+
+    Usage:
+        NodeExportCache.begin(scene)
+        try:
+            ...
+        finally:
+            NodeExportCache.end()
+
+    Outside of an export, all nodes are exported normally. Nodes that read other datablocks or change the state of
+    the exporter are always exported, and so are the nodes using them. The cache is cleared on frame changes and
+    when images or textures were edited.
+    """
+    UNCACHED_NODE_TYPES = {
+        'pbrtv3_material_type_node_datablock',
+        'pbrtv3_texture_python_node',
+        'pbrtv3_texture_vol_smoke_data_node',
+    }
+
+    depth = 0
+    frame = None
+    # {(node tree name, node name, export arguments): (fingerprint, pyluxcore.Properties, export result)}
+    entries = {}
+    # {node pointer: fingerprint or None}, only valid during the outermost begin()/end()
+    fingerprints = {}
+
+    @classmethod
+    def begin(cls, scene):
+        if cls.depth == 0:
+            if scene.frame_current != cls.frame or bpy.data.images.is_updated or bpy.data.textures.is_updated:
+                cls.clear()
+                cls.frame = scene.frame_current
+
+            cls.fingerprints = {}
+
+        cls.depth += 1
+
+    @classmethod
+    def end(cls):
+        cls.depth = max(cls.depth - 1, 0)
+
+        if cls.depth == 0:
+            cls.fingerprints = {}
+
+    @classmethod
+    def clear(cls):
+        cls.entries = {}
+        cls.fingerprints = {}
+
+    @classmethod
+    def export(cls, node, properties, arguments, export_function):
+        """
+        Calls export_function(properties) to export the node, or reuses the properties and the result of the last
+        export if the node did not change. arguments are the (hashable) arguments of the export that change the
+        result, e.g. the PBRTv3Core name passed to the first node of a material.
+        """
+        if cls.depth == 0:
+            return export_function(properties)
+
+        fingerprint = cls.get_fingerprint(node)
+
+        if fingerprint is None:
+            return export_function(properties)
+
+        key = (node.id_data.name, node.name, arguments)
+        cached = cls.entries.get(key)
+
+        if cached is not None and cached[0] == fingerprint:
+            properties.Set(cached[1])
+            PBRTv3Logger.count('node reused')
+            return cached[2]
+
+        node_properties = pyluxcore.Properties()
+        result = export_function(node_properties)
+        cls.entries[key] = (fingerprint, node_properties, result)
+
+        properties.Set(node_properties)
+        PBRTv3Logger.count('node exported')
+        return result
+
+    @classmethod
+    def get_fingerprint(cls, node):
+        """
+        Returns the fingerprint of the node and the nodes linked to its inputs, or None if it can not be cached
+        """
+        pointer = node.as_pointer()
+
+        if pointer in cls.fingerprints:
+            return cls.fingerprints[pointer]
+
+        # Also stops the recursion if the links form a loop
+        cls.fingerprints[pointer] = None
+        fingerprint = cls.__compute_fingerprint(node)
+        cls.fingerprints[pointer] = fingerprint
+        return fingerprint
+
+    @classmethod
+    def __compute_fingerprint(cls, node):
+        if node.bl_idname in cls.UNCACHED_NODE_TYPES:
+            return None
+
+        parts = [node.bl_idname, node.name, rna_values(node, bpy.types.Node)]
+
+        for socket in node.inputs:
+            linked_node = get_linked_node(socket)
+
+            if linked_node is None:
+                parts.append((socket.identifier, rna_values(socket, bpy.types.NodeSocket)))
+            else:
+                linked_fingerprint = cls.get_fingerprint(linked_node)
+
+                if linked_fingerprint is None:
+                    return None
+
+                parts.append((socket.identifier, socket.links[0].from_socket.identifier, linked_fingerprint))
+
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
 def find_node(material, nodetype):
     if not (material and material.pbrtv3_material and material.pbrtv3_material.nodetree):
         return None
 
-    nodetree_name = material.pbrtv3_material.nodetree
+    ntree = NodeTreeIndex.get_material_tree(material)
 
-    if not nodetree_name or nodetree_name not in bpy.data.node_groups:
+    if ntree is None:
         return None
 
-    ntree = bpy.data.node_groups[nodetree_name]
-
     return find_node_in_nodetree(ntree, nodetype)
 
 
@@ -90,6 +412,11 @@ def find_node_in_volume(volume, nodetype):
 
 
 def find_node_in_nodetree(nodetree, nodetype):
+    nodes = NodeTreeIndex.get_nodes(nodetree)
+
+    if nodes is not None:
+        return nodes.get(nodetype)
+
     for node in nodetree.nodes:
         nt = getattr(node, "bl_idname", None)
 
@@ -211,7 +538,9 @@ def export_submat_luxcore(properties, socket, luxcore_exporter, name=None):
         print('WARNING: Unlinked material socket! Using a black material as fallback.')
         submat_name = export_fallback_material(properties, socket, name)
     else:
-        submat_name = node.export_luxcore(properties, luxcore_exporter, name)
+        submat_name = NodeExportCache.export(node, properties, (name,),
+                                             lambda node_properties: node.export_luxcore(node_properties,
+                                                                                         luxcore_exporter, name))
 
     return submat_name
 
@@ -37,8 +37,8 @@ from .. import PBRTv3Addon
 from ..export import get_worldscale, get_output_filename
 from ..export import ParamSet, PBRTv3Manager
 from ..export import fix_matrix_order
-from ..outputs.pure_api import PBRTv3_VERSION
 from ..outputs.luxcore_api import UsePBRTv3Core
+from ..properties import SessionSettingsUpdates
 
 
 def CameraVolumeParameter(attr, name):
@@ -537,6 +537,14 @@ class pbrtv3_camera(declarative_property_group):
 
         return cam_type, params
 
+
+# The exposure settings are used by the imagepipeline (camera settings tonemapper) of running final renders
+SessionSettingsUpdates.add_update_callbacks(pbrtv3_camera.properties,
+                                            include=('fstop', 'sensitivity', 'exposure_mode', 'exposure_start_norm',
+                                                     'exposure_end_norm', 'exposure_start_abs', 'exposure_end_abs',
+                                                     'exposure_degrees_start', 'exposure_degrees_end'))
+
+
 @PBRTv3Addon.addon_register_class
 class pbrtv3_film(declarative_property_group):
     ef_attach_to = ['pbrtv3_camera']
@@ -92,10 +92,14 @@ class pbrtv3_testing(declarative_property_group):
     controls = [
         'clay_render',
         'object_analysis',
-        're_raise'
+        're_raise',
+        ['profile_export', 'profile_top_n'],
+        'log_level',
     ]
 
-    visibility = {}
+    visibility = {
+        'profile_top_n': {'profile_export': True},
+    }
 
     properties = [
         {
@@ -119,6 +123,306 @@ class pbrtv3_testing(declarative_property_group):
             'description': 'Show export error messages in the UI as well as the console',
             'default': False
         },
+        {
+            'type': 'bool',
+            'attr': 'profile_export',
+            'name': 'Debug: Profile Export',
+            'description': 'Record the time spent on each exported element and write a Chrome trace file '
+                           '(chrome://tracing) to the export path',
+            'default': False
+        },
+        {
+            'type': 'int',
+            'attr': 'profile_top_n',
+            'name': 'Slowest Elements',
+            'description': 'Number of slowest elements listed in the console after the export',
+            'default': 10,
+            'min': 0,
+            'soft_max': 100
+        },
+        {
+            'type': 'enum',
+            'attr': 'log_level',
+            'name': 'Log Level',
+            'description': 'Minimum level of console messages, messages of single exported elements are only '
+                           'printed with Debug (an export summary is always printed)',
+            'default': 'INFO',
+            'items': [
+                ('DEBUG', 'Debug', 'Print all messages, including one line per exported element'),
+                ('INFO', 'Info', 'Print informational messages, warnings and errors'),
+                ('WARNING', 'Warning', 'Print only warnings and errors'),
+                ('ERROR', 'Error', 'Print only errors'),
+            ]
+        },
+    ]
+
+
+@PBRTv3Addon.addon_register_class
+class pbrtv3_lod(declarative_property_group):
+    """
+    Storage class for the automatic LOD proxies of instanced geometry
+    """
+
+    ef_attach_to = ['Scene']
+
+    controls = [
+        'lod_enable',
+        ['lod_levels', 'lod_ratio'],
+        ['lod_pixel_size', 'lod_min_faces'],
+        'lod_cache_dir',
+    ]
+
+    visibility = {
+        'lod_levels': {'lod_enable': True},
+        'lod_ratio': {'lod_enable': True},
+        'lod_pixel_size': {'lod_enable': True},
+        'lod_min_faces': {'lod_enable': True},
+        'lod_cache_dir': {'lod_enable': True},
+    }
+
+    properties = [
+        {
+            'type': 'bool',
+            'attr': 'lod_enable',
+            'name': 'Automatic LOD for Particles/Duplis',
+            'description': 'Replace small particle and dupli instances by decimated copies of their mesh, chosen by '
+                           'the projected size in the render camera (final render only, needs numpy)',
+            'default': False,
+            'save_in_preset': True
+        },
+        {
+            'type': 'int',
+            'attr': 'lod_levels',
+            'name': 'Levels',
+            'description': 'Number of decimated levels generated per mesh',
+            'default': 2,
+            'min': 1,
+            'max': 4,
+            'save_in_preset': True
+        },
+        {
+            'type': 'float',
+            'attr': 'lod_ratio',
+            'name': 'Ratio',
+            'description': 'Fraction of the faces kept from one level to the next',
+            'default': 0.25,
+            'min': 0.01,
+            'max': 0.9,
+            'save_in_preset': True
+        },
+        {
+            'type': 'float',
+            'attr': 'lod_pixel_size',
+            'name': 'Full Detail Size',
+            'description': 'Instances with at least this projected size in pixels use the full mesh, each halving '
+                           'of the size selects the next level',
+            'default': 64.0,
+            'min': 1.0,
+            'soft_max': 1024.0,
+            'save_in_preset': True
+        },
+        {
+            'type': 'int',
+            'attr': 'lod_min_faces',
+            'name': 'Min. Faces',
+            'description': 'Meshes with fewer faces are always exported in full detail',
+            'default': 1000,
+            'min': 0,
+            'soft_max': 100000,
+            'save_in_preset': True
+        },
+        {
+            'type': 'string',
+            'subtype': 'DIR_PATH',
+            'attr': 'lod_cache_dir',
+            'name': 'Cache Directory',
+            'description': 'Directory for the LOD PLY files, which are reused while the mesh does not change '
+                           '(empty = system temp directory)',
+            'default': '',
+            'save_in_preset': True
+        },
+    ]
+
+
+@PBRTv3Addon.addon_register_class
+class pbrtv3_texture_cache(declarative_property_group):
+    """
+    Storage class for the caches of extracted images, downscaled texture copies and image sequences
+    """
+
+    ef_attach_to = ['Scene']
+
+    controls = [
+        'extract_cache_dir',
+        'extract_cache_size',
+        'pyramid_enable',
+        'pyramid_mode',
+        'pyramid_max_size',
+        'pyramid_film_factor',
+        'pyramid_cache_dir',
+        'sequence_prefetch',
+    ]
+
+    visibility = {
+        'pyramid_mode': {'pyramid_enable': True},
+        'pyramid_max_size': {'pyramid_enable': True, 'pyramid_mode': 'size'},
+        'pyramid_film_factor': {'pyramid_enable': True, 'pyramid_mode': 'film'},
+        'pyramid_cache_dir': {'pyramid_enable': True},
+    }
+
+    properties = [
+        {
+            'type': 'string',
+            'subtype': 'DIR_PATH',
+            'attr': 'extract_cache_dir',
+            'name': 'Image Cache Directory',
+            'description': 'Directory for extracted packed and generated images, which are reused while the image '
+                           'does not change (empty = temporary directory, removed when Blender exits)',
+            'default': '',
+            'save_in_preset': True
+        },
+        {
+            'type': 'int',
+            'attr': 'extract_cache_size',
+            'name': 'Image Cache Size (MB)',
+            'description': 'The least recently used extracted images are deleted before an export when the cache '
+                           'grows beyond this size',
+            'default': 1024,
+            'min': 16,
+            'soft_max': 65536,
+            'save_in_preset': True
+        },
+        {
+            'type': 'bool',
+            'attr': 'pyramid_enable',
+            'name': 'Downscale Textures',
+            'description': 'Export imagemaps as cached downscaled copies, e.g. for faster lookdev and preview '
+                           'renders with less memory',
+            'default': False,
+            'save_in_preset': True
+        },
+        {
+            'type': 'enum',
+            'attr': 'pyramid_mode',
+            'name': 'Texture Size',
+            'description': 'How the resolution of the downscaled textures is chosen',
+            'items': [
+                ('size', 'Max. Size', 'Scale textures down to a maximum resolution'),
+                ('film', 'Film Size', 'Scale textures down relative to the film resolution, no texture can cover '
+                                      'more pixels than the film'),
+            ],
+            'default': 'size',
+            'save_in_preset': True
+        },
+        {
+            'type': 'int',
+            'attr': 'pyramid_max_size',
+            'name': 'Max. Size',
+            'description': 'Textures with a longer side are scaled down by powers of two until they fit',
+            'default': 2048,
+            'min': 64,
+            'soft_max': 16384,
+            'save_in_preset': True
+        },
+        {
+            'type': 'float',
+            'attr': 'pyramid_film_factor',
+            'name': 'Film Factor',
+            'description': 'Texture size relative to the longest side of the film, textures are scaled down by powers '
+                           'of two until they fit',
+            'default': 1.0,
+            'min': 0.1,
+            'soft_max': 4.0,
+            'save_in_preset': True
+        },
+        {
+            'type': 'string',
+            'subtype': 'DIR_PATH',
+            'attr': 'pyramid_cache_dir',
+            'name': 'Texture Cache Directory',
+            'description': 'Directory for the downscaled textures, which are shared by all images with the same '
+                           'content (empty = system temp directory)',
+            'default': '',
+            'save_in_preset': True
+        },
+        {
+            'type': 'int',
+            'attr': 'sequence_prefetch',
+            'name': 'Prefetch Sequence Frames',
+            'description': 'Read the files of image sequence textures for this many following frames in the '
+                           'background during final renders, so they load faster when the next frame starts '
+                           '(0 = disabled)',
+            'default': 2,
+            'min': 0,
+            'max': 32,
+            'save_in_preset': True
+        },
+    ]
+
+
+@PBRTv3Addon.addon_register_class
+class pbrtv3_texture_budget(declarative_property_group):
+    """
+    Storage class for the texture memory budget
+    """
+
+    ef_attach_to = ['Scene']
+
+    controls = [
+        'budget_enable',
+        ['budget_size', 'budget_report_count'],
+        'budget_action',
+    ]
+
+    visibility = {
+        'budget_size': {'budget_enable': True},
+        'budget_report_count': {'budget_enable': True},
+        'budget_action': {'budget_enable': True},
+    }
+
+    properties = [
+        {
+            'type': 'bool',
+            'attr': 'budget_enable',
+            'name': 'Texture Memory Budget',
+            'description': 'Estimate the memory of all textures of the scene from their file headers before the '
+                           'export and print the largest ones (final renders only)',
+            'default': False,
+            'save_in_preset': True
+        },
+        {
+            'type': 'int',
+            'attr': 'budget_size',
+            'name': 'Budget (MB)',
+            'description': 'Texture memory available on the render nodes',
+            'default': 4096,
+            'min': 64,
+            'soft_max': 131072,
+            'save_in_preset': True
+        },
+        {
+            'type': 'int',
+            'attr': 'budget_report_count',
+            'name': 'Report',
+            'description': 'Number of largest textures listed in the console',
+            'default': 10,
+            'min': 0,
+            'soft_max': 100
+        },
+        {
+            'type': 'enum',
+            'attr': 'budget_action',
+            'name': 'Over Budget',
+            'description': 'What to do if the textures need more memory than the budget',
+            'items': [
+                ('warn', 'Warn', 'Only print a warning'),
+                ('pyramid', 'Downscale Largest', 'Use downscaled copies of the largest textures until they fit'),
+                ('imagescale', 'Scale All', 'Scale all textures down uniformly with the image scale of the '
+                                            'PBRTv3Core scene (the classic renderer downscales the largest textures)'),
+            ],
+            'default': 'warn',
+            'save_in_preset': True
+        },
     ]
 
 
@@ -138,6 +442,7 @@ class pbrtv3_engine(declarative_property_group):
         'embed_filedata',
         'mesh_type',
         'partial_ply',
+        'dedup_meshes',
         ['render', 'monitor_external'],
         'fixed_seed',
         # ['threads_auto', 'fixed_seed'],
@@ -251,6 +556,15 @@ class pbrtv3_engine(declarative_property_group):
             'default': True,
             'save_in_preset': True
         },
+        {
+            'type': 'bool',
+            'attr': 'dedup_meshes',
+            'name': 'Deduplicate Meshes',
+            'description': 'Export meshes with identical geometry (e.g. separate copies from CAD/FBX imports) only '
+                           'once and instance them (all meshes with automatic instancing mode are instanced)',
+            'default': False,
+            'save_in_preset': True
+        },
         {
             'type': 'enum',
             'attr': 'binary_name',
@@ -30,7 +30,6 @@ from ..extensions_framework.validate import Logic_OR as O, Logic_Operator as LO
 from .. import PBRTv3Addon
 from ..export import ParamSet
 from ..outputs import PBRTv3Log
-from ..outputs.pure_api import PBRTv3_VERSION
 # from .engine import check_renderer_settings
 
 @PBRTv3Addon.addon_register_class
@@ -31,6 +31,7 @@ from ..extensions_framework import declarative_property_group
 from ..extensions_framework.validate import Logic_AND as A, Logic_OR as O
 
 from .. import PBRTv3Addon
+from . import SessionSettingsUpdates
 
 
 # Valid CRF preset names (case sensitive):
@@ -170,11 +171,12 @@ class luxcore_imagepipeline(declarative_property_group):
         'label_intervals',
         #['writeinterval_png', 'writeinterval_flm'],
         'displayinterval',
-        'fast_initial_preview',
+        ['fast_initial_preview', 'display_overhead'],
         'viewport_interval',
     ]
     
     visibility = {
+        'display_overhead': {'fast_initial_preview': True},
         'contour_scale': {'output_switcher_pass': 'IRRADIANCE'},
         'contour_range': {'output_switcher_pass': 'IRRADIANCE'},
         'contour_steps': {'output_switcher_pass': 'IRRADIANCE'},
@@ -595,10 +597,21 @@ class luxcore_imagepipeline(declarative_property_group):
             'type': 'bool',
             'attr': 'fast_initial_preview',
             'name': 'Fast Initial Preview',
-            'description': 'Update the image continuously for the first 15 seconds of the rendering. Not used when '
-                           'rendering animations',
+            'description': 'Start with short update intervals and adapt them to the time the display update takes. '
+                           'Not used when rendering animations',
             'default': True
         },
+        {
+            'type': 'float',
+            'attr': 'display_overhead',
+            'name': 'Max. Display Overhead (%)',
+            'description': 'Fast initial preview: update the image as often as possible while the time spent on '
+                           'display updates stays below this percentage of the rendering time',
+            'default': 5.0,
+            'min': 0.1,
+            'max': 50.0,
+            'precision': 1,
+        },
         {
             'type': 'int',
             'attr': 'viewport_interval',
@@ -609,3 +622,9 @@ class luxcore_imagepipeline(declarative_property_group):
             'soft_min': 50
         },
     ]
+
+
+# Changes of the imagepipeline are applied to running final renders, the update intervals are read by the render loop
+SessionSettingsUpdates.add_update_callbacks(luxcore_imagepipeline.properties,
+                                            exclude=('displayinterval', 'fast_initial_preview', 'display_overhead',
+                                                     'viewport_interval'))
@@ -49,6 +49,7 @@ class luxcore_rendering_controls(declarative_property_group):
         'stats_tris',
         'stats_engine_info',
         'stats_tiles',
+        'stats_framebuffer',
     ]
     
     visibility = {
@@ -126,4 +127,11 @@ class luxcore_rendering_controls(declarative_property_group):
             'description': 'Tile convergence status (only available when using Biased Path engine)',
             'default': True,
         },
+        {
+            'type': 'bool',
+            'attr': 'stats_framebuffer',
+            'name': 'Framebuffer (Debug)',
+            'description': 'Amount of framebuffer allocations and time spent on the last display refresh',
+            'default': False,
+        },
     ]
@@ -41,9 +41,17 @@ class luxcore_translatorsettings(declarative_property_group):
 
     controls = [
         ['export_particles', 'export_hair', 'export_proxies'],
+        'cull_duplis',
+        ['cull_margin', 'cull_min_size'],
+        'incremental_anim_export',
+        'dedup_meshes',
+        'dedup_materials',
+        ['multicam_render', 'multicam_cameras'],
         'override_materials',
         ['override_glass', 'override_lights', 'override_null'],
         ['label_debug', 'print_cfg', 'print_scn'],
+        ['telemetry_enable', 'telemetry_format'],
+        ['telemetry_interval', 'telemetry_capacity'],
         'use_rtpathcpu',
     ]
 
@@ -51,6 +59,12 @@ class luxcore_translatorsettings(declarative_property_group):
         'override_glass': {'override_materials': True},
         'override_lights': {'override_materials': True},
         'override_null': {'override_materials': True},
+        'multicam_cameras': {'multicam_render': True},
+        'cull_margin': {'cull_duplis': True},
+        'cull_min_size': {'cull_duplis': True},
+        'telemetry_format': {'telemetry_enable': True},
+        'telemetry_interval': {'telemetry_enable': True},
+        'telemetry_capacity': {'telemetry_enable': True},
     }
 
     alert = {}
@@ -80,6 +94,85 @@ class luxcore_translatorsettings(declarative_property_group):
             'default': True,
             'save_in_preset': True
         },
+        {
+            'type': 'bool',
+            'attr': 'cull_duplis',
+            'name': 'Cull Particles/Duplis',
+            'description': 'Do not export particle and dupli instances outside of the camera view or smaller than '
+                           'the minimum size (final render only, not with multi-camera rendering)',
+            'default': False,
+            'save_in_preset': True
+        },
+        {
+            'type': 'float',
+            'attr': 'cull_margin',
+            'name': 'Margin',
+            'description': 'Widen the camera view by this percentage before culling, to keep instances that are '
+                           'visible in reflections or contribute indirect light near the frame',
+            'default': 20.0,
+            'min': 0.0,
+            'soft_max': 200.0,
+            'subtype': 'PERCENTAGE',
+            'save_in_preset': True
+        },
+        {
+            'type': 'float',
+            'attr': 'cull_min_size',
+            'name': 'Min. Size',
+            'description': 'Cull instances with a projected size smaller than this number of pixels (0 = disabled)',
+            'default': 0.0,
+            'min': 0.0,
+            'soft_max': 10.0,
+            'save_in_preset': True
+        },
+        {
+            'type': 'bool',
+            'attr': 'incremental_anim_export',
+            'name': 'Incremental Animation Export',
+            'description': 'Keep the exported scene between the frames of an animation and only re-export objects, '
+                           'materials and particle systems that changed since the previous frame',
+            'default': False,
+            'save_in_preset': True
+        },
+        {
+            'type': 'bool',
+            'attr': 'dedup_meshes',
+            'name': 'Deduplicate Meshes',
+            'description': 'Export meshes with identical geometry (e.g. separate copies from CAD/FBX imports) only '
+                           'once and instance them (final render only, all meshes are instanced)',
+            'default': False,
+            'save_in_preset': True
+        },
+        {
+            'type': 'bool',
+            'attr': 'dedup_materials',
+            'name': 'Deduplicate Materials',
+            'description': 'Define materials and textures with identical settings and images (e.g. copies like '
+                           'Wood and Wood.001) only once (final render only, not with incremental animation export)',
+            'default': False,
+            'save_in_preset': True
+        },
+        {
+            'type': 'bool',
+            'attr': 'multicam_render',
+            'name': 'Multi-Camera Render',
+            'description': 'Export the scene once and render it from several cameras (e.g. stereo pairs or shot '
+                           'cameras), each view is saved to its own file in the output path',
+            'default': False,
+            'save_in_preset': True
+        },
+        {
+            'type': 'enum',
+            'attr': 'multicam_cameras',
+            'name': 'Cameras',
+            'description': 'Which cameras to render in multi-camera mode',
+            'default': 'visible',
+            'items': [
+                ('visible', 'Visible Cameras', 'Render all cameras on visible layers, starting with the active one'),
+                ('markers', 'Marker Cameras', 'Render all cameras bound to timeline markers, in marker order'),
+            ],
+            'save_in_preset': True
+        },
         {
             'type': 'bool',
             'attr': 'override_materials',
@@ -137,6 +230,49 @@ class luxcore_translatorsettings(declarative_property_group):
             'default': False,
             'save_in_preset': True
         },
+        {
+            'type': 'bool',
+            'attr': 'telemetry_enable',
+            'name': 'Record Telemetry',
+            'description': 'Record render statistics, export timings and display overhead of final, viewport and '
+                           'material preview renders to a file per frame (in the "telemetry" folder of the output '
+                           'path, or the temp folder for viewport and preview renders)',
+            'default': False,
+            'save_in_preset': True
+        },
+        {
+            'type': 'enum',
+            'attr': 'telemetry_format',
+            'name': 'Format',
+            'description': 'File format of the telemetry files',
+            'default': 'json',
+            'items': [
+                ('json', 'JSON', 'One JSON file per frame'),
+                ('csv', 'CSV', 'One CSV file per frame, export phases are written to an additional file'),
+            ],
+            'save_in_preset': True
+        },
+        {
+            'type': 'float',
+            'attr': 'telemetry_interval',
+            'name': 'Sample Interval (s)',
+            'description': 'Time between two telemetry samples',
+            'default': 1.0,
+            'min': 0.1,
+            'soft_max': 60.0,
+            'save_in_preset': True
+        },
+        {
+            'type': 'int',
+            'attr': 'telemetry_capacity',
+            'name': 'Max. Samples',
+            'description': 'Number of samples kept in memory per frame, older samples are dropped when the limit '
+                           'is reached',
+            'default': 3600,
+            'min': 10,
+            'soft_max': 100000,
+            'save_in_preset': True
+        },
         {
             'type': 'enum',
             'attr': 'export_type',
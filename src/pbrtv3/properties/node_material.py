@@ -30,9 +30,11 @@ from . import (create_luxcore_name_mat, create_luxcore_name, warning_classic_nod
                export_submat_luxcore, export_emission_luxcore)
 from ..export.luxcore.utils import get_elem_key, is_lightgroup_opencl_compatible
 from ..export.materials import TextureCounter
+from ..export.profiler import ExportProfiler
 from ..export import get_expanded_file_name
 
 from ..outputs.luxcore_api import set_prop_mat, set_prop_vol, set_prop_tex
+from ..outputs.logger import PBRTv3Logger
 
 from ..properties import (pbrtv3_node, pbrtv3_material_node, check_node_export_material)
 from ..properties.node_sockets import *
@@ -44,8 +46,10 @@ class pbrtv3_texture_maker:
             nonlocal lux_context
             texture_name = '%s::%s' % (root_name, tex_name)
 
-            with TextureCounter(texture_name):
-                print('Exporting texture, variant: "%s", type: "%s", name: "%s"' % (tex_variant, tex_type, tex_name))
+            with TextureCounter(texture_name), ExportProfiler.span('texture', texture_name):
+                PBRTv3Logger.count('texture')
+                PBRTv3Logger.debug('texture', 'Exporting texture, variant: "%s", type: "%s", name: "%s"', tex_variant,
+                                   tex_type, tex_name)
 
                 ExportedTextures.texture(lux_context, texture_name, tex_variant, tex_type, tex_params)
                 ExportedTextures.export_new(lux_context)
@@ -27,7 +27,7 @@
 import bpy
 import mathutils
 
-from ..properties import get_linked_node, check_node_export_texture
+from ..properties import get_linked_node, check_node_export_texture, NodeExportCache
 from ..properties.material import *  # for now just the big hammer for starting autogenerate sockets
 
 # Get all float properties
@@ -53,7 +53,7 @@ def export_socket_luxcore(properties, socket, fallback=None):
     linked_node = get_linked_node(socket)
 
     if linked_node is not None:
-        return linked_node.export_luxcore(properties)
+        return NodeExportCache.export(linked_node, properties, (), linked_node.export_luxcore)
     else:
         return fallback
 
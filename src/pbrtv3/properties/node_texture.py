@@ -27,7 +27,6 @@
 import bpy
 import bpy.utils.previews
 import os
-import tempfile
 import mathutils
 import math
 
@@ -38,6 +37,8 @@ from .. import PBRTv3Addon
 
 from ..export import ParamSet, process_filepath_data, matrix_to_list
 from ..export.volumes import export_smoke, SmokeCache
+from ..export.image_cache import ImageCache
+from ..export.texture_pyramid import TexturePyramid
 
 from ..extensions_framework import util as efutil
 
@@ -669,7 +670,7 @@ class pbrtv3_texture_type_node_image_map(pbrtv3_texture_node):
 
     def export_texture(self, make_texture):
         imagemap_params = ParamSet()
-        process_filepath_data(PBRTv3Manager.CurrentScene, self, self.filename, imagemap_params, 'filename')
+        process_filepath_data(PBRTv3Manager.CurrentScene, self, self.filename, imagemap_params, 'filename', is_image=True)
 
         if self.variant == 'float':
             imagemap_params.add_string('channel', self.channel)
@@ -700,6 +701,8 @@ class pbrtv3_texture_type_node_image_map(pbrtv3_texture_node):
         if not (os.path.exists(file_path) and os.path.isfile(file_path)):
             return [0, 0, 0] # Black color
 
+        file_path = TexturePyramid.resolve(bpy.context.scene, file_path)
+
         set_prop_tex(properties, luxcore_name, 'type', 'imagemap')
         set_prop_tex(properties, luxcore_name, 'file', file_path)
         set_prop_tex(properties, luxcore_name, 'gamma', self.gamma)
@@ -922,7 +925,7 @@ class pbrtv3_texture_type_node_blender_image_map(pbrtv3_texture_node):
             file_path = efutil.filesystem_path(self.manual_filepath)
 
         imagemap_params = ParamSet()
-        process_filepath_data(PBRTv3Manager.CurrentScene, self, file_path, imagemap_params, 'filename')
+        process_filepath_data(PBRTv3Manager.CurrentScene, self, file_path, imagemap_params, 'filename', is_image=True)
 
         if self.channel == 'rgb':
             variant = 'color'
@@ -966,15 +969,11 @@ class pbrtv3_texture_type_node_blender_image_map(pbrtv3_texture_node):
                 scene = bpy.context.scene
 
                 if image.source == 'GENERATED':
-                    temp_file = tempfile.NamedTemporaryFile(delete=False)
-                    file_path = temp_file.name
-                    image.save_render(file_path, scene)
+                    file_path = ImageCache.get_path(image, scene)
 
                 if image.source == 'FILE':
                     if image.packed_file:
-                        temp_file = tempfile.NamedTemporaryFile(delete=False)
-                        file_path = temp_file.name
-                        image.save_render(file_path, scene)
+                        file_path = ImageCache.get_path(image, scene)
                     else:
                         if self.id_data.library is not None:
                             file_path = efutil.filesystem_path(bpy.path.abspath(image.filepath, self.id_data.library.filepath))
@@ -988,6 +987,8 @@ class pbrtv3_texture_type_node_blender_image_map(pbrtv3_texture_node):
         if not (os.path.exists(file_path) and os.path.isfile(file_path)):
             return warning_color_wrong_path
 
+        file_path = TexturePyramid.resolve(bpy.context.scene, file_path)
+
         gamma = 1 if self.is_normal_map else self.gamma
 
         set_prop_tex(properties, luxcore_name, 'type', 'imagemap')
@@ -1258,7 +1259,7 @@ class pbrtv3_texture_type_node_normal_map(pbrtv3_texture_node):
 
     def export_texture(self, make_texture):
         normalmap_params = ParamSet()
-        process_filepath_data(PBRTv3Manager.CurrentScene, self, self.filename, normalmap_params, 'filename')
+        process_filepath_data(PBRTv3Manager.CurrentScene, self, self.filename, normalmap_params, 'filename', is_image=True)
         normalmap_params.add_string('filtertype', self.filtertype)
         normalmap_params.add_string('wrap', self.wrap)
 
@@ -1281,8 +1282,10 @@ class pbrtv3_texture_type_node_normal_map(pbrtv3_texture_node):
         if not (os.path.exists(self.filename) and os.path.isfile(self.filename)):
             return [0, 0, 0] # Black color
 
+        file_path = TexturePyramid.resolve(bpy.context.scene, self.filename)
+
         set_prop_tex(properties, luxcore_name, 'type', 'imagemap')
-        set_prop_tex(properties, luxcore_name, 'file', self.filename)
+        set_prop_tex(properties, luxcore_name, 'file', file_path)
         set_prop_tex(properties, luxcore_name, 'gamma', 1)
 
         mapping_type, uvscale, uvdelta = self.inputs[0].export_luxcore(properties)
@@ -35,7 +35,6 @@ from .. import PBRTv3Addon
 from ..export import get_worldscale, get_output_filename
 from ..export import ParamSet, PBRTv3Manager
 from ..export import fix_matrix_order
-from ..outputs.pure_api import PBRTv3_VERSION
 from ..outputs.luxcore_api import UsePBRTv3Core
 
 
@@ -3161,7 +3161,7 @@ class pbrtv3_tex_imagemap(declarative_property_group):
 
         # This function resolves relative paths (even in linked library blends)
         # and optionally encodes/embeds the data if the setting is enabled
-        process_filepath_data(scene, texture, self.filename, params, 'filename')
+        process_filepath_data(scene, texture, self.filename, params, 'filename', is_image=True)
 
         params.add_integer('discardmipmaps', self.discardmipmaps) \
             .add_string('filtertype', self.filtertype) \
@@ -3438,7 +3438,7 @@ class pbrtv3_tex_normalmap(declarative_property_group):
         params = ParamSet()
         # This function resolves relative paths (even in linked library blends)
         # and optionally encodes/embeds the data if the setting is enabled
-        process_filepath_data(scene, texture, self.filename, params, 'filename')
+        process_filepath_data(scene, texture, self.filename, params, 'filename', is_image=True)
 
         params.add_integer('discardmipmaps', self.discardmipmaps) \
             .add_string('filtertype', self.filtertype) \
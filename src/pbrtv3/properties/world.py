@@ -34,10 +34,10 @@ from ..extensions_framework.validate import Logic_OR as O, Logic_AND as A
 from .. import PBRTv3Addon
 from ..export import ParamSet
 from ..export.materials import ExportedTextures
-from ..outputs.pure_api import PBRTv3_VERSION
 from ..outputs.luxcore_api import UsePBRTv3Core
 from ..outputs.luxcore_api import ScenePrefix
 from ..properties.material import texture_append_visibility
+from ..properties import SessionSettingsUpdates
 from ..properties.texture import (
     ColorTextureParameter, FloatTextureParameter, FresnelTextureParameter
 )
@@ -904,6 +904,12 @@ class pbrtv3_lightgroups(declarative_property_group):
         return True
 
 
+# Lightgroup scales are applied to running final renders
+SessionSettingsUpdates.add_update_callbacks(pbrtv3_lightgroup_data.properties, exclude=('show_settings',))
+SessionSettingsUpdates.add_update_callbacks(pbrtv3_lightgroups.properties,
+                                            exclude=('lightgroups_index', 'show_settings'))
+
+
 @PBRTv3Addon.addon_register_class
 class pbrtv3_materialgroup_data(declarative_property_group):
     """
@@ -28,7 +28,7 @@ import bpy, bl_ui
 
 from ..extensions_framework.ui import property_group_renderer
 
-from ..outputs.luxcore_api import UsePBRTv3Core, pyluxcore
+from ..outputs.luxcore_api import UsePBRTv3Core, PBRTv3CoreIsOutdated
 from .. import PBRTv3Addon
 
 
@@ -68,7 +68,7 @@ class tonemapping_panel(imageeditor_panel):
     def draw(self, context):
         layout = self.layout
 
-        if not hasattr(pyluxcore.RenderSession, 'Parse'):
+        if PBRTv3CoreIsOutdated():
             layout.label('Outdated PBRTv3Core version!', icon='INFO')
             return
 
@@ -34,6 +34,7 @@ import nodeitems_utils
 from nodeitems_utils import NodeCategory, NodeItem, NodeItemCustom
 
 from .. import PBRTv3Addon
+from ..properties import NodeTreeIndex
 
 
 @PBRTv3Addon.addon_register_class
@@ -72,6 +73,7 @@ class pbrtv3_mat_node_editor(bpy.types.NodeTree):
 
     # This block updates the preview, when socket links change
     def update(self):
+        NodeTreeIndex.invalidate(self.name)
         self.refresh = True
 
     def acknowledge_connection(self, context):
@@ -110,6 +112,7 @@ class pbrtv3_vol_node_editor(bpy.types.NodeTree):
 
     # This block updates the preview, when socket links change
     def update(self):
+        NodeTreeIndex.invalidate(self.name)
         self.refresh = True
 
     def acknowledge_connection(self, context):
@@ -28,7 +28,7 @@ import bpy, bl_ui
 
 from ..extensions_framework.ui import property_group_renderer
 
-from ..outputs.luxcore_api import UsePBRTv3Core, pyluxcore
+from ..outputs.luxcore_api import UsePBRTv3Core, PBRTv3CoreIsOutdated
 from .. import PBRTv3Addon
 
 from .lamps import lamps_panel
@@ -116,7 +116,7 @@ class lightgroups_base(object):
 
     # overridden in order to draw a 'non-standard' panel
     def draw(self, context):
-        if UsePBRTv3Core() and not hasattr(pyluxcore.RenderSession, 'Parse'):
+        if UsePBRTv3Core() and PBRTv3CoreIsOutdated():
             self.layout.label('Outdated PBRTv3Core version!', icon='INFO')
             self.layout.separator()
 
@@ -299,6 +299,9 @@ class translator(render_panel):
         ( ('scene',), 'pbrtv3_engine', lambda: not UsePBRTv3Core() ),
         ( ('scene',), 'pbrtv3_testing', lambda: not UsePBRTv3Core() ),
         ( ('scene',), 'luxcore_translatorsettings', lambda: UsePBRTv3Core() ),
+        ( ('scene',), 'pbrtv3_lod' ),
+        ( ('scene',), 'pbrtv3_texture_cache' ),
+        ( ('scene',), 'pbrtv3_texture_budget' ),
     ]
 
     def draw(self, context):
@@ -311,6 +314,13 @@ class translator(render_panel):
             self.layout.label('Custom PBRTv3Core config properties:')
             self.layout.prop(context.scene.luxcore_enginesettings, 'custom_properties')
 
+            row = self.layout.row()
+            row.prop(context.scene.pbrtv3_testing, 'profile_export')
+            sub = row.row()
+            sub.active = context.scene.pbrtv3_testing.profile_export
+            sub.prop(context.scene.pbrtv3_testing, 'profile_top_n')
+            self.layout.prop(context.scene.pbrtv3_testing, 'log_level')
+
 @PBRTv3Addon.addon_register_class
 class networking(render_panel):
     """